@@ -5,7 +5,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'expertise.instrumentation.DjangoTemplatesChronometres',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expertise.instrumentation.MesureRequetesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +56,7 @@ ROOT_URLCONF = 'CEPN.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'expertise.instrumentation.DjangoTemplatesChronometres',
         'DIRS': [str(BASE_DIR / "templates")],  # ✅ Correction ici
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +80,43 @@ DATABASES = {
     }
 }
 
+# Profil SQLite de production (opt-in : SQLITE_PROFILE=production), appliqué à chaque connexion.
+# WAL : les lectures ne bloquent plus l'écriture ; IMMEDIATE : l'écrivain prend le verrou dès
+# le début de la transaction et attend son tour (timeout) au lieu d'échouer en cours de route.
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-32000;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+}
+
+# PostgreSQL (DB_ENGINE=postgresql) : paramètres lus dans l'environnement.
+# Reprise des données de la base SQLite : python manage.py copy_sqlite_data db.sqlite3
+if os.environ.get('DB_ENGINE') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'cepn'),
+            'USER': os.environ.get('POSTGRES_USER', 'cepn'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', '600')),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+elif os.environ.get('SQLITE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+    })
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,5 +149,34 @@ STATICFILES_DIRS = [str(BASE_DIR / "static")]  # ✅ Optionnel si tu as un répe
 MEDIA_URL = '/media/'
 MEDIA_ROOT = str(BASE_DIR / 'media')
 
+# Processus utilisés pour rendre les PDF de factures médecins en parallèle (0 = nombre de cœurs)
+MEDECIN_PDF_WORKERS = int(os.environ.get('MEDECIN_PDF_WORKERS', '0'))
+
+# Mesures de performance (expertise.instrumentation) : seuil des requêtes lentes,
+# budget de requêtes SQL par nom d'URL (session et utilisateur compris) et statistiques par vue
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '1000'))
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+QUERY_BUDGETS = {
+    'liste_bordereaux': 8,
+    'bordereau_detail': 6,
+    'factures_medecins_bordereau': 6,
+    'impression_factures': 5,
+    'intervenants_list': 6,
+    'intervenant_history': 10,
+    'personnel_list': 6,
+    'personnel_detail': 6,
+}
+PERF_STATS_ENABLED = os.environ.get('PERF_STATS_ENABLED', '1') == '1'
+PERF_STATS_FLUSH_SECONDS = int(os.environ.get('PERF_STATS_FLUSH_SECONDS', '60'))
+
+# Durée (s) pendant laquelle un processus garde en mémoire les règles TauxRedevance
+REDEVANCE_CACHE_SECONDS = int(os.environ.get('REDEVANCE_CACHE_SECONDS', '300'))
+
+# Sauvegardes SQLite (commande backup_db) : dossier et rétention par défaut
+BACKUP_DIR = os.environ.get('BACKUP_DIR', str(BASE_DIR / 'backups'))
+BACKUP_KEEP_DAILY = int(os.environ.get('BACKUP_KEEP_DAILY', '7'))
+BACKUP_KEEP_WEEKLY = int(os.environ.get('BACKUP_KEEP_WEEKLY', '4'))
+BACKUP_KEEP_MONTHLY = int(os.environ.get('BACKUP_KEEP_MONTHLY', '6'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import PersonnelNavigant, FicheEvenement, Medecin
-from .models import CompagnieAerienne, Bordereau
+from .models import CompagnieAerienne, Bordereau, TacheDocument, TauxRedevance
 
 #admin.site.register(PersonnelNavigant)
 admin.site.register(FicheEvenement)
@@ -26,3 +26,13 @@ class BordereauAdmin(admin.ModelAdmin):
 
 class MedecinAdmin(admin.ModelAdmin):
     list_display = ('nom', 'prenom', 'specialite', 'iban')
+
+@admin.register(TauxRedevance)
+class TauxRedevanceAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'medecin', 'specialite', 'taux')
+    list_select_related = ('medecin',)
+
+@admin.register(TacheDocument)
+class TacheDocumentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'type_document', 'statut', 'progression', 'created_at', 'finished_at')
+    list_filter = ('statut', 'type_document')
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class ExpertiseConfig(AppConfig):
+    name = 'expertise'
+
+    def ready(self):
+        from . import signals  # noqa: F401
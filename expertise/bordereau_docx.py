@@ -0,0 +1,202 @@
+# expertise/bordereau_docx.py
+"""
+Bordereaux DOCX remplis à partir d'un modèle Word (``templates/expertise/docx/bordereau.docx``).
+
+Le modèle définit une seule fois le papier à lettre (en-tête de page, répété
+par Word sur chaque page), les styles et la mise en page des tableaux. Les
+champs ``{cle}`` sont remplacés directement dans le XML ; chaque tableau a
+une ligne modèle recopiée pour chaque ligne de données et le bloc qui suit
+le marqueur ``{#facture}`` est recopié pour chaque facture individuelle.
+
+Le modèle se régénère avec ``python manage.py build_bordereau_template`` ; il
+peut aussi être retouché dans Word tant que les champs et le marqueur restent
+chacun dans un seul segment de texte.
+"""
+
+import copy
+import io
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml.ns import qn
+from docx.shared import Pt
+
+MODELE = Path(__file__).resolve().parent / 'templates' / 'expertise' / 'docx' / 'bordereau.docx'
+
+DEBUT_FACTURE = '{#facture}'
+CHAMP = re.compile(r'\{(\w+)\}')
+
+PAPIER_A_LETTRE = [
+    ('Centre Médical du Personnel Navigant de Polynésie française', 14),
+    ('Dr. Christian Hellec', 14),
+    ('BP 380697 - 98718 Punaauia - Tahiti', 11),
+    ('Polynésie Française', 11),
+    ('mel : cmpnpf@gmail.com | Tel : +689.87.77.05.18 | Tel : +689.87.71.50.90', 10),
+]
+SIGNATURE = ['Dr. Christian HELLEC', 'IBAN : FR76 1223 9000 0162 2887 0100 014']
+
+STYLE_CELLULE = 'Cellule'
+STYLE_CELLULE_TITRE = 'Cellule titre'
+
+COLONNES_BORDEREAU = ["Numéro de facture", "DN", "Nom", "Prénom", "Total (XPF)", "Paiement"]
+COLONNES_ACTES = ["Date", "Acte", "Médecin", "Montant (XPF)", "Quote-part"]
+
+
+# --- Construction du modèle ---
+
+def _titre(doc, texte, saut_de_page=False):
+    para = doc.add_heading(texte, level=2)
+    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    if saut_de_page:
+        para.paragraph_format.page_break_before = True
+    return para
+
+
+def _styles_cellules(doc):
+    """Styles de paragraphe des cellules : la mise en forme n'est pas répétée dans chaque cellule."""
+    for nom, gras in ((STYLE_CELLULE, False), (STYLE_CELLULE_TITRE, True)):
+        style = doc.styles.add_style(nom, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles['Normal']
+        style.font.bold = gras
+        style.paragraph_format.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        style.paragraph_format.space_after = Pt(0)
+
+
+def _tableau(doc, colonnes, style):
+    table = doc.add_table(rows=2, cols=len(colonnes))
+    table.style = style
+    for entete, ligne_modele, titre in zip(table.rows[0].cells, table.rows[1].cells, colonnes):
+        entete.paragraphs[0].style = STYLE_CELLULE_TITRE
+        entete.paragraphs[0].add_run(titre)
+        ligne_modele.paragraphs[0].style = STYLE_CELLULE
+        ligne_modele.paragraphs[0].add_run('-')
+    # Largeurs portées par la grille du tableau, pas par chaque cellule.
+    for tc in table._tbl.iter(qn('w:tc')):
+        tc.remove(tc.tcPr)
+    return table
+
+
+def construire_modele(chemin=MODELE):
+    """Écrit le modèle de bordereau (papier à lettre, récapitulatif, bloc facture individuelle)."""
+    doc = Document()
+    _styles_cellules(doc)
+
+    entete = doc.sections[0].header
+    entete.paragraphs[0].text = ''
+    for index, (texte, taille) in enumerate(PAPIER_A_LETTRE):
+        para = entete.paragraphs[0] if index == 0 else entete.add_paragraph()
+        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        run = para.add_run(texte)
+        run.bold = True
+        run.font.size = Pt(taille)
+
+    _titre(doc, 'Bordereau de dépôt de factures')
+    _titre(doc, '--------------------')
+    doc.add_paragraph('Date de création : {date_creation}')
+    doc.add_paragraph('Numéro du bordereau : {no_bordereau}')
+    doc.add_paragraph('Compagnie aérienne : {compagnie} ({iata})')
+    _tableau(doc, COLONNES_BORDEREAU, 'Table Grid')
+    doc.add_paragraph('')
+    doc.add_paragraph('Nombre de factures : {nombre} | Total général : {total_general} XPF ({total_lettres})')
+    for ligne in SIGNATURE:
+        doc.add_paragraph(ligne)
+
+    doc.add_paragraph(DEBUT_FACTURE)
+    _titre(doc, 'Facture Individuelle', saut_de_page=True)
+    _titre(doc, '{compagnie}')
+    _titre(doc, '--------------------')
+    doc.add_paragraph('Date : {date}')
+    doc.add_paragraph('Numéro de facture : {no_facture}')
+    doc.add_heading('Informations du patient', level=2)
+    doc.add_paragraph('Nom : {nom}')
+    doc.add_paragraph('Prénom : {prenom}')
+    doc.add_paragraph('DN : {dn}')
+    doc.add_paragraph('Date de naissance : {date_de_naissance}')
+    doc.add_heading('Détails des actes', level=2)
+    _tableau(doc, COLONNES_ACTES, 'Light Grid Accent 1')
+    doc.add_paragraph('')
+    doc.add_paragraph('💰 Total : {total} XPF')
+    doc.add_paragraph('🧾 Payé par le patient : {paye_par_patient} XPF')
+    for ligne in SIGNATURE:
+        doc.add_paragraph(ligne)
+
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(chemin)
+    _modele.cache_clear()
+    return chemin
+
+
+# --- Remplissage ---
+
+@lru_cache(maxsize=1)
+def _modele():
+    return MODELE.read_bytes()
+
+
+def _remplir(element, valeurs):
+    """Remplace les champs ``{cle}`` ; un paragraphe dont un champ vaut ``None`` est supprimé."""
+    for para in list(element.iter(qn('w:p'))):
+        textes = [t for t in para.iter(qn('w:t')) if t.text and '{' in t.text]
+        if any(valeurs.get(nom, '') is None for t in textes for nom in CHAMP.findall(t.text)):
+            para.getparent().remove(para)
+            continue
+        for t in textes:
+            t.text = CHAMP.sub(lambda m: str(valeurs.get(m.group(1), m.group(0))), t.text)
+
+
+def _remplir_tableau(tbl, lignes):
+    """Recopie la ligne modèle (la dernière) du tableau pour chaque ligne de valeurs."""
+    modele = tbl.tr_lst[-1]
+    for ligne in lignes:
+        tr = copy.deepcopy(modele)
+        for tc, valeur in zip(tr.tc_lst, ligne):
+            next(tc.iter(qn('w:t'))).text = str(valeur)
+        modele.addprevious(tr)
+    tbl.remove(modele)
+
+
+def rendre_bordereau(entete, lignes, factures, nombre=None, progression=None):
+    """
+    Bordereau complet en octets.
+
+    ``entete`` : champs du récapitulatif ; ``lignes`` : cellules du tableau
+    récapitulatif ; ``factures`` : itérable de ``(champs, lignes_actes)``, une
+    entrée par facture individuelle (``nombre`` sert à la progression).
+    """
+    doc = Document(io.BytesIO(_modele()))
+    corps = doc.element.body
+    fin = corps.sectPr
+
+    elements = [el for el in corps.iterchildren() if el is not fin]
+    marqueur = next(
+        index for index, el in enumerate(elements)
+        if el.tag == qn('w:p') and ''.join(t.text or '' for t in el.iter(qn('w:t'))) == DEBUT_FACTURE
+    )
+    bloc_facture = elements[marqueur + 1:]
+    for el in elements[marqueur:]:
+        corps.remove(el)
+
+    for el in elements[:marqueur]:
+        if el.tag == qn('w:tbl'):
+            _remplir_tableau(el, lignes)
+        else:
+            _remplir(el, entete)
+
+    for index, (champs, actes) in enumerate(factures, start=1):
+        if progression:
+            progression(index, nombre)
+        for modele in bloc_facture:
+            el = copy.deepcopy(modele)
+            if el.tag == qn('w:tbl'):
+                _remplir_tableau(el, actes)
+            _remplir(el, champs)
+            fin.addprevious(el)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,102 @@
+# expertise/bordereau_pdf.py
+"""
+Bordereaux PDF (récapitulatif + factures individuelles) rendus avec WeasyPrint.
+
+La feuille de style ``templates/expertise/pdf/bordereau.css`` (papier à lettre
+en marge de page compris) est analysée une seule fois par processus avec sa
+``FontConfiguration``. Les factures individuelles sont rendues par lots dans
+un pool de processus, puis les PDF sont concaténés dans l'ordre. Les mêmes
+lots servent à l'impression des factures sans récapitulatif.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+
+FEUILLE_DE_STYLE = Path(__file__).resolve().parent / 'templates' / 'expertise' / 'pdf' / 'bordereau.css'
+
+# Factures par rendu WeasyPrint : assez pour amortir le démarrage, assez peu pour répartir la charge.
+FACTURES_PAR_LOT = 25
+
+
+@lru_cache(maxsize=1)
+def _style():
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    polices = FontConfiguration()
+    return CSS(string=FEUILLE_DE_STYLE.read_text(encoding='utf-8'), font_config=polices), polices
+
+
+def _rendre(html_string):
+    from weasyprint import HTML
+
+    feuille, polices = _style()
+    return HTML(string=html_string).write_pdf(stylesheets=[feuille], font_config=polices)
+
+
+def _lots(elements, taille):
+    return [elements[debut:debut + taille] for debut in range(0, len(elements), taille)]
+
+
+def _concatener(pdfs):
+    from pypdf import PdfWriter
+
+    sortie = PdfWriter()
+    for pdf in pdfs:
+        sortie.append(io.BytesIO(pdf))
+    buffer = io.BytesIO()
+    sortie.write(buffer)
+    return buffer.getvalue()
+
+
+def _rendre_documents(documents, progression=None, workers=None):
+    """Rend chaque document HTML (en parallèle si possible) et concatène les PDF dans l'ordre."""
+    workers = workers or getattr(settings, 'MEDECIN_PDF_WORKERS', None) or os.cpu_count() or 1
+    workers = min(workers, len(documents))
+    if workers <= 1:
+        pdfs = []
+        for index, html_string in enumerate(documents, start=1):
+            pdfs.append(_rendre(html_string))
+            if progression:
+                progression(index, len(documents))
+        return _concatener(pdfs)
+
+    # Les processus fils ne touchent pas à la base : on ne leur laisse pas de connexion héritée.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_style) as pool:
+        pdfs = []
+        # map conserve l'ordre des documents ; la progression suit les lots dans cet ordre.
+        for index, pdf in enumerate(pool.map(_rendre, documents), start=1):
+            pdfs.append(pdf)
+            if progression:
+                progression(index, len(documents))
+    return _concatener(pdfs)
+
+
+def _documents_factures(contexte, evenements):
+    return [
+        render_to_string('expertise/pdf/bordereau_factures.html', {**contexte, 'evenements': lot})
+        for lot in _lots(evenements, FACTURES_PAR_LOT)
+    ]
+
+
+def rendre_bordereau_pdf(contexte, evenements, progression=None, workers=None):
+    """
+    PDF complet en octets : récapitulatif (``contexte`` + ``evenements``) puis
+    une page par facture individuelle (``LigneBordereau`` avec actes).
+    """
+    documents = [render_to_string('expertise/pdf/bordereau.html', {**contexte, 'evenements': evenements})]
+    documents += _documents_factures(contexte, evenements)
+    return _rendre_documents(documents, progression, workers)
+
+
+def rendre_factures_pdf(contexte, evenements, progression=None, workers=None):
+    """Factures individuelles seules (impression par lot), une par page ; ``evenements`` non vide."""
+    return _rendre_documents(_documents_factures(contexte, evenements), progression, workers)
@@ -0,0 +1,197 @@
+# expertise/bordereaux.py
+"""
+Données d'un bordereau, lues en une seule requête.
+
+``lignes_bordereau`` renvoie une ``LigneBordereau`` par fiche (valeurs à plat,
+sans instance de modèle ni chargement paresseux de clés étrangères) ; elle
+sert à la page du bordereau, à la vue par compagnie et au document DOCX.
+
+``honoraires_bordereau`` détaille les honoraires reversés aux médecins lors
+du virement ; c'est l'unique source des montants ``FactureMedecin``, du
+récapitulatif des honoraires et des factures PDF par médecin.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from .honoraires import ACTE_CONFIGS, calculer_redevance
+from .models import ActeMedecin, FicheEvenement, Medecin
+
+# (libellé, case à cocher, date, médecin, montant) des actes détaillés sur la facture individuelle.
+ACTES_FACTURE = [
+    ("CEMPN/Pf", 'cs_cempn', 'date_cempn', 'medecin_cempn', 'honoraire_cempn'),
+    ("Ophtalmologie", 'cs_oph', 'date_cs_oph', 'medecin_oph', 'honoraire_cs_oph'),
+    ("ORL", 'cs_orl', 'date_cs_orl', 'medecin_orl', 'honoraire_cs_orl'),
+    ("Biologie sanguine", 'cs_labo', 'date_cs_labo', 'medecin_labo', 'honoraire_cs_labo'),
+    ("Biologie urinaire", 'cs_lbx', 'date_cs_lbx', 'medecin_labo', 'honoraire_cs_lbx'),
+    ("Toxicologie", 'cs_toxique', 'date_evenement', 'medecin_labo', 'honoraire_cs_toxique'),
+    ("Radiologie", 'cs_radio', 'date_cs_radio', 'medecin_radio', 'honoraire_cs_radio'),
+    ("Frais de dossier", 'cs_cempn', 'date_cempn', 'medecin_cempn', 'frais_dossier'),
+]
+
+CHAMPS_LIGNE = {
+    'id': 'id',
+    'no_facture': 'no_facture',
+    'date_evenement': 'date_evenement',
+    'total': 'total',
+    'paiement': 'paiement',
+    'quote_part_patient': 'quote_part_patient',
+    'paye_par_patient': 'paye_par_patient',
+    'no_bordereau': 'bordereau__no_bordereau',
+    'dn': 'personnel__dn',
+    'nom': 'personnel__nom',
+    'prenom': 'personnel__prenom',
+    'date_de_naissance': 'personnel__date_de_naissance',
+    'compagnie': 'personnel__compagnie__nom',
+}
+
+MEDECINS = sorted({medecin for _, _, _, medecin, _ in ACTES_FACTURE})
+CHAMPS_ACTES = sorted(
+    {champ for _, case, date, _, montant in ACTES_FACTURE for champ in (case, date, montant)}
+    | {f'{medecin}__{attribut}' for medecin in MEDECINS for attribut in ('prenom', 'nom')}
+)
+
+
+class ActeFacture:
+    __slots__ = ('libelle', 'date', 'medecin', 'montant')
+
+    def __init__(self, libelle, date, medecin, montant):
+        self.libelle = libelle
+        self.date = date
+        self.medecin = medecin
+        self.montant = montant
+
+
+class LigneBordereau:
+    """
+    Une fiche du bordereau ; ``actes`` n'est rempli qu'avec ``avec_actes=True``
+    et ``code_barre`` (SVG en ligne) que pour l'impression des factures.
+    """
+    __slots__ = tuple(CHAMPS_LIGNE) + ('actes', 'code_barre')
+
+    def __init__(self, valeurs, actes=()):
+        for attribut, champ in CHAMPS_LIGNE.items():
+            setattr(self, attribut, valeurs[champ])
+        self.total = self.total or 0
+        self.actes = actes
+        self.code_barre = None
+
+
+def _actes(valeurs):
+    medecins = {}
+    for medecin in MEDECINS:
+        prenom, nom = valeurs[f'{medecin}__prenom'], valeurs[f'{medecin}__nom']
+        medecins[medecin] = f"{prenom} {nom}" if nom is not None else None
+    return [
+        ActeFacture(libelle, valeurs[date], medecins[medecin], valeurs[montant] or 0)
+        for libelle, case, date, medecin, montant in ACTES_FACTURE
+        if valeurs[case]
+    ]
+
+
+def evenements_du_mois(compagnie, mois, annee):
+    return FicheEvenement.objects.filter(
+        date_evenement__year=annee,
+        date_evenement__month=mois,
+        personnel__compagnie=compagnie,
+    )
+
+
+def lignes_bordereau(evenements, avec_actes=False, limite=None):
+    """
+    Lignes des fiches du queryset ``evenements`` en une requête, triées par
+    numéro de facture. ``avec_actes`` ajoute le détail des actes et le nom
+    des médecins (facture individuelle) ; ``limite`` borne le nombre de lignes.
+    """
+    champs = list(CHAMPS_LIGNE.values()) + (CHAMPS_ACTES if avec_actes else [])
+    valeurs = evenements.order_by('no_facture', 'pk').values(*champs)
+    if limite is not None:
+        valeurs = valeurs[:limite]
+    if avec_actes:
+        return [LigneBordereau(ligne, _actes(ligne)) for ligne in valeurs]
+    return [LigneBordereau(ligne) for ligne in valeurs]
+
+
+class HonoraireActe:
+    """Un acte reversé à un médecin sur un bordereau."""
+    __slots__ = (
+        'evenement_id', 'date_evenement', 'patient', 'medecin_id', 'act_code',
+        'montant_brut', 'redevance', 'montant_net',
+    )
+
+    def __init__(self, valeurs, medecin_id, act_code, montant_brut, redevance):
+        self.evenement_id = valeurs['id']
+        self.date_evenement = valeurs['date_evenement']
+        self.patient = f"{valeurs['personnel__prenom']} {valeurs['personnel__nom']}"
+        self.medecin_id = medecin_id
+        self.act_code = act_code
+        self.montant_brut = montant_brut
+        self.redevance = redevance
+        self.montant_net = montant_brut - redevance
+
+
+class TotalHonoraires:
+    __slots__ = ('montant_brut', 'redevance', 'montant_net')
+
+    def __init__(self):
+        self.montant_brut = self.redevance = self.montant_net = Decimal('0')
+
+
+def honoraires_bordereau(bordereau, medecin_id=None, medecins=None):
+    """
+    Un ``HonoraireActe`` par acte reversé sur ``bordereau`` (filtré sur
+    ``medecin_id`` si donné), trié par date de fiche.
+
+    Règle du virement, reprise de l'origine : tout honoraire dont le médecin
+    est renseigné est reversé, case de l'acte cochée ou non ; les frais de
+    dossier ne le sont pas. Le grand livre ``ActeMedecin`` ne garde que les
+    actes cochés (historique des médecins) : sa redevance est reprise quand
+    l'acte y figure (elle peut venir d'une facture médecin), sinon le taux du
+    médecin s'applique. ``medecins`` (``{pk: Medecin}``) évite de les relire.
+    """
+    champs = ['id', 'date_evenement', 'personnel__prenom', 'personnel__nom'] + [
+        champ for field_name, _, _, _, amount_field, _ in ACTE_CONFIGS for champ in (f'{field_name}_id', amount_field)
+    ]
+    fiches = list(FicheEvenement.objects.filter(bordereau=bordereau).order_by('date_evenement', 'pk').values(*champs))
+
+    ledger = ActeMedecin.objects.filter(evenement__bordereau=bordereau)
+    if medecin_id is not None:
+        ledger = ledger.filter(medecin_id=medecin_id)
+    redevances = {
+        (evenement_id, act_code, medecin): redevance
+        for evenement_id, act_code, medecin, redevance
+        in ledger.values_list('evenement_id', 'act_code', 'medecin_id', 'redevance')
+    }
+
+    actes = []
+    for valeurs in fiches:
+        for field_name, _, _, _, amount_field, act_code in ACTE_CONFIGS:
+            medecin = valeurs[f'{field_name}_id']
+            if medecin is None or (medecin_id is not None and medecin != medecin_id):
+                continue
+            actes.append((valeurs, medecin, act_code, Decimal(valeurs[amount_field] or 0)))
+
+    medecins = dict(medecins or {})
+    manquants = {medecin for valeurs, medecin, act_code, _ in actes
+                 if (valeurs['id'], act_code, medecin) not in redevances} - set(medecins)
+    if manquants:
+        medecins.update(Medecin.objects.in_bulk(manquants))
+
+    honoraires = []
+    for valeurs, medecin, act_code, montant_brut in actes:
+        redevance = redevances.get((valeurs['id'], act_code, medecin))
+        if redevance is None:
+            redevance, _ = calculer_redevance(montant_brut, medecins[medecin])
+        honoraires.append(HonoraireActe(valeurs, medecin, act_code, montant_brut, redevance))
+    return honoraires
+
+
+def totaux_par_medecin(honoraires):
+    """``{medecin_id: TotalHonoraires}`` des actes ``honoraires``."""
+    totaux = defaultdict(TotalHonoraires)
+    for acte in honoraires:
+        total = totaux[acte.medecin_id]
+        total.montant_brut += acte.montant_brut
+        total.redevance += acte.redevance
+        total.montant_net += acte.montant_net
+    return dict(totaux)
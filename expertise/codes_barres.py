@@ -0,0 +1,86 @@
+# expertise/codes_barres.py
+"""
+Codes-barres Code128 des numéros de facture, en SVG.
+
+Un code-barres ne dépend que du numéro : il est rendu une fois, rangé sous
+``MEDIA_ROOT/cache/codes_barres/`` et gardé en mémoire (LRU) par processus.
+Les pages l'affichent par URL (vue ``code_barre``) au lieu de l'incorporer en
+base64 ; l'impression par lot incorpore directement les balises ``<svg>``.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+RACINE = Path('cache') / 'codes_barres'
+
+# Code128 : ASCII imprimable ; les numéros de facture font une quinzaine de caractères.
+LONGUEUR_MAX = 50
+
+# Le code-barres d'un numéro ne change jamais.
+CODE_BARRE_CACHE_SECONDS = 365 * 24 * 3600
+
+OPTIONS = {
+    'module_width': 0.2,
+    'module_height': 8.0,
+    'quiet_zone': 2.0,
+    'font_size': 8,
+    'text_distance': 3.0,
+}
+
+
+def numero_valide(numero):
+    return 0 < len(numero) <= LONGUEUR_MAX and all(32 <= ord(c) < 127 for c in numero)
+
+
+def _chemin(numero):
+    # Le numéro contient « / » : le nom du fichier est son empreinte.
+    empreinte = hashlib.sha256(numero.encode('ascii')).hexdigest()
+    return Path(settings.MEDIA_ROOT) / RACINE / empreinte[:2] / f"{empreinte}.svg"
+
+
+def _rendre(numero):
+    from barcode import Code128
+    from barcode.writer import SVGWriter
+
+    buffer = io.BytesIO()
+    Code128(numero, writer=SVGWriter()).write(buffer, options=OPTIONS)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=2048)
+def svg_code_barre(numero):
+    """SVG du code-barres de ``numero`` : mémoire, puis disque, puis rendu (une seule fois)."""
+    chemin = _chemin(numero)
+    try:
+        return chemin.read_bytes()
+    except FileNotFoundError:
+        pass
+
+    svg = _rendre(numero)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporaire = tempfile.mkstemp(dir=chemin.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fichier:
+        fichier.write(svg)
+    os.replace(temporaire, chemin)
+    return svg
+
+
+def codes_barres_en_ligne(numeros):
+    """
+    ``{numero: <svg>}`` pour une série de numéros, prêt à incorporer dans le
+    HTML (sans prologue XML). Chaque numéro distinct n'est lu ou rendu qu'une fois.
+    """
+    codes = {}
+    for numero in numeros:
+        if numero in codes or not numero or not numero_valide(numero):
+            continue
+        svg = svg_code_barre(numero).decode('utf-8')
+        codes[numero] = mark_safe(svg[svg.index('<svg'):])
+    return codes
@@ -0,0 +1,203 @@
+# expertise/honoraires.py
+"""
+Actes médicaux facturés par les intervenants et tenue du grand livre ``ActeMedecin``.
+
+Chaque fiche produit au plus une ligne par acte réalisé et rattaché à un
+médecin. Les montants bruts viennent de la fiche ; la redevance et le net
+viennent de la ligne de facture médecin si l'acte a déjà été facturé, sinon
+du taux du médecin (règles ``TauxRedevance``, gardées en mémoire).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ActeMedecin, FicheEvenement, Medecin, MedecinInvoiceLine, TauxRedevance
+
+ACTE_CONFIGS = [
+    ('medecin_cempn', 'Consultation CEMPN', 'cs_cempn', 'date_cempn', 'honoraire_cempn', 'CEMPN'),
+    ('medecin_oph', 'Consultation OPH', 'cs_oph', 'date_cs_oph', 'honoraire_cs_oph', 'OPH'),
+    ('medecin_orl', 'Consultation ORL', 'cs_orl', 'date_cs_orl', 'honoraire_cs_orl', 'ORL'),
+    ('medecin_radio', 'Consultation Radio', 'cs_radio', 'date_cs_radio', 'honoraire_cs_radio', 'RADIO'),
+    ('medecin_labo', 'Biologie sanguine', 'cs_labo', 'date_cs_labo', 'honoraire_cs_labo', 'LABO'),
+    ('medecin_labo', 'Biologie urinaire', 'cs_lbx', 'date_cs_lbx', 'honoraire_cs_lbx', 'LABOX'),
+    ('medecin_labo', 'Recherche toxique', 'cs_toxique', 'date_cs_toxique', 'honoraire_cs_toxique', 'TOX'),
+]
+
+# Champs de FicheEvenement dont dépend le grand livre.
+CHAMPS_ACTES = {'date_evenement'} | {
+    champ
+    for field_name, _, flag_field, date_field, amount_field, _ in ACTE_CONFIGS
+    for champ in (field_name, f'{field_name}_id', flag_field, date_field, amount_field)
+}
+
+CENTIMES = Decimal('0.01')
+
+# Taux appliqué quand aucune règle ``TauxRedevance`` ne s'applique (table vide).
+TAUX_DEFAUT = Decimal('0.06')
+
+# Le titulaire du centre ne reverse pas de redevance, y compris sous une fiche médecin créée plus tard.
+# Une règle ``TauxRedevance`` propre au médecin reste prioritaire.
+MEDECINS_SANS_REDEVANCE = {'HELLEC'}
+
+
+class _ReglesRedevance:
+    """Règles ``TauxRedevance`` gardées en mémoire du processus, relues après ``REDEVANCE_CACHE_SECONDS``."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._expiration = 0.0
+        self._par_medecin = {}
+        self._par_specialite = []
+        self._defaut = TAUX_DEFAUT
+
+    def invalider(self):
+        with self._verrou:
+            self._expiration = 0.0
+
+    def _charger(self):
+        par_medecin = {}
+        par_specialite = []
+        defaut = TAUX_DEFAUT
+        for medecin_id, specialite, taux in TauxRedevance.objects.values_list('medecin_id', 'specialite', 'taux'):
+            if medecin_id:
+                par_medecin[medecin_id] = taux
+            elif specialite.strip():
+                par_specialite.append((specialite.strip().lower(), taux))
+            else:
+                defaut = taux
+        # Le mot-clé le plus long (le plus précis) l'emporte.
+        par_specialite.sort(key=lambda regle: -len(regle[0]))
+        self._par_medecin, self._par_specialite, self._defaut = par_medecin, par_specialite, defaut
+        self._expiration = time.monotonic() + getattr(settings, 'REDEVANCE_CACHE_SECONDS', 300)
+
+    def taux(self, medecin):
+        with self._verrou:
+            if time.monotonic() >= self._expiration:
+                self._charger()
+            if not medecin:
+                return self._defaut
+            if medecin.pk in self._par_medecin:
+                return self._par_medecin[medecin.pk]
+            if (medecin.nom or '').strip().upper() in MEDECINS_SANS_REDEVANCE:
+                return Decimal('0.00')
+            specialite = (medecin.specialite or '').lower()
+            for mot_cle, taux in self._par_specialite:
+                if mot_cle in specialite:
+                    return taux
+            return self._defaut
+
+
+_regles = _ReglesRedevance()
+
+
+def taux_redevance(medecin):
+    """
+    Taux de redevance du médecin : règle du médecin, puis exemption du
+    titulaire (``MEDECINS_SANS_REDEVANCE``), puis règle de sa spécialité, puis
+    taux par défaut.
+    """
+    return _regles.taux(medecin)
+
+
+def invalider_taux():
+    _regles.invalider()
+
+
+def calculer_redevance(montant_brut, medecin):
+    """``(redevance, net)`` arrondis au centime pour un montant brut facturé par ``medecin``."""
+    montant_brut = Decimal(montant_brut or 0)
+    redevance = (montant_brut * taux_redevance(medecin)).quantize(CENTIMES, rounding=ROUND_HALF_UP)
+    return redevance, (montant_brut - redevance).quantize(CENTIMES, rounding=ROUND_HALF_UP)
+
+
+def _actes_fiche(evenement, medecins, lignes):
+    """Lignes ``ActeMedecin`` (non enregistrées) d'une fiche."""
+    actes = []
+    for field_name, act_label, flag_field, date_field, amount_field, act_code in ACTE_CONFIGS:
+        medecin = medecins.get(getattr(evenement, f'{field_name}_id'))
+        if not medecin or not getattr(evenement, flag_field, False):
+            continue
+
+        montant_brut = Decimal(getattr(evenement, amount_field, 0) or 0)
+        ligne = lignes.get((evenement.id, act_code))
+        if ligne and ligne.invoice.medecin_id != medecin.id:
+            ligne = None
+
+        if ligne:
+            redevance = ligne.redevance
+            montant_net = ligne.montant_net
+        else:
+            redevance, montant_net = calculer_redevance(montant_brut, medecin)
+
+        actes.append(ActeMedecin(
+            evenement_id=evenement.id,
+            medecin=medecin,
+            act_code=act_code,
+            act_label=act_label,
+            date_acte=getattr(evenement, date_field, None) or evenement.date_evenement,
+            montant_brut=montant_brut,
+            redevance=redevance,
+            montant_net=montant_net,
+            ligne_facture=ligne,
+        ))
+    return actes
+
+
+def synchroniser_evenements(evenements):
+    """Recalcule les lignes du grand livre pour une liste de fiches (requêtes groupées)."""
+    evenements = [e for e in evenements if e.pk]
+    if not evenements:
+        return 0
+
+    event_ids = [e.pk for e in evenements]
+    medecin_ids = {
+        getattr(e, f'{field_name}_id')
+        for e in evenements
+        for field_name, *_ in ACTE_CONFIGS
+    } - {None}
+    medecins = Medecin.objects.in_bulk(medecin_ids)
+    lignes = {
+        (ligne.evenement_id, ligne.act_code): ligne
+        for ligne in MedecinInvoiceLine.objects.select_related('invoice').filter(evenement_id__in=event_ids)
+    }
+
+    actes = [acte for e in evenements for acte in _actes_fiche(e, medecins, lignes)]
+    with transaction.atomic():
+        ActeMedecin.objects.filter(evenement_id__in=event_ids).delete()
+        ActeMedecin.objects.bulk_create(actes, batch_size=500)
+    return len(actes)
+
+
+def synchroniser_evenement_id(evenement_id):
+    evenement = FicheEvenement.objects.filter(pk=evenement_id).first()
+    if evenement:
+        synchroniser_evenements([evenement])
+
+
+def appliquer_ligne_facture(ligne):
+    """Reporte une ligne de facture médecin sur l'acte correspondant du grand livre."""
+    ActeMedecin.objects.filter(
+        evenement_id=ligne.evenement_id,
+        act_code=ligne.act_code,
+        medecin_id=ligne.invoice.medecin_id,
+    ).update(ligne_facture=ligne, redevance=ligne.redevance, montant_net=ligne.montant_net)
+
+
+def recalculer_medecin(medecin):
+    """Recalcule la redevance des actes non facturés d'un médecin (changement de spécialité ou de taux)."""
+    actes = list(ActeMedecin.objects.filter(medecin=medecin, ligne_facture__isnull=True))
+    for acte in actes:
+        acte.redevance, acte.montant_net = calculer_redevance(acte.montant_brut, medecin)
+    ActeMedecin.objects.bulk_update(actes, ['redevance', 'montant_net'], batch_size=500)
+
+
+def recalculer_tous_medecins():
+    """Recalcule les actes non facturés de tous les médecins concernés (changement de règle de taux)."""
+    medecin_ids = ActeMedecin.objects.filter(ligne_facture__isnull=True).values('medecin_id').distinct()
+    for medecin in Medecin.objects.filter(pk__in=medecin_ids):
+        recalculer_medecin(medecin)
@@ -0,0 +1,256 @@
+# expertise/instrumentation.py
+"""
+Mesure des requêtes HTTP : nombre et durée des requêtes SQL, durée de rendu
+des gabarits et latence totale.
+
+``MesureRequetesMiddleware`` publie ces mesures dans l'en-tête
+``Server-Timing``, journalise les requêtes lentes, contrôle le budget de
+requêtes SQL défini par nom d'URL (``QUERY_BUDGETS``) et cumule des
+statistiques par vue, écrites en base par lots (``StatistiqueVue``).
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.template.backends.django import DjangoTemplates
+from django.urls import reverse
+from django.utils import timezone
+
+logger = logging.getLogger('expertise.performance')
+
+# Mesures de la requête HTTP en cours (None hors requête).
+_mesures = contextvars.ContextVar('mesures_requete', default=None)
+
+
+class BudgetRequetesDepasse(AssertionError):
+    """Levée quand une vue dépasse son budget de requêtes SQL et que ``QUERY_BUDGET_STRICT`` est actif."""
+
+
+class _Mesures:
+    __slots__ = ('sql_requetes', 'sql_duree', 'template_duree', 'rendus')
+
+    def __init__(self):
+        self.sql_requetes = 0
+        self.sql_duree = 0.0
+        self.template_duree = 0.0
+        self.rendus = 0
+
+    def executer(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_duree += time.perf_counter() - debut
+            self.sql_requetes += 1
+
+
+# --- Rendu des gabarits ---
+
+class _TemplateChronometre:
+    """Enveloppe un gabarit du moteur Django et ajoute sa durée de rendu aux mesures en cours."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, nom):
+        return getattr(self._template, nom)
+
+    def render(self, context=None, request=None):
+        mesures = _mesures.get()
+        if mesures is None:
+            return self._template.render(context, request)
+        # Les gabarits inclus passent par le moteur, pas par ce wrapper : seul le rendu externe est compté.
+        debut = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            mesures.template_duree += time.perf_counter() - debut
+            mesures.rendus += 1
+
+
+class DjangoTemplatesChronometres(DjangoTemplates):
+    """Moteur ``DjangoTemplates`` dont les rendus sont chronométrés (voir ``TEMPLATES``)."""
+
+    def from_string(self, template_code):
+        return _TemplateChronometre(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TemplateChronometre(super().get_template(template_name))
+
+
+# --- Statistiques par vue ---
+
+class _Cumuls:
+    """Cumuls par vue du processus courant, écrits en base toutes les ``PERF_STATS_FLUSH_SECONDS``."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._par_vue = {}
+        self._dernier_envoi = time.monotonic()
+
+    def ajouter(self, vue, duree_ms, sql_requetes, sql_ms, template_ms, lente):
+        with self._verrou:
+            cumul = self._par_vue.setdefault(vue, {
+                'appels': 0, 'lentes': 0, 'duree_totale_ms': 0.0, 'duree_max_ms': 0.0,
+                'sql_requetes': 0, 'sql_requetes_max': 0, 'sql_duree_ms': 0.0, 'template_duree_ms': 0.0,
+            })
+            cumul['appels'] += 1
+            cumul['lentes'] += int(lente)
+            cumul['duree_totale_ms'] += duree_ms
+            cumul['duree_max_ms'] = max(cumul['duree_max_ms'], duree_ms)
+            cumul['sql_requetes'] += sql_requetes
+            cumul['sql_requetes_max'] = max(cumul['sql_requetes_max'], sql_requetes)
+            cumul['sql_duree_ms'] += sql_ms
+            cumul['template_duree_ms'] += template_ms
+
+            if time.monotonic() - self._dernier_envoi < getattr(settings, 'PERF_STATS_FLUSH_SECONDS', 60):
+                return None
+            a_envoyer, self._par_vue = self._par_vue, {}
+            self._dernier_envoi = time.monotonic()
+        return a_envoyer
+
+    def vider(self):
+        with self._verrou:
+            a_envoyer, self._par_vue = self._par_vue, {}
+            self._dernier_envoi = time.monotonic()
+        return a_envoyer
+
+
+_cumuls = _Cumuls()
+
+
+def enregistrer_statistiques(par_vue):
+    """Ajoute des cumuls ``{vue: {...}}`` à la table ``StatistiqueVue`` (une mise à jour par vue)."""
+    from .models import StatistiqueVue
+
+    maintenant = timezone.now()
+    for vue, cumul in par_vue.items():
+        increments = {
+            champ: F(champ) + valeur
+            for champ, valeur in cumul.items()
+            if champ not in ('duree_max_ms', 'sql_requetes_max')
+        }
+        mise_a_jour = {
+            **increments,
+            'duree_max_ms': Greatest(F('duree_max_ms'), cumul['duree_max_ms']),
+            'sql_requetes_max': Greatest(F('sql_requetes_max'), cumul['sql_requetes_max']),
+            'derniere_mesure': maintenant,
+        }
+        with transaction.atomic():
+            if StatistiqueVue.objects.filter(vue=vue).update(**mise_a_jour):
+                continue
+            try:
+                with transaction.atomic():
+                    StatistiqueVue.objects.create(vue=vue, derniere_mesure=maintenant, **cumul)
+            except IntegrityError:
+                # Créée entre-temps par un autre processus.
+                StatistiqueVue.objects.filter(vue=vue).update(**mise_a_jour)
+
+
+def envoyer_statistiques():
+    """Écrit immédiatement les cumuls en attente du processus courant."""
+    par_vue = _cumuls.vider()
+    if par_vue:
+        enregistrer_statistiques(par_vue)
+
+
+# --- Middleware ---
+
+def _nom_vue(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<non résolue>'
+
+
+class MesureRequetesMiddleware:
+    """
+    À placer en tête de ``MIDDLEWARE`` pour mesurer toute la chaîne.
+
+    Réglages : ``SLOW_REQUEST_MS`` (seuil du journal des requêtes lentes),
+    ``QUERY_BUDGETS`` (``{nom_url: nombre maximal de requêtes SQL}``),
+    ``QUERY_BUDGET_STRICT`` (lever ``BudgetRequetesDepasse`` au lieu de
+    journaliser), ``PERF_STATS_ENABLED`` et ``PERF_STATS_FLUSH_SECONDS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mesures = _Mesures()
+        jeton = _mesures.set(mesures)
+        debut = time.perf_counter()
+        try:
+            with ExitStack() as pile:
+                for connection in connections.all(initialized_only=False):
+                    pile.enter_context(connection.execute_wrapper(mesures.executer))
+                response = self.get_response(request)
+        finally:
+            _mesures.reset(jeton)
+        duree_ms = (time.perf_counter() - debut) * 1000
+
+        vue = _nom_vue(request)
+        sql_ms = mesures.sql_duree * 1000
+        template_ms = mesures.template_duree * 1000
+        response['Server-Timing'] = ', '.join([
+            # En-tête HTTP : descriptions en ASCII.
+            f'sql;dur={sql_ms:.1f};desc="SQL x{mesures.sql_requetes}"',
+            f'tpl;dur={template_ms:.1f};desc="Templates"',
+            f'total;dur={duree_ms:.1f}',
+        ])
+        response.mesures = {
+            'vue': vue,
+            'sql_requetes': mesures.sql_requetes,
+            'sql_ms': sql_ms,
+            'template_ms': template_ms,
+            'duree_ms': duree_ms,
+        }
+
+        lente = duree_ms >= getattr(settings, 'SLOW_REQUEST_MS', 1000)
+        if lente:
+            logger.warning(
+                "Requête lente %s %s (%s) : %.0f ms, %d requêtes SQL en %.0f ms, gabarits %.0f ms",
+                request.method, request.path, vue, duree_ms, mesures.sql_requetes, sql_ms, template_ms,
+            )
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(vue)
+        if budget is not None and mesures.sql_requetes > budget:
+            message = f"{vue} : {mesures.sql_requetes} requêtes SQL pour un budget de {budget} ({request.path})"
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise BudgetRequetesDepasse(message)
+            logger.warning("Budget de requêtes dépassé — %s", message)
+
+        if getattr(settings, 'PERF_STATS_ENABLED', True):
+            par_vue = _cumuls.ajouter(vue, duree_ms, mesures.sql_requetes, sql_ms, template_ms, lente)
+            if par_vue:
+                try:
+                    enregistrer_statistiques(par_vue)
+                except Exception:
+                    # Les statistiques ne doivent jamais faire échouer une réponse.
+                    logger.exception("Écriture des statistiques de performance impossible")
+        return response
+
+
+# --- Tests ---
+
+def verifier_budget(client, url_name, *args, budget=None, parametres=None, **kwargs):
+    """
+    GET sur ``url_name`` (paramètres de requête ``parametres``) avec le client
+    de test et vérifie le nombre de requêtes SQL par rapport à ``budget`` (par
+    défaut ``QUERY_BUDGETS[url_name]``).
+    Renvoie la réponse ; lève ``BudgetRequetesDepasse`` en cas de dépassement.
+    """
+    if budget is None:
+        budget = settings.QUERY_BUDGETS[url_name]
+    response = client.get(reverse(url_name, args=args, kwargs=kwargs), parametres)
+    mesures = response.mesures
+    if mesures['sql_requetes'] > budget:
+        raise BudgetRequetesDepasse(
+            f"{url_name} : {mesures['sql_requetes']} requêtes SQL pour un budget de {budget}"
+        )
+    return response
@@ -0,0 +1,163 @@
+# expertise/intake.py
+"""
+Import groupé de fiches événement (campagnes de visites d'une base entière).
+
+Chaque ligne est identifiée par le DN du personnel navigant ; les autres clés
+reprennent les noms de champs de ``FicheEvenement`` (les médecins sont donnés
+par leur identifiant). Les lignes invalides sont signalées sans interrompre
+l'import des autres.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from .honoraires import synchroniser_evenements
+from .models import CompteurFacture, FicheEvenement, Medecin, PersonnelNavigant
+
+MEDECIN_FIELDS = ('medecin_cempn', 'medecin_oph', 'medecin_orl', 'medecin_radio', 'medecin_labo')
+
+# Champs calculés ou attribués par l'application, jamais lus depuis le lot.
+EXCLUDED_FIELDS = {'id', 'personnel', 'bordereau', 'no_facture', 'total', 'paye_par_patient'}
+
+SIMPLE_FIELDS = [
+    field for field in FicheEvenement._meta.concrete_fields
+    if field.name not in EXCLUDED_FIELDS and field.name not in MEDECIN_FIELDS
+]
+
+BATCH_SIZE = 500
+
+VRAI = {'1', 't', 'true', 'vrai', 'oui', 'o', 'yes', 'y', 'x'}
+FAUX = {'0', 'f', 'false', 'faux', 'non', 'n', 'no'}
+
+
+def lire_lot(contenu, format_lot):
+    """Transforme un contenu CSV ou JSON (``str``) en liste de dictionnaires."""
+    if format_lot == 'json':
+        data = json.loads(contenu)
+        if isinstance(data, dict):
+            data = data.get('evenements', [])
+        if not isinstance(data, list) or not all(isinstance(ligne, dict) for ligne in data):
+            raise ValueError("Le JSON doit être une liste d'événements ou un objet {'evenements': [...]}.")
+        return data
+    if format_lot == 'csv':
+        return list(csv.DictReader(io.StringIO(contenu)))
+    raise ValueError(f"Format inconnu : {format_lot}")
+
+
+def _vide(valeur):
+    return valeur is None or (isinstance(valeur, str) and not valeur.strip())
+
+
+def _normaliser(field, brut):
+    if isinstance(brut, str):
+        brut = brut.strip()
+        if isinstance(field, models.BooleanField):
+            if brut.lower() in VRAI:
+                return True
+            if brut.lower() in FAUX:
+                return False
+    return brut
+
+
+def _construire_fiche(ligne, personnels, medecins):
+    erreurs = []
+
+    dn = str(ligne.get('dn') or '').strip()
+    personnel = personnels.get(dn)
+    if not dn:
+        erreurs.append("DN manquant.")
+    elif personnel is None:
+        erreurs.append(f"Aucun personnel navigant avec le DN {dn}.")
+
+    fiche = FicheEvenement(personnel=personnel)
+
+    for field in SIMPLE_FIELDS:
+        brut = ligne.get(field.name)
+        if _vide(brut):
+            if not field.has_default() and not field.null:
+                erreurs.append(f"{field.name} : champ obligatoire.")
+            continue
+        try:
+            valeur = field.to_python(_normaliser(field, brut))
+            field.validate(valeur, fiche)
+        except ValidationError as exc:
+            erreurs.append(f"{field.name} : {' '.join(exc.messages)}")
+            continue
+        setattr(fiche, field.attname, valeur)
+
+    for name in MEDECIN_FIELDS:
+        brut = ligne.get(name)
+        if _vide(brut):
+            continue
+        try:
+            medecin = medecins.get(int(brut))
+        except (TypeError, ValueError):
+            medecin = None
+        if medecin is None:
+            erreurs.append(f"{name} : médecin {brut} introuvable.")
+            continue
+        setattr(fiche, name, medecin)
+
+    if erreurs:
+        return None, erreurs
+
+    fiche.calculer_totaux()
+    return fiche, []
+
+
+def importer_evenements(lignes, dry_run=False):
+    """
+    Valide puis insère un lot d'événements en une transaction.
+
+    Renvoie ``{'valides', 'crees', 'factures', 'erreurs'}`` où ``erreurs`` liste
+    ``{'ligne', 'dn', 'erreurs'}`` pour chaque ligne rejetée.
+    Les numéros de ligne commencent à 1.
+    """
+    dns = {str(ligne.get('dn') or '').strip() for ligne in lignes}
+    personnels = PersonnelNavigant.objects.in_bulk([dn for dn in dns if dn], field_name='dn')
+
+    medecin_ids = set()
+    for ligne in lignes:
+        for name in MEDECIN_FIELDS:
+            try:
+                medecin_ids.add(int(ligne.get(name)))
+            except (TypeError, ValueError):
+                pass
+    medecins = Medecin.objects.in_bulk(medecin_ids)
+
+    fiches = []
+    erreurs = []
+    for numero, ligne in enumerate(lignes, start=1):
+        fiche, erreurs_ligne = _construire_fiche(ligne, personnels, medecins)
+        if erreurs_ligne:
+            erreurs.append({'ligne': numero, 'dn': ligne.get('dn'), 'erreurs': erreurs_ligne})
+        else:
+            fiches.append(fiche)
+
+    if dry_run or not fiches:
+        return {'valides': len(fiches), 'crees': 0, 'factures': [], 'erreurs': erreurs}
+
+    par_prefixe = defaultdict(list)
+    for fiche in fiches:
+        par_prefixe[CompteurFacture.prefixe_pour(fiche.date_evenement)].append(fiche)
+
+    with transaction.atomic():
+        for prefixe, groupe in par_prefixe.items():
+            premier = CompteurFacture.allouer(prefixe, len(groupe))
+            for offset, fiche in enumerate(groupe):
+                fiche.no_facture = CompteurFacture.formater(prefixe, premier + offset)
+        FicheEvenement.objects.bulk_create(fiches, batch_size=BATCH_SIZE)
+        # bulk_create ne déclenche pas les signaux : on alimente le grand livre ici.
+        synchroniser_evenements(fiches)
+
+    return {
+        'valides': len(fiches),
+        'crees': len(fiches),
+        'factures': [fiche.no_facture for fiche in fiches],
+        'erreurs': erreurs,
+    }
@@ -0,0 +1,191 @@
+# expertise/intake_personnels.py
+"""
+Import groupé de personnels navigants depuis un CSV (commande ``import_personnels``).
+
+Tout le fichier est validé colonne par colonne avec pandas ; les compagnies
+sont résolues en une requête, les DN comparés à l'existant, puis les
+créations et mises à jour sont appliquées par lots. Le format du rapport
+suit celui de ``expertise.intake.importer_evenements``.
+"""
+
+import pandas as pd
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import CompagnieAerienne, PersonnelNavigant
+from .recherche import indexer
+
+BATCH_SIZE = 500
+
+CHAMPS_MIS_A_JOUR = ['nom', 'prenom', 'compagnie_id', 'date_de_naissance', 'sexe', 'statut_pn']
+FORMATS_DATE = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y']
+
+
+def lire_personnels(chemin, separateur=','):
+    """Charge le CSV en texte brut (aucune conversion implicite : les DN gardent leurs zéros)."""
+    df = pd.read_csv(chemin, sep=separateur, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    df.columns = [str(colonne).strip().lower() for colonne in df.columns]
+    return df
+
+
+def _choix(field_name):
+    """Valeurs acceptées (clé ou libellé, sans casse) -> clé enregistrée."""
+    choix = {}
+    for cle, libelle in PersonnelNavigant._meta.get_field(field_name).choices:
+        choix[cle.lower()] = cle
+        choix[str(libelle).lower()] = cle
+    return choix
+
+
+def _dates(colonne):
+    dates = pd.Series(pd.NaT, index=colonne.index, dtype='datetime64[ns]')
+    for format_date in FORMATS_DATE:
+        dates = dates.fillna(pd.to_datetime(colonne, format=format_date, errors='coerce'))
+    return dates
+
+
+def _compagnies(df, compagnie_defaut):
+    """Identifiant de compagnie par ligne (``compagnie_id`` ou code IATA ``compagnie``), en une requête."""
+    compagnies = list(CompagnieAerienne.objects.values_list('id', 'iata'))
+    par_id = {str(pk): pk for pk, _ in compagnies}
+    par_iata = {iata.upper(): pk for pk, iata in compagnies}
+
+    resolues = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    if 'compagnie_id' in df:
+        resolues = resolues.fillna(df['compagnie_id'].map(par_id).astype('Int64'))
+    if 'compagnie' in df:
+        resolues = resolues.fillna(df['compagnie'].str.upper().map(par_iata).astype('Int64'))
+
+    saisie = pd.Series('', index=df.index)
+    for colonne in ('compagnie_id', 'compagnie'):
+        if colonne in df:
+            saisie = saisie.where(saisie != '', df[colonne])
+
+    if compagnie_defaut is not None:
+        resolues = resolues.where(~((saisie == '') & resolues.isna()), compagnie_defaut)
+    return resolues, saisie
+
+
+def valider_personnels(df, compagnie_defaut=None, completer_dn=False):
+    """
+    Valide ``df`` et renvoie ``(propres, erreurs)`` : les lignes valides,
+    normalisées, et la liste ``{'ligne', 'dn', 'erreurs'}`` des lignes rejetées
+    (numérotées à partir de 1).
+    """
+    manquantes = {'dn', 'nom', 'prenom'} - set(df.columns)
+    if manquantes:
+        raise ValueError(f"Colonne(s) manquante(s) : {', '.join(sorted(manquantes))}.")
+    if compagnie_defaut is None and not {'compagnie_id', 'compagnie'} & set(df.columns):
+        raise ValueError("Colonne compagnie_id ou compagnie (code IATA) manquante.")
+
+    df = df.apply(lambda colonne: colonne.str.strip())
+    vide = pd.Series('', index=df.index)
+    problemes = []
+
+    dn = df['dn']
+    if completer_dn:
+        dn = dn.where(~dn.str.fullmatch(r'\d{1,6}'), dn.str.zfill(7))
+    dn_valide = dn.str.fullmatch(r'\d{7}')
+    problemes.append((~dn_valide, "DN invalide : 7 chiffres attendus."))
+    problemes.append((
+        dn_valide & dn.duplicated(keep='last'),
+        "DN en double dans le fichier : seule la dernière occurrence est importée.",
+    ))
+
+    for champ in ('nom', 'prenom'):
+        longueur = PersonnelNavigant._meta.get_field(champ).max_length
+        problemes.append((df[champ] == '', f"{champ} : champ obligatoire."))
+        problemes.append((df[champ].str.len() > longueur, f"{champ} : {longueur} caractères maximum."))
+
+    naissance_brute = df.get('date_de_naissance', vide)
+    naissance = _dates(naissance_brute)
+    problemes.append((
+        (naissance_brute != '') & naissance.isna(),
+        "date_de_naissance : date invalide (AAAA-MM-JJ ou JJ/MM/AAAA).",
+    ))
+
+    sexe_brut = df.get('sexe', vide)
+    sexe = sexe_brut.str.lower().map(_choix('sexe'))
+    problemes.append(((sexe_brut != '') & sexe.isna(), "sexe : M ou F attendu."))
+
+    statut_brut = df.get('statut_pn', vide)
+    statut = statut_brut.str.lower().map(_choix('statut_pn'))
+    statuts = ', '.join(cle for cle, _ in PersonnelNavigant._meta.get_field('statut_pn').choices)
+    problemes.append(((statut_brut != '') & statut.isna(), f"statut_pn : valeur attendue parmi {statuts}."))
+
+    compagnie, compagnie_saisie = _compagnies(df, compagnie_defaut)
+    problemes.append(((compagnie_saisie == '') & compagnie.isna(), "compagnie : champ obligatoire."))
+    problemes.append(((compagnie_saisie != '') & compagnie.isna(), "compagnie : compagnie inconnue."))
+
+    messages = {}
+    for masque, message in problemes:
+        for index in masque[masque.fillna(False)].index:
+            messages.setdefault(index, []).append(message)
+    erreurs = [
+        {'ligne': position + 1, 'dn': df.at[index, 'dn'], 'erreurs': messages[index]}
+        for position, index in enumerate(df.index)
+        if index in messages
+    ]
+
+    propres = pd.DataFrame({
+        'dn': dn,
+        'nom': df['nom'],
+        'prenom': df['prenom'],
+        'compagnie_id': compagnie,
+        'date_de_naissance': naissance.dt.date,
+        'sexe': sexe,
+        'statut_pn': statut,
+    }).drop(index=list(messages))
+    propres = propres.astype(object).where(propres.notna(), None)
+    return propres, erreurs
+
+
+def importer_personnels(df, dry_run=False, compagnie_defaut=None, completer_dn=False):
+    """
+    Crée ou met à jour les personnels de ``df`` (clé : DN) en une transaction.
+
+    Renvoie ``{'valides', 'crees', 'mis_a_jour', 'inchanges', 'erreurs'}``.
+    """
+    propres, erreurs = valider_personnels(df, compagnie_defaut, completer_dn)
+    existants = PersonnelNavigant.objects.in_bulk(list(propres['dn']), field_name='dn')
+
+    a_creer = []
+    # Regroupés par champs modifiés : bulk_update ne réécrit que ceux-là.
+    a_modifier = defaultdict(list)
+    renommes = []
+    inchanges = 0
+    for ligne in propres.to_dict('records'):
+        personnel = existants.get(ligne['dn'])
+        if personnel is None:
+            a_creer.append(PersonnelNavigant(**ligne))
+            continue
+        modifies = [champ for champ in CHAMPS_MIS_A_JOUR if getattr(personnel, champ) != ligne[champ]]
+        if not modifies:
+            inchanges += 1
+            continue
+        for champ in modifies:
+            setattr(personnel, champ, ligne[champ])
+        a_modifier[tuple(modifies)].append(personnel)
+        if {'nom', 'prenom'} & set(modifies):
+            renommes.append(personnel)
+
+    rapport = {
+        'valides': len(propres),
+        'crees': len(a_creer),
+        'mis_a_jour': sum(len(groupe) for groupe in a_modifier.values()),
+        'inchanges': inchanges,
+        'erreurs': erreurs,
+    }
+    if dry_run:
+        return rapport
+
+    with transaction.atomic():
+        PersonnelNavigant.objects.bulk_create(a_creer, batch_size=BATCH_SIZE)
+        for champs, groupe in a_modifier.items():
+            PersonnelNavigant.objects.bulk_update(groupe, list(champs), batch_size=BATCH_SIZE)
+        # Les opérations groupées ne déclenchent pas les signaux : index de recherche à jour ici.
+        indexer(a_creer, nouveaux=True)
+        indexer(renommes)
+
+    return rapport
@@ -0,0 +1,149 @@
+# expertise/jobs.py
+"""
+File locale de génération de documents, stockée dans la table ``TacheDocument``.
+
+Les vues enregistrent une tâche avec ``planifier`` et rendent la main
+immédiatement ; la commande ``run_document_worker`` réserve les tâches une à une,
+construit le document et le dépose dans le stockage média.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.files.base import ContentFile, File
+from django.utils import timezone
+
+from .models import TacheDocument
+
+logger = logging.getLogger(__name__)
+
+# Pas minimal (en %) entre deux écritures de la progression en base.
+PAS_PROGRESSION = 5
+
+
+def _constructeurs():
+    # Import différé : views importe ce module pour planifier les tâches.
+    from . import views
+
+    return {
+        'bordereau_docx': views._construire_bordereau_docx,
+        'bordereau_pdf': views._construire_bordereau_pdf,
+        'facture_medecin_bordereau_pdf': views._construire_facture_medecin_bordereau_pdf,
+        'facture_intervenant_pdf': views._construire_facture_intervenant_pdf,
+        'factures_intervenant_zip': views._construire_factures_intervenant_zip,
+        'factures_impression_pdf': views._construire_factures_impression_pdf,
+    }
+
+
+def planifier(type_document, utilisateur=None, **parametres):
+    """
+    Enregistre une tâche de génération et la renvoie.
+
+    Une tâche identique du même utilisateur encore en attente ou en cours est
+    réutilisée, ce qui absorbe les doubles clics ; les documents ne sont
+    visibles que de leur créateur (et du staff), ils ne sont donc pas partagés.
+    """
+    if utilisateur is not None and not utilisateur.is_authenticated:
+        utilisateur = None
+    existante = (
+        TacheDocument.objects
+        .filter(
+            type_document=type_document,
+            parametres=parametres,
+            statut__in=[TacheDocument.EN_ATTENTE, TacheDocument.EN_COURS],
+            cree_par=utilisateur,
+        )
+        .order_by('created_at')
+        .first()
+    )
+    if existante:
+        return existante
+
+    return TacheDocument.objects.create(
+        type_document=type_document,
+        parametres=parametres,
+        cree_par=utilisateur,
+    )
+
+
+def reserver_prochaine():
+    """Passe la plus ancienne tâche en attente à l'état « en cours » et la renvoie (ou ``None``)."""
+    while True:
+        pk = (
+            TacheDocument.objects
+            .filter(statut=TacheDocument.EN_ATTENTE)
+            .order_by('created_at', 'pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        # UPDATE conditionnel : un seul worker peut gagner la réservation.
+        reservee = TacheDocument.objects.filter(pk=pk, statut=TacheDocument.EN_ATTENTE).update(
+            statut=TacheDocument.EN_COURS,
+            started_at=timezone.now(),
+            progression=0,
+        )
+        if reservee:
+            return TacheDocument.objects.get(pk=pk)
+
+
+def executer(tache):
+    """Construit le document d'une tâche réservée et enregistre le résultat."""
+    constructeur = _constructeurs().get(tache.type_document)
+    derniere = [0]
+
+    def progression(fait, total):
+        pourcentage = min(99, int(fait * 100 / total)) if total else 0
+        if pourcentage - derniere[0] >= PAS_PROGRESSION:
+            derniere[0] = pourcentage
+            TacheDocument.objects.filter(pk=tache.pk).update(progression=pourcentage)
+
+    try:
+        if constructeur is None:
+            raise ValueError(f"Type de document inconnu : {tache.type_document}")
+        contenu, nom_fichier, content_type = constructeur(progression=progression, **tache.parametres)
+    except Exception as exc:
+        logger.exception("Échec de la tâche document %s", tache.pk)
+        tache.statut = TacheDocument.ECHEC
+        tache.message = str(exc)
+        tache.finished_at = timezone.now()
+        tache.save(update_fields=['statut', 'message', 'finished_at'])
+        return tache
+
+    # Les constructeurs renvoient des octets ou un fichier temporaire ouvert.
+    fichier = ContentFile(contenu) if isinstance(contenu, bytes) else File(contenu)
+    try:
+        tache.fichier.save(nom_fichier, fichier, save=False)
+    finally:
+        fichier.close()
+    tache.nom_fichier = nom_fichier
+    tache.content_type = content_type
+    tache.statut = TacheDocument.TERMINEE
+    tache.progression = 100
+    tache.finished_at = timezone.now()
+    tache.save(update_fields=['fichier', 'nom_fichier', 'content_type', 'statut', 'progression', 'finished_at'])
+    return tache
+
+
+def relancer_bloquees(delai):
+    """Remet en attente les tâches « en cours » depuis plus de ``delai`` (worker arrêté en route)."""
+    return TacheDocument.objects.filter(
+        statut=TacheDocument.EN_COURS,
+        started_at__lt=timezone.now() - delai,
+    ).update(statut=TacheDocument.EN_ATTENTE, started_at=None, progression=0)
+
+
+def purger(jours):
+    """Supprime les tâches terminées depuis plus de ``jours`` jours, fichiers compris."""
+    anciennes = TacheDocument.objects.filter(
+        statut__in=[TacheDocument.TERMINEE, TacheDocument.ECHEC],
+        finished_at__lt=timezone.now() - timedelta(days=jours),
+    )
+    nombre = 0
+    for tache in anciennes.iterator():
+        if tache.fichier:
+            tache.fichier.delete(save=False)
+        tache.delete()
+        nombre += 1
+    return nombre
@@ -1,45 +1,194 @@
 from __future__ import annotations
 
+import glob
+import gzip
+import re
 import shutil
+import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+
+
+def _remove_sidecars(path: Path) -> None:
+    for suffix in SQLITE_SIDECARS:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def _read_only_uri(path: Path) -> str:
+    # as_uri() percent-encodes "?", "#" and "%" so they cannot be read as URI syntax.
+    return f"{path.resolve().as_uri()}?mode=ro"
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
 
 
 class Command(BaseCommand):
-    help = "Backup the SQLite database and keep the last three daily snapshots."
+    help = (
+        "Backup the SQLite database with the online backup API, verify it with PRAGMA integrity_check, "
+        "optionally gzip it, and prune old snapshots with a daily/weekly/monthly retention policy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dest",
+            default=getattr(settings, "BACKUP_DIR", str(Path(settings.BASE_DIR) / "backups")),
+            help="Directory receiving the snapshots.",
+        )
+        parser.add_argument("--compress", action="store_true", help="Gzip the verified snapshot.")
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=1024,
+            help="Pages copied per backup step; writers are only blocked during a step.",
+        )
+        parser.add_argument(
+            "--step-sleep",
+            type=float,
+            default=0.05,
+            help="Seconds to pause between backup steps so writers can proceed.",
+        )
+        parser.add_argument("--keep-daily", type=int, default=getattr(settings, "BACKUP_KEEP_DAILY", 7))
+        parser.add_argument("--keep-weekly", type=int, default=getattr(settings, "BACKUP_KEEP_WEEKLY", 4))
+        parser.add_argument("--keep-monthly", type=int, default=getattr(settings, "BACKUP_KEEP_MONTHLY", 6))
 
     def handle(self, *args, **options):
-        database_name = settings.DATABASES.get("default", {}).get("NAME")
+        database = settings.DATABASES.get("default", {})
+        if "sqlite3" not in database.get("ENGINE", ""):
+            raise CommandError("backup_db only supports the SQLite backend.")
+
+        database_name = database.get("NAME")
         if not database_name:
-            self.stderr.write(self.style.ERROR("No default database path found in settings."))
-            return
+            raise CommandError("No default database path found in settings.")
 
         db_path = Path(database_name)
         if not db_path.exists():
-            self.stderr.write(self.style.ERROR(f"Database file not found: {db_path}"))
-            return
+            raise CommandError(f"Database file not found: {db_path}")
 
-        backups_root = Path(settings.BASE_DIR) / "backups"
+        backups_root = Path(options["dest"])
         backups_root.mkdir(parents=True, exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"{db_path.stem}_{timestamp}{db_path.suffix}"
-        backup_path = backups_root / backup_name
+        started = time.perf_counter()
+        backup_path = self._free_path(backups_root, db_path, datetime.now().strftime(TIMESTAMP_FORMAT))
+        partial_path = backup_path.with_name(backup_path.name + ".partial")
+
+        try:
+            self._copy(db_path, partial_path, options["pages"], options["step_sleep"])
+            self._verify(partial_path)
+            _remove_sidecars(partial_path)
+            if options["compress"]:
+                backup_path = backup_path.with_name(backup_path.name + ".gz")
+                with partial_path.open("rb") as source, gzip.open(backup_path, "wb", compresslevel=6) as target:
+                    shutil.copyfileobj(source, target, length=1024 * 1024)
+                partial_path.unlink()
+            else:
+                partial_path.replace(backup_path)
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            _remove_sidecars(partial_path)
+            raise
+
+        elapsed = time.perf_counter() - started
+        source_size = db_path.stat().st_size
+        backup_size = backup_path.stat().st_size
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backup created: {backup_path} ({_format_size(backup_size)} from {_format_size(source_size)} "
+                f"database) in {elapsed:.2f}s."
+            )
+        )
+
+        self._prune(backups_root, db_path, keep={
+            "daily": options["keep_daily"],
+            "weekly": options["keep_weekly"],
+            "monthly": options["keep_monthly"],
+        }, current=backup_path)
+
+    def _free_path(self, backups_root: Path, db_path: Path, timestamp: str) -> Path:
+        # Timestamps have one-second resolution: later runs within the same second get _1, _2, ...
+        # numbered past any file left for that second, so the sequence keeps the creation order.
+        prefix = f"{db_path.stem}_{timestamp}"
+        pattern = re.compile(rf"{re.escape(prefix)}(?:_(\d+))?{re.escape(db_path.suffix)}(\.gz|\.partial)?")
+        taken = [
+            int(match.group(1) or 0)
+            for path in backups_root.glob(f"{glob.escape(prefix)}*")
+            if (match := pattern.fullmatch(path.name))
+        ]
+        if not taken:
+            return backups_root / f"{prefix}{db_path.suffix}"
+        return backups_root / f"{prefix}_{max(taken) + 1}{db_path.suffix}"
+
+    def _copy(self, db_path: Path, target_path: Path, pages: int, step_sleep: float) -> None:
+        source = sqlite3.connect(_read_only_uri(db_path), uri=True)
+        target = sqlite3.connect(target_path)
+        try:
+            # Incremental copy: the source is only read-locked while each step runs.
+            source.backup(target, pages=max(pages, 1), sleep=step_sleep)
+            # The copy inherits the source journal mode (WAL in production); a snapshot must be a single file.
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
 
-        shutil.copy2(db_path, backup_path)
-        self.stdout.write(self.style.SUCCESS(f"Backup created: {backup_path}"))
+    def _verify(self, path: Path) -> None:
+        connection = sqlite3.connect(_read_only_uri(path), uri=True)
+        try:
+            rows = connection.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            connection.close()
+        if rows != [("ok",)]:
+            problems = "; ".join(row[0] for row in rows[:5])
+            raise CommandError(f"Integrity check failed for {path}: {problems}")
 
-        pattern = f"{db_path.stem}_*{db_path.suffix}"
-        existing_backups = sorted(
-            backups_root.glob(pattern),
-            key=lambda item: item.stat().st_mtime,
-            reverse=True,
+    def _prune(self, backups_root: Path, db_path: Path, keep: dict[str, int], current: Path) -> None:
+        snapshots = []
+        # Only <stem>_<timestamp>[_<n>]<suffix>[.gz]: partial copies and SQLite sidecars never count as snapshots.
+        pattern = re.compile(
+            rf"{re.escape(db_path.stem)}_(\d{{8}}_\d{{6}})(?:_(\d+))?{re.escape(db_path.suffix)}(\.gz)?"
         )
+        for path in backups_root.iterdir():
+            match = pattern.fullmatch(path.name)
+            if not match:
+                continue
+            try:
+                moment = datetime.strptime(match.group(1), TIMESTAMP_FORMAT)
+            except ValueError:
+                continue
+            snapshots.append((moment, int(match.group(2) or 0), path))
+        snapshots.sort(reverse=True)
+
+        # Grandfather-father-son: newest snapshot of each of the last N days, ISO weeks and months.
+        periods = {
+            "daily": lambda moment: moment.date(),
+            "weekly": lambda moment: moment.isocalendar()[:2],
+            "monthly": lambda moment: (moment.year, moment.month),
+        }
+        kept = {current}
+        for name, period in periods.items():
+            seen = []
+            for moment, _, path in snapshots:
+                key = period(moment)
+                if key in seen:
+                    continue
+                if len(seen) >= keep[name]:
+                    break
+                seen.append(key)
+                kept.add(path)
 
-        for outdated in existing_backups[3:]:
+        for _, _, outdated in snapshots:
+            if outdated in kept:
+                continue
             try:
                 outdated.unlink()
                 self.stdout.write(f"Removed old backup: {outdated}")
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from expertise.bordereau_docx import MODELE, construire_modele
+
+
+class Command(BaseCommand):
+    help = "Regenerate the Word template used for bordereau DOCX documents (letterhead, styles, table layout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=str(MODELE), help=f"Template path (default: {MODELE}).")
+
+    def handle(self, *args, **options):
+        chemin = construire_modele(Path(options["output"]))
+        self.stdout.write(self.style.SUCCESS(f"Template written to {chemin} ({chemin.stat().st_size} bytes)."))
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ROWS = 2000
+
+
+def _connect(path: str, options: dict) -> sqlite3.Connection:
+    """Open a connection the way Django's SQLite backend would with these OPTIONS."""
+    connection = sqlite3.connect(path, timeout=options.get("timeout", 5), isolation_level=None)
+    for statement in options.get("init_command", "").split(";"):
+        if statement.strip():
+            connection.execute(statement)
+    return connection
+
+
+def _writer(path: str, options: dict, deadline: float, hold: float, results) -> None:
+    connection = _connect(path, options)
+    begin = f"BEGIN {options['transaction_mode']}" if options.get("transaction_mode") else "BEGIN"
+    done = locked = 0
+    worst = 0.0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.execute(begin)
+            # Read-then-write, like toggling a payment after loading the bordereau.
+            connection.execute("SELECT paye FROM ligne WHERE id = ?", (random.randint(1, ROWS),)).fetchone()
+            connection.execute("UPDATE ligne SET paye = 1 - paye WHERE id = ?", (random.randint(1, ROWS),))
+            time.sleep(hold)
+            connection.execute("COMMIT")
+            done += 1
+        except sqlite3.OperationalError as exc:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            locked += 1
+        worst = max(worst, time.perf_counter() - started)
+    connection.close()
+    results.put(("write", done, locked, worst))
+
+
+def _reader(path: str, options: dict, deadline: float, hold: float, results) -> None:
+    connection = _connect(path, options)
+    done = locked = 0
+    worst = 0.0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            # A long read transaction, like assembling a bordereau document.
+            connection.execute("BEGIN")
+            connection.execute("SELECT SUM(montant), COUNT(*) FROM ligne WHERE paye = 1").fetchone()
+            time.sleep(hold)
+            connection.execute("SELECT SUM(montant) FROM ligne").fetchone()
+            connection.execute("COMMIT")
+            done += 1
+        except sqlite3.OperationalError as exc:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            if "locked" not in str(exc) and "busy" not in str(exc):
+                raise
+            locked += 1
+        worst = max(worst, time.perf_counter() - started)
+    connection.close()
+    results.put(("read", done, locked, worst))
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent writer and reader processes against a scratch SQLite file, once with the default "
+        "connection settings and once with SQLITE_PRODUCTION_OPTIONS, and report throughput and lock errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run.")
+        parser.add_argument("--write-hold", type=float, default=0.005, help="Seconds a writer keeps its transaction.")
+        parser.add_argument("--read-hold", type=float, default=0.2, help="Seconds a reader keeps its transaction.")
+
+    def handle(self, *args, **options):
+        profiles = {
+            "default": {"timeout": 5},
+            "production": settings.SQLITE_PRODUCTION_OPTIONS,
+        }
+        for name, profile in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / "concurrency.sqlite3")
+                self._seed(path, profile)
+                self._run(name, path, profile, options)
+
+    def _seed(self, path: str, profile: dict) -> None:
+        connection = _connect(path, profile)
+        connection.execute("CREATE TABLE ligne (id INTEGER PRIMARY KEY, montant INTEGER NOT NULL, paye INTEGER NOT NULL)")
+        connection.executemany(
+            "INSERT INTO ligne (id, montant, paye) VALUES (?, ?, 0)",
+            ((pk, random.randint(1000, 50000)) for pk in range(1, ROWS + 1)),
+        )
+        connection.close()
+
+    def _run(self, name: str, path: str, profile: dict, options: dict) -> None:
+        results = multiprocessing.Queue()
+        deadline = time.time() + options["seconds"]
+        processes = [
+            multiprocessing.Process(target=_writer, args=(path, profile, deadline, options["write_hold"], results))
+            for _ in range(options["writers"])
+        ] + [
+            multiprocessing.Process(target=_reader, args=(path, profile, deadline, options["read_hold"], results))
+            for _ in range(options["readers"])
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Profile: {name}"))
+        for kind in ("write", "read"):
+            rows = [row for row in collected if row[0] == kind]
+            done = sum(row[1] for row in rows)
+            locked = sum(row[2] for row in rows)
+            worst = max((row[3] for row in rows), default=0.0)
+            style = self.style.SUCCESS if not locked else self.style.ERROR
+            self.stdout.write(
+                style(
+                    f"  {kind}s: {done} committed ({done / options['seconds']:.0f}/s), "
+                    f"{locked} 'database is locked', worst latency {worst * 1000:.0f} ms"
+                )
+            )
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+SOURCE_ALIAS = "sqlite_source"
+
+
+def _timestamp_fields(model) -> list:
+    return [
+        field for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+
+
+@contextmanager
+def _frozen_timestamps(model):
+    """Disable auto_now/auto_now_add while copying, so bulk_create keeps the source values."""
+    fields = [(field, field.auto_now, field.auto_now_add) for field in _timestamp_fields(model)]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every table of an existing SQLite file into the configured database (e.g. PostgreSQL), "
+        "keeping primary keys. Run `migrate` on the target first; its existing rows are replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=str(Path(settings.BASE_DIR) / "db.sqlite3"),
+            help="SQLite file to copy from (default: db.sqlite3).",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Target database alias.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows read and inserted per batch.")
+        parser.add_argument("--no-input", action="store_true", help="Do not ask for confirmation.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"]).resolve()
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        target = options["database"]
+        target_settings = connections[target].settings_dict
+        if target_settings["ENGINE"].endswith("sqlite3") and Path(target_settings["NAME"]).resolve() == path:
+            raise CommandError("The source file is the target database.")
+
+        if not options["no_input"]:
+            answer = input(f"All rows of database '{target}' ({target_settings['NAME']}) will be replaced. Continue? [y/N] ")
+            if answer.strip().lower() not in ("y", "yes"):
+                self.stdout.write("Aborted.")
+                return
+
+        # Temporary alias for the source file, configured like any other database.
+        configured = connections.configure_settings({
+            **settings.DATABASES,
+            SOURCE_ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": str(path)},
+        })
+        connections.settings[SOURCE_ALIAS] = configured[SOURCE_ALIAS]
+
+        for alias, role in ((SOURCE_ALIAS, "source"), (target, "target")):
+            executor = MigrationExecutor(connections[alias])
+            if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+                connections[SOURCE_ALIAS].close()
+                raise CommandError(
+                    f"The {role} database has unapplied migrations; run `migrate` on it first "
+                    "(for the source, on a copy of the file)."
+                )
+
+        started = time.perf_counter()
+        models = [
+            model for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+        ]
+        connection = connections[target]
+        try:
+            # Foreign keys are created DEFERRABLE INITIALLY DEFERRED: they are checked at commit,
+            # so tables can be loaded in any order inside one transaction.
+            with transaction.atomic(using=target):
+                tables = [model._meta.db_table for model in models]
+                with connection.cursor() as cursor:
+                    for sql in connection.ops.sql_flush(no_style(), tables, allow_cascade=True):
+                        cursor.execute(sql)
+
+                total = 0
+                for model in models:
+                    copied = self._copy_model(model, target, options["chunk_size"])
+                    total += copied
+                    if copied:
+                        self.stdout.write(f"{model._meta.label}: {copied} row(s)")
+
+                with connection.cursor() as cursor:
+                    for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                        cursor.execute(sql)
+        finally:
+            connections[SOURCE_ALIAS].close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{total} row(s) in {len(models)} table(s) copied in {elapsed:.2f}s."))
+
+    def _copy_model(self, model, target, chunk_size):
+        source_rows = model._base_manager.using(SOURCE_ALIAS).order_by("pk")
+        expected = source_rows.count()
+        if not expected:
+            return 0
+
+        copied = 0
+        batch = []
+        with _frozen_timestamps(model):
+            for instance in source_rows.iterator(chunk_size=chunk_size):
+                batch.append(instance)
+                if len(batch) >= chunk_size:
+                    model._base_manager.using(target).bulk_create(batch, batch_size=chunk_size)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                model._base_manager.using(target).bulk_create(batch)
+                copied += len(batch)
+
+        if model._base_manager.using(target).count() != expected:
+            raise CommandError(f"{model._meta.label}: row count mismatch after copy.")
+        self._check_timestamps(model, target, chunk_size)
+        return copied
+
+    def _check_timestamps(self, model, target, chunk_size):
+        """Compare auto_now/auto_now_add columns row by row between source and target."""
+        names = [field.name for field in _timestamp_fields(model)]
+        if not names:
+            return
+        rows = [
+            model._base_manager.using(alias).order_by("pk").values_list("pk", *names).iterator(chunk_size=chunk_size)
+            for alias in (SOURCE_ALIAS, target)
+        ]
+        try:
+            for source_row, target_row in zip(*rows):
+                if source_row != target_row:
+                    raise CommandError(
+                        f"{model._meta.label} #{source_row[0]}: timestamps changed during copy "
+                        f"({source_row[1:]} -> {target_row[1:]})."
+                    )
+        finally:
+            for iterator in rows:
+                iterator.close()
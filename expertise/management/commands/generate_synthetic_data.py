@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expertise.models import FicheEvenement
+from expertise.synthetique import generer
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset (companies, crew, doctors, events over several years, "
+        "bordereaux and doctor invoices) in the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=8)
+        parser.add_argument("--crew", type=int, default=2000)
+        parser.add_argument("--doctors", type=int, default=12)
+        parser.add_argument("--events", type=int, default=10000)
+        parser.add_argument("--years", type=int, default=3, help="Events are spread over this many past years.")
+        parser.add_argument("--invoices-per-doctor", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Add the synthetic data even if the database already contains events.",
+        )
+
+    def handle(self, *args, **options):
+        if FicheEvenement.objects.exists() and not options["force"]:
+            raise CommandError("The database already contains events; use --force to add synthetic data anyway.")
+
+        started = time.perf_counter()
+        counts = generer(
+            compagnies=options["companies"],
+            personnels=options["crew"],
+            medecins=options["doctors"],
+            evenements=options["events"],
+            annees=options["years"],
+            factures_par_medecin=options["invoices_per_doctor"],
+            graine=options["seed"],
+        )
+        elapsed = time.perf_counter() - started
+
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {elapsed:.2f}s."))
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expertise.intake import importer_evenements, lire_lot
+
+
+class Command(BaseCommand):
+    help = "Import a CSV/JSON batch of FicheEvenement rows keyed by DN in a single transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file to import.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="Input format (defaults to the file extension).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate the batch without writing anything.")
+        parser.add_argument("--report", help="Write the full JSON report (created invoices, row errors) to this file.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        format_lot = options["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+        try:
+            lignes = lire_lot(path.read_text(encoding="utf-8-sig"), format_lot)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        started = time.perf_counter()
+        rapport = importer_evenements(lignes, dry_run=options["dry_run"])
+        elapsed = time.perf_counter() - started
+
+        for erreur in rapport["erreurs"]:
+            self.stderr.write(
+                self.style.WARNING(f"Row {erreur['ligne']} (DN {erreur['dn']}): {'; '.join(erreur['erreurs'])}")
+            )
+
+        if options["report"]:
+            Path(options["report"]).write_text(json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        verb = "validated" if options["dry_run"] else "created"
+        count = rapport["valides"] if options["dry_run"] else rapport["crees"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{count} event(s) {verb}, {len(rapport['erreurs'])} rejected, in {elapsed:.2f}s."
+            )
+        )
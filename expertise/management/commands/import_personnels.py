@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expertise.intake_personnels import importer_personnels, lire_personnels
+from expertise.models import CompagnieAerienne
+
+
+class Command(BaseCommand):
+    help = "Create or update PersonnelNavigant rows from a CSV keyed by DN, validated as a whole before writing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with dn, nom, prenom and compagnie_id or compagnie (IATA) columns.")
+        parser.add_argument("--delimiter", default=",", help="CSV field delimiter (default: ',').")
+        parser.add_argument(
+            "--default-company",
+            metavar="IATA",
+            help="Company (IATA code) for rows that have none, e.g. ZZZ.",
+        )
+        parser.add_argument(
+            "--zero-pad-dn",
+            action="store_true",
+            help="Left-pad numeric DNs shorter than 7 digits with zeros (leading zeros lost by spreadsheets).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate and diff the file without writing anything.")
+        parser.add_argument("--report", help="Write the full JSON report (counts, row errors) to this file.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        compagnie_defaut = None
+        if options["default_company"]:
+            compagnie = CompagnieAerienne.objects.filter(iata__iexact=options["default_company"]).first()
+            if compagnie is None:
+                raise CommandError(f"Unknown company IATA code: {options['default_company']}")
+            compagnie_defaut = compagnie.pk
+
+        started = time.perf_counter()
+        try:
+            df = lire_personnels(path, options["delimiter"])
+            rapport = importer_personnels(
+                df,
+                dry_run=options["dry_run"],
+                compagnie_defaut=compagnie_defaut,
+                completer_dn=options["zero_pad_dn"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+
+        for erreur in rapport["erreurs"]:
+            self.stderr.write(
+                self.style.WARNING(f"Row {erreur['ligne']} (DN {erreur['dn']}): {'; '.join(erreur['erreurs'])}")
+            )
+
+        if options["report"]:
+            Path(options["report"]).write_text(json.dumps(rapport, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        prefix = "Dry run: would have" if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {rapport['crees']} created, {rapport['mis_a_jour']} updated, "
+                f"{rapport['inchanges']} unchanged, {len(rapport['erreurs'])} rejected, in {elapsed:.2f}s.".strip()
+            )
+        )
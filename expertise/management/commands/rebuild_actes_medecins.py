@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expertise.honoraires import synchroniser_evenements
+from expertise.models import ActeMedecin, FicheEvenement
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ActeMedecin ledger (one row per event x act x doctor) from existing events and invoices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Events processed per batch.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunk_size = options["chunk_size"]
+
+        with transaction.atomic():
+            ActeMedecin.objects.all().delete()
+
+            total = 0
+            chunk = []
+            for evenement in FicheEvenement.objects.order_by("pk").iterator(chunk_size=chunk_size):
+                chunk.append(evenement)
+                if len(chunk) >= chunk_size:
+                    total += synchroniser_evenements(chunk)
+                    chunk = []
+            if chunk:
+                total += synchroniser_evenements(chunk)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{total} ledger row(s) rebuilt in {elapsed:.2f}s."))
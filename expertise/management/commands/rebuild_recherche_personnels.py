@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from expertise.recherche import reindexer_tout
+
+
+class Command(BaseCommand):
+    help = "Rebuild the crew search index (accent-folded name terms and DN) from PersonnelNavigant."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Crew members indexed per batch.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = reindexer_tout(options["chunk_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"{total} crew member(s) indexed in {elapsed:.2f}s."))
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment
+from django.urls import reverse
+
+from expertise import views
+from expertise.models import Bordereau, FicheEvenement, MedecinInvoice, PersonnelNavigant
+from expertise.pdf_cache import invalider_facture_medecin
+from expertise.synthetique import generer
+
+REPORT_VERSION = 1
+SAVES_PER_RUN = 50
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5, check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _consume(response) -> int:
+    """Read the whole body, streaming or not, and return its size."""
+    if response.status_code != 200:
+        raise CommandError(f"{response.request['PATH_INFO']} answered {response.status_code}.")
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the key expertise code paths on synthetic datasets of several sizes, each in a throwaway "
+        "database, and write a JSON report that can be compared across runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000",
+            help="Comma-separated numbers of events; one synthetic database is built per size.",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (median is reported).")
+        parser.add_argument("--companies", type=int, default=8)
+        parser.add_argument("--doctors", type=int, default=12)
+        parser.add_argument("--years", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--output",
+            help="Report path (default: benchmarks/benchmark-<timestamp>.json under BASE_DIR).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes must contain positive integers.")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        started_at = datetime.now()
+        output = Path(options["output"] or Path(settings.BASE_DIR) / "benchmarks" / (
+            f"benchmark-{started_at:%Y%m%d-%H%M%S}.json"
+        ))
+
+        report = {
+            "version": REPORT_VERSION,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "database_version": ".".join(map(str, connection.Database.sqlite_version_info))
+                if connection.vendor == "sqlite" else None,
+                "platform": platform.platform(),
+            },
+            "parameters": {
+                "sizes": sizes,
+                "repeat": options["repeat"],
+                "companies": options["companies"],
+                "doctors": options["doctors"],
+                "years": options["years"],
+                "seed": options["seed"],
+            },
+            "runs": [],
+        }
+
+        setup_test_environment()
+        with tempfile.TemporaryDirectory(prefix="expertise-bench-") as workdir, override_settings(
+            MEDIA_ROOT=workdir,
+            PERF_STATS_ENABLED=False,
+            QUERY_BUDGET_STRICT=False,
+            SLOW_REQUEST_MS=float("inf"),
+        ):
+            for size in sizes:
+                self.stdout.write(f"Building a dataset of {size} events...")
+                report["runs"].append(self._run_size(size, options, Path(workdir)))
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(f"Report written to {output}"))
+
+    def _run_size(self, size: int, options: dict, workdir: Path) -> dict:
+        test_settings = connection.settings_dict.setdefault("TEST", {})
+        previous_test_name = test_settings.get("NAME")
+        if connection.vendor == "sqlite":
+            test_settings["NAME"] = str(workdir / f"bench-{size}.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            generation_started = time.perf_counter()
+            counts = generer(
+                compagnies=options["companies"],
+                personnels=max(50, size // 5),
+                medecins=options["doctors"],
+                evenements=size,
+                annees=options["years"],
+                graine=options["seed"],
+            )
+            generation = time.perf_counter() - generation_started
+
+            benchmarks = {}
+            for name, function in self._benchmarks():
+                benchmarks[name] = self._measure(function, options["repeat"])
+                self.stdout.write(
+                    f"  {name:<32} {benchmarks[name]['median_ms']:>10.1f} ms  {benchmarks[name]['queries']:>6} queries"
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if previous_test_name is None:
+                test_settings.pop("NAME", None)
+            else:
+                test_settings["NAME"] = previous_test_name
+
+        return {
+            "events": size,
+            "counts": counts,
+            "generation_seconds": round(generation, 3),
+            "benchmarks": benchmarks,
+        }
+
+    def _measure(self, function, repeat: int) -> dict:
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                function()
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "queries": len(queries),
+        }
+
+    def _benchmarks(self):
+        """``(name, callable)`` pairs; names are the report keys and must stay stable across versions."""
+        user = get_user_model().objects.create_superuser("benchmark", "benchmark@example.invalid", None)
+        client = Client()
+        client.force_login(user)
+
+        bordereau = (
+            Bordereau.objects.annotate(nombre=Count("evenements")).order_by("-nombre", "pk").first()
+        )
+        premiere = bordereau.evenements.select_related("personnel__compagnie").order_by("date_evenement").first()
+        mois, annee = premiere.date_evenement.month, premiere.date_evenement.year
+        iata = premiere.personnel.compagnie.iata
+
+        invoice = MedecinInvoice.objects.annotate(nombre=Count("lignes")).order_by("-nombre", "pk").first()
+        personnels = list(PersonnelNavigant.objects.order_by("pk")[:SAVES_PER_RUN])
+
+        def numbering_save():
+            # Invoice numbers are allocated in FicheEvenement.save; the inserts are rolled back.
+            try:
+                with transaction.atomic():
+                    for personnel in personnels:
+                        FicheEvenement(personnel=personnel, date_evenement=date.today(), cs_cempn=True).save()
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        def medecin_pdf_cold():
+            invalider_facture_medecin(invoice.pk)
+            views._render_medecin_invoice_pdf(invoice)
+
+        def get(url_name, *args, **params):
+            url = reverse(url_name, args=args)
+            return lambda: _consume(client.get(url, params))
+
+        return [
+            (f"fiche_evenement_save_x{SAVES_PER_RUN}", numbering_save),
+            ("liste_bordereaux", get("liste_bordereaux")),
+            ("collect_medecin_histories", views._collect_medecin_histories),
+            ("bordereau_docx", lambda: views._construire_bordereau_docx(mois, annee, iata, bordereau.no_bordereau)),
+            ("export_evenements_xlsx", get("export_evenements_excel")),
+            ("export_evenements_csv", get("export_evenements_excel", format="csv")),
+            ("relance_factures", get("relance_factures")),
+            ("impression_factures_bordereau", get("impression_factures", bordereau=bordereau.no_bordereau)),
+            ("medecin_invoice_pdf_cold", medecin_pdf_cold),
+            ("medecin_invoice_pdf_cached", lambda: views._render_medecin_invoice_pdf(invoice)),
+        ]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from expertise import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued document generation jobs (bordereaux, doctor invoices, ZIP archives)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the pending jobs, then exit.")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=30,
+            help="Requeue jobs left running for longer than this (crashed worker).",
+        )
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=7,
+            help="Delete finished jobs and their files after this many days.",
+        )
+
+    def handle(self, *args, **options):
+        stale = timedelta(minutes=options["stale_minutes"])
+
+        requeued = jobs.relancer_bloquees(stale)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale job(s)."))
+
+        purged = jobs.purger(options["retention_days"])
+        if purged:
+            self.stdout.write(f"Purged {purged} old job(s).")
+
+        self.stdout.write("Document worker started.")
+        while True:
+            tache = jobs.reserver_prochaine()
+            if tache is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            started = time.perf_counter()
+            tache = jobs.executer(tache)
+            elapsed = time.perf_counter() - started
+            if tache.statut == tache.TERMINEE:
+                self.stdout.write(self.style.SUCCESS(f"{tache} -> {tache.fichier.name} in {elapsed:.2f}s"))
+            else:
+                self.stderr.write(self.style.ERROR(f"{tache}: {tache.message}"))
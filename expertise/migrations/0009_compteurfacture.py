@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:42
+
+import re
+
+from django.db import migrations, models
+
+NO_FACTURE_RE = re.compile(r"^(\d{4}E\d{2}\.)(\d+)/")
+
+
+def initialiser_compteurs(apps, schema_editor):
+    FicheEvenement = apps.get_model('expertise', 'FicheEvenement')
+    CompteurFacture = apps.get_model('expertise', 'CompteurFacture')
+
+    maxima = {}
+    numeros = FicheEvenement.objects.exclude(no_facture__isnull=True).values_list('no_facture', flat=True)
+    for no_facture in numeros.iterator():
+        match = NO_FACTURE_RE.match(no_facture)
+        if match:
+            prefixe, sequence = match.group(1), int(match.group(2))
+            maxima[prefixe] = max(maxima.get(prefixe, 0), sequence)
+
+    CompteurFacture.objects.bulk_create(
+        CompteurFacture(prefixe=prefixe, dernier_numero=dernier)
+        for prefixe, dernier in maxima.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0008_alter_ficheevenement_frais_dossier_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurFacture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefixe', models.CharField(max_length=20, unique=True)),
+                ('dernier_numero', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(initialiser_compteurs, migrations.RunPython.noop),
+    ]
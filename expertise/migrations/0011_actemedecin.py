@@ -0,0 +1,102 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:50
+
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# Copie figée de honoraires.ACTE_CONFIGS et des taux en vigueur à cette migration.
+ACTES = [
+    ('medecin_cempn', 'Consultation CEMPN', 'cs_cempn', 'date_cempn', 'honoraire_cempn', 'CEMPN'),
+    ('medecin_oph', 'Consultation OPH', 'cs_oph', 'date_cs_oph', 'honoraire_cs_oph', 'OPH'),
+    ('medecin_orl', 'Consultation ORL', 'cs_orl', 'date_cs_orl', 'honoraire_cs_orl', 'ORL'),
+    ('medecin_radio', 'Consultation Radio', 'cs_radio', 'date_cs_radio', 'honoraire_cs_radio', 'RADIO'),
+    ('medecin_labo', 'Biologie sanguine', 'cs_labo', 'date_cs_labo', 'honoraire_cs_labo', 'LABO'),
+    ('medecin_labo', 'Biologie urinaire', 'cs_lbx', 'date_cs_lbx', 'honoraire_cs_lbx', 'LABOX'),
+    ('medecin_labo', 'Recherche toxique', 'cs_toxique', 'date_cs_toxique', 'honoraire_cs_toxique', 'TOX'),
+]
+CENTIMES = Decimal('0.01')
+
+
+def _taux(medecin):
+    if (medecin.nom or '').strip().upper() == 'HELLEC':
+        return Decimal('0.00')
+    specialite = (medecin.specialite or '').lower()
+    if 'radiolog' in specialite:
+        return Decimal('0.00')
+    if 'labo' in specialite:
+        return Decimal('0.10')
+    return Decimal('0.06')
+
+
+def remplir_grand_livre(apps, schema_editor):
+    """Remplit le grand livre depuis les fiches et les lignes de factures médecins existantes."""
+    ActeMedecin = apps.get_model('expertise', 'ActeMedecin')
+    FicheEvenement = apps.get_model('expertise', 'FicheEvenement')
+    Medecin = apps.get_model('expertise', 'Medecin')
+    MedecinInvoiceLine = apps.get_model('expertise', 'MedecinInvoiceLine')
+
+    medecins = Medecin.objects.in_bulk()
+    lignes = {
+        (ligne.evenement_id, ligne.act_code): ligne
+        for ligne in MedecinInvoiceLine.objects.select_related('invoice')
+    }
+
+    def actes():
+        for evenement in FicheEvenement.objects.order_by('pk').iterator(chunk_size=1000):
+            for field_name, act_label, flag_field, date_field, amount_field, act_code in ACTES:
+                medecin = medecins.get(getattr(evenement, f'{field_name}_id'))
+                if not medecin or not getattr(evenement, flag_field):
+                    continue
+                montant_brut = Decimal(getattr(evenement, amount_field) or 0)
+                ligne = lignes.get((evenement.pk, act_code))
+                if ligne and ligne.invoice.medecin_id != medecin.pk:
+                    ligne = None
+                if ligne:
+                    redevance, montant_net = ligne.redevance, ligne.montant_net
+                else:
+                    redevance = (montant_brut * _taux(medecin)).quantize(CENTIMES, rounding=ROUND_HALF_UP)
+                    montant_net = (montant_brut - redevance).quantize(CENTIMES, rounding=ROUND_HALF_UP)
+                yield ActeMedecin(
+                    evenement_id=evenement.pk,
+                    medecin_id=medecin.pk,
+                    act_code=act_code,
+                    act_label=act_label,
+                    date_acte=getattr(evenement, date_field) or evenement.date_evenement,
+                    montant_brut=montant_brut,
+                    redevance=redevance,
+                    montant_net=montant_net,
+                    ligne_facture=ligne,
+                )
+
+    ActeMedecin.objects.bulk_create(actes(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0010_tachedocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActeMedecin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('act_code', models.CharField(max_length=30)),
+                ('act_label', models.CharField(max_length=120)),
+                ('date_acte', models.DateField()),
+                ('montant_brut', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('redevance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('montant_net', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('evenement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actes_medecins', to='expertise.ficheevenement')),
+                ('ligne_facture', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='expertise.medecininvoiceline')),
+                ('medecin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actes', to='expertise.medecin')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['medecin', '-date_acte'], name='acte_medecin_date_idx')],
+                'unique_together': {('evenement', 'act_code')},
+            },
+        ),
+        migrations.RunPython(remplir_grand_livre, migrations.RunPython.noop),
+    ]
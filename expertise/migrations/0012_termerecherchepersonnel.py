@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:53
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copie figée de expertise.recherche au moment de la migration : l'index
+# initial ne doit pas dépendre des évolutions ultérieures du module.
+SIGNES_MUETS = dict.fromkeys(map(ord, "ʻʼ'’`"), None)
+SEPARATEURS = re.compile(r'[^0-9a-z]+')
+LONGUEUR_MAX = 100
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize('NFKD', str(texte or '')).translate(SIGNES_MUETS)
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return SEPARATEURS.sub(' ', texte).strip()
+
+
+def termes(texte):
+    resultat = []
+    for mot in str(texte or '').split():
+        parties = normaliser(mot).split()
+        resultat.extend(parties)
+        if len(parties) > 1:
+            resultat.append(''.join(parties))
+    return [terme[:LONGUEUR_MAX] for terme in dict.fromkeys(resultat)]
+
+
+def indexer_personnels(apps, schema_editor):
+    PersonnelNavigant = apps.get_model('expertise', 'PersonnelNavigant')
+    TermeRecherchePersonnel = apps.get_model('expertise', 'TermeRecherchePersonnel')
+
+    lignes = (
+        TermeRecherchePersonnel(personnel_id=pk, terme=terme)
+        for pk, dn, nom, prenom in PersonnelNavigant.objects.values_list('pk', 'dn', 'nom', 'prenom').iterator()
+        for terme in dict.fromkeys(termes(nom) + termes(prenom) + [dn])
+    )
+    TermeRecherchePersonnel.objects.bulk_create(lignes, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0011_actemedecin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermeRecherchePersonnel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terme', models.CharField(max_length=100)),
+                ('personnel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termes_recherche', to='expertise.personnelnavigant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['terme', 'personnel'], name='terme_personnel_idx')],
+            },
+        ),
+        migrations.RunPython(indexer_personnels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0012_termerecherchepersonnel'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='personnelnavigant',
+            index=models.Index(fields=['nom', 'id'], name='personnel_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personnelnavigant',
+            index=models.Index(fields=['prenom', 'id'], name='personnel_prenom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personnelnavigant',
+            index=models.Index(fields=['date_de_naissance', 'id'], name='personnel_naissance_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0013_personnel_tri_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['date_evenement', 'personnel'], name='evenement_date_personnel_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['paiement', 'date_evenement'], name='evenement_paiement_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['medecin_cempn', 'date_evenement'], name='evenement_cempn_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['medecin_oph', 'date_evenement'], name='evenement_oph_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['medecin_orl', 'date_evenement'], name='evenement_orl_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['medecin_radio', 'date_evenement'], name='evenement_radio_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ficheevenement',
+            index=models.Index(fields=['medecin_labo', 'date_evenement'], name='evenement_labo_date_idx'),
+        ),
+    ]
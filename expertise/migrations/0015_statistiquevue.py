@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0014_evenement_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiqueVue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vue', models.CharField(max_length=200, unique=True)),
+                ('appels', models.PositiveIntegerField(default=0)),
+                ('lentes', models.PositiveIntegerField(default=0)),
+                ('duree_totale_ms', models.FloatField(default=0)),
+                ('duree_max_ms', models.FloatField(default=0)),
+                ('sql_requetes', models.PositiveIntegerField(default=0)),
+                ('sql_requetes_max', models.PositiveIntegerField(default=0)),
+                ('sql_duree_ms', models.FloatField(default=0)),
+                ('template_duree_ms', models.FloatField(default=0)),
+                ('derniere_mesure', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['vue'],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:18
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def reprendre_taux_codes(apps, schema_editor):
+    """Reprend en base les taux jusqu'ici codés dans honoraires.taux_redevance."""
+    Medecin = apps.get_model('expertise', 'Medecin')
+    TauxRedevance = apps.get_model('expertise', 'TauxRedevance')
+
+    TauxRedevance.objects.bulk_create([
+        TauxRedevance(specialite='', taux=Decimal('0.06')),
+        TauxRedevance(specialite='radiolog', taux=Decimal('0.00')),
+        TauxRedevance(specialite='labo', taux=Decimal('0.10')),
+    ])
+    TauxRedevance.objects.bulk_create([
+        TauxRedevance(medecin_id=pk, taux=Decimal('0.00'))
+        for pk, nom in Medecin.objects.values_list('pk', 'nom')
+        if (nom or '').strip().upper() == 'HELLEC'
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expertise', '0015_statistiquevue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TauxRedevance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialite', models.CharField(blank=True, help_text='Ex. « labo » couvre « Laboratoire ». Laisser vide pour le taux par défaut.', max_length=100, verbose_name='Mot-clé de spécialité')),
+                ('taux', models.DecimalField(decimal_places=4, help_text='0.06 pour 6 %', max_digits=5)),
+                ('medecin', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='taux_redevance', to='expertise.medecin')),
+            ],
+            options={
+                'verbose_name': 'taux de redevance',
+                'verbose_name_plural': 'taux de redevance',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('medecin__isnull', True)), fields=('specialite',), name='taux_specialite_unique')],
+            },
+        ),
+        migrations.RunPython(reprendre_taux_codes, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from datetime import datetime
@@ -81,9 +82,31 @@ class PersonnelNavigant(models.Model):
     #statut_pn = models.CharField(max_length=100, null=True, blank=True)
     statut_pn = models.CharField(max_length=100, choices=[('Pilote', 'Pilote'), ('PNC', 'PNC'), ('Controleur aérien', 'Contrôleur aérien'), ('Para Pro', 'Para Pro')], null=True, blank=True)
 
+    class Meta:
+        # Pagination par curseur de la liste : (colonne triée, id).
+        indexes = [
+            models.Index(fields=['nom', 'id'], name='personnel_nom_idx'),
+            models.Index(fields=['prenom', 'id'], name='personnel_prenom_idx'),
+            models.Index(fields=['date_de_naissance', 'id'], name='personnel_naissance_idx'),
+        ]
+
     def __str__(self):
         return f"{self.prenom} {self.nom}"
 
+
+class TermeRecherchePersonnel(models.Model):
+    """Terme normalisé (sans accents, minuscules) d'un personnel, alimenté par ``expertise.recherche``."""
+    personnel = models.ForeignKey(PersonnelNavigant, on_delete=models.CASCADE, related_name='termes_recherche')
+    terme = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['terme', 'personnel'], name='terme_personnel_idx'),
+        ]
+
+    def __str__(self):
+        return self.terme
+
 # --- Bordereaux ---
 class Bordereau(models.Model):
     date_bordereau = models.DateField()
@@ -99,6 +122,62 @@ class Bordereau(models.Model):
         date_creation = datetime.today()
         return f"EB{date_creation.day:02d}{mois:02d}{str(annee)[-2:]}{iata}"
 
+    def attacher(self, evenements):
+        """Rattache les fiches du queryset en un seul UPDATE ; renvoie le nombre de fiches modifiées."""
+        return evenements.exclude(bordereau=self).update(bordereau=self)
+
+    def detacher(self):
+        """Libère toutes les fiches du bordereau en un seul UPDATE."""
+        return self.evenements.update(bordereau=None)
+
+# --- Compteurs de numérotation des factures ---
+NO_FACTURE_RE = re.compile(r"^(\d{4}E\d{2}\.)(\d+)/")
+
+
+class CompteurFacture(models.Model):
+    """Dernier numéro de séquence attribué pour un préfixe mensuel (ex. ``2025E03.``)."""
+    prefixe = models.CharField(max_length=20, unique=True)
+    dernier_numero = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefixe}{self.dernier_numero}"
+
+    @staticmethod
+    def prefixe_pour(d):
+        return f"{d.year}E{d.month:02d}."
+
+    @staticmethod
+    def formater(prefixe, sequence):
+        return f"{prefixe}{sequence:02d}/01"
+
+    @classmethod
+    def allouer(cls, prefixe, quantite=1):
+        """
+        Réserve ``quantite`` numéros consécutifs pour ``prefixe`` et renvoie le premier.
+
+        L'UPDATE ``dernier_numero = dernier_numero + n`` verrouille la ligne du
+        compteur jusqu'à la fin de la transaction : deux workers ne peuvent donc
+        pas obtenir le même numéro.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(prefixe=prefixe).update(dernier_numero=F('dernier_numero') + quantite):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefixe=prefixe, dernier_numero=cls._max_existant(prefixe) + quantite)
+                except IntegrityError:
+                    # Un autre worker vient de créer le compteur : on repasse par l'UPDATE.
+                    cls.objects.filter(prefixe=prefixe).update(dernier_numero=F('dernier_numero') + quantite)
+            dernier = cls.objects.filter(prefixe=prefixe).values_list('dernier_numero', flat=True).get()
+        return dernier - quantite + 1
+
+    @staticmethod
+    def _max_existant(prefixe):
+        # Ne sert qu'à la création d'un compteur absent (mois non initialisé par la migration).
+        numeros = FicheEvenement.objects.filter(no_facture__startswith=prefixe).values_list('no_facture', flat=True)
+        sequences = [int(m.group(2)) for m in map(NO_FACTURE_RE.match, numeros) if m]
+        return max(sequences, default=0)
+
+
 # --- Événements / Factures ---
 class FicheEvenement(models.Model):
     date_evenement = models.DateField()
@@ -159,8 +238,20 @@ class FicheEvenement(models.Model):
 
     total = models.IntegerField(default=0)
 
-    def save(self, *args, **kwargs):
-        # Calcul du total
+    class Meta:
+        # Filtres des bordereaux, relances et historiques médecins.
+        indexes = [
+            models.Index(fields=['date_evenement', 'personnel'], name='evenement_date_personnel_idx'),
+            models.Index(fields=['paiement', 'date_evenement'], name='evenement_paiement_date_idx'),
+            models.Index(fields=['medecin_cempn', 'date_evenement'], name='evenement_cempn_date_idx'),
+            models.Index(fields=['medecin_oph', 'date_evenement'], name='evenement_oph_date_idx'),
+            models.Index(fields=['medecin_orl', 'date_evenement'], name='evenement_orl_date_idx'),
+            models.Index(fields=['medecin_radio', 'date_evenement'], name='evenement_radio_date_idx'),
+            models.Index(fields=['medecin_labo', 'date_evenement'], name='evenement_labo_date_idx'),
+        ]
+
+    def calculer_totaux(self):
+        """Recalcule ``total`` et ``paye_par_patient`` à partir des honoraires."""
         self.total = (
             (self.honoraire_cempn or 0) +
             (self.honoraire_cs_oph or 0) +
@@ -177,29 +268,89 @@ class FicheEvenement(models.Model):
         else:
             self.paye_par_patient = 0
 
+    def save(self, *args, **kwargs):
+        self.calculer_totaux()
+
         # Génération auto du numéro de facture
         if not self.no_facture:
             d = self.date_evenement or timezone.now().date()
-            prefix = f"{d.year}E{d.month:02d}."
-            # chercher toutes les factures commençant par ce préfixe
-            same_month = FicheEvenement.objects.filter(
-                no_facture__startswith=prefix
-            ).values_list('no_facture', flat=True)
-
-            # extraire la partie numérique entre le point et la barre oblique
-            numbers = [
-                int(re.search(r"\.(\d+)/", inv).group(1))
-                for inv in same_month
-                if re.search(r"\.(\d+)/", inv)
-            ]
-            next_seq = (max(numbers) if numbers else 0) + 1
-            self.no_facture = f"{prefix}{next_seq:02d}/01"
+            prefix = CompteurFacture.prefixe_pour(d)
+            with transaction.atomic():
+                next_seq = CompteurFacture.allouer(prefix)
+                self.no_facture = CompteurFacture.formater(prefix, next_seq)
+                super().save(*args, **kwargs)
+            return
 
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Facture {self.no_facture} - {self.personnel.nom}"
 
+class ActeMedecin(models.Model):
+    """
+    Grand livre des honoraires : une ligne par fiche × acte × médecin.
+
+    Tenu à jour par les signaux de ``FicheEvenement``, ``Medecin`` et
+    ``MedecinInvoiceLine`` (voir ``honoraires.py``) ; reconstruit par la
+    commande ``rebuild_actes_medecins``.
+    """
+    evenement = models.ForeignKey(FicheEvenement, on_delete=models.CASCADE, related_name='actes_medecins')
+    medecin = models.ForeignKey(Medecin, on_delete=models.CASCADE, related_name='actes')
+    act_code = models.CharField(max_length=30)
+    act_label = models.CharField(max_length=120)
+    date_acte = models.DateField()
+    montant_brut = models.DecimalField(max_digits=12, decimal_places=2)
+    redevance = models.DecimalField(max_digits=12, decimal_places=2)
+    montant_net = models.DecimalField(max_digits=12, decimal_places=2)
+    ligne_facture = models.ForeignKey(
+        MedecinInvoiceLine, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    class Meta:
+        unique_together = ('evenement', 'act_code')
+        indexes = [
+            models.Index(fields=['medecin', '-date_acte'], name='acte_medecin_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.act_code} - {self.medecin} - {self.date_acte}"
+
+
+class TauxRedevance(models.Model):
+    """
+    Taux de redevance retenu sur les honoraires des médecins (voir ``honoraires.taux_redevance``).
+
+    Une règle vise soit un médecin, soit les spécialités contenant un mot-clé
+    (insensible à la casse) ; la règle sans médecin ni mot-clé est le taux par
+    défaut. Le taux d'un médecin prime sur celui de sa spécialité ; sans règle
+    propre, le titulaire (``honoraires.MEDECINS_SANS_REDEVANCE``) est à 0 %.
+    """
+    medecin = models.OneToOneField(
+        Medecin, on_delete=models.CASCADE, null=True, blank=True, related_name='taux_redevance'
+    )
+    specialite = models.CharField(
+        "Mot-clé de spécialité", max_length=100, blank=True,
+        help_text="Ex. « labo » couvre « Laboratoire ». Laisser vide pour le taux par défaut.",
+    )
+    taux = models.DecimalField(max_digits=5, decimal_places=4, help_text="0.06 pour 6 %")
+
+    class Meta:
+        verbose_name = "taux de redevance"
+        verbose_name_plural = "taux de redevance"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['specialite'], condition=models.Q(medecin__isnull=True), name='taux_specialite_unique'
+            ),
+        ]
+
+    def __str__(self):
+        if self.medecin_id:
+            cible = str(self.medecin)
+        else:
+            cible = self.specialite or "défaut"
+        return f"{cible} : {self.taux * 100:.2f} %"
+
+
 class FactureMedecin(models.Model):
     medecin = models.ForeignKey(Medecin, on_delete=models.CASCADE)
     bordereau = models.ForeignKey(Bordereau, on_delete=models.CASCADE, related_name='factures_medecins')
@@ -208,3 +359,62 @@ class FactureMedecin(models.Model):
 
     def __str__(self):
         return f"Facture pour {self.medecin} - {self.bordereau.no_bordereau}"
+
+
+# --- Génération de documents en arrière-plan ---
+class TacheDocument(models.Model):
+    """Demande de génération de document (PDF/DOCX/ZIP) traitée par ``run_document_worker``."""
+    EN_ATTENTE = 'en_attente'
+    EN_COURS = 'en_cours'
+    TERMINEE = 'terminee'
+    ECHEC = 'echec'
+    STATUTS = [
+        (EN_ATTENTE, 'En attente'),
+        (EN_COURS, 'En cours'),
+        (TERMINEE, 'Terminée'),
+        (ECHEC, 'Échec'),
+    ]
+
+    type_document = models.CharField(max_length=50)
+    parametres = models.JSONField(default=dict)
+    statut = models.CharField(max_length=20, choices=STATUTS, default=EN_ATTENTE, db_index=True)
+    progression = models.PositiveSmallIntegerField(default=0)
+    message = models.TextField(blank=True, default='')
+    fichier = models.FileField(upload_to='documents/%Y/%m/', blank=True, null=True)
+    nom_fichier = models.CharField(max_length=255, blank=True, default='')
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    cree_par = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.type_document} #{self.pk} ({self.get_statut_display()})"
+
+    @property
+    def est_terminee(self):
+        return self.statut in (self.TERMINEE, self.ECHEC)
+
+
+# --- Mesures de performance (middleware expertise.instrumentation) ---
+class StatistiqueVue(models.Model):
+    """Cumuls par nom d'URL des requêtes HTTP mesurées ; alimenté par lots par chaque processus."""
+    vue = models.CharField(max_length=200, unique=True)
+    appels = models.PositiveIntegerField(default=0)
+    lentes = models.PositiveIntegerField(default=0)
+    duree_totale_ms = models.FloatField(default=0)
+    duree_max_ms = models.FloatField(default=0)
+    sql_requetes = models.PositiveIntegerField(default=0)
+    sql_requetes_max = models.PositiveIntegerField(default=0)
+    sql_duree_ms = models.FloatField(default=0)
+    template_duree_ms = models.FloatField(default=0)
+    derniere_mesure = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['vue']
+
+    def __str__(self):
+        return self.vue
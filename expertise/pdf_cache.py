@@ -0,0 +1,106 @@
+# expertise/pdf_cache.py
+"""
+Cache disque des PDF de factures médecins, sous ``MEDIA_ROOT``.
+
+Une facture émise ne change plus : son PDF est rangé sous
+``cache/factures_medecins/<id>/<sha256 du HTML>.pdf``. Le HTML rendu contient
+les lignes, les coordonnées du médecin et le gabarit ; toute modification de
+l'un d'eux produit une autre empreinte, donc un nouveau rendu WeasyPrint.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+RACINE = Path('cache') / 'factures_medecins'
+
+
+def _dossier(invoice_id):
+    return Path(settings.MEDIA_ROOT) / RACINE / str(invoice_id)
+
+
+def _chemin(invoice_id, html_string):
+    empreinte = hashlib.sha256(html_string.encode('utf-8')).hexdigest()
+    return _dossier(invoice_id) / f"{empreinte}.pdf"
+
+
+def lire(invoice_id, html_string):
+    try:
+        return _chemin(invoice_id, html_string).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def ecrire(invoice_id, html_string, pdf):
+    chemin = _chemin(invoice_id, html_string)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    for ancien in chemin.parent.glob('*.pdf'):
+        ancien.unlink(missing_ok=True)
+    # Écriture atomique : un lecteur concurrent ne voit jamais de PDF tronqué.
+    fd, temporaire = tempfile.mkstemp(dir=chemin.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fichier:
+        fichier.write(pdf)
+    os.replace(temporaire, chemin)
+
+
+def html_vers_pdf(html_string):
+    from weasyprint import HTML
+
+    return HTML(string=html_string).write_pdf()
+
+
+def pdf_facture_medecin(invoice_id, html_string, rendu=None):
+    """Renvoie le PDF en cache pour ce HTML, ou le rend (``rendu()`` ou WeasyPrint) et le met en cache."""
+    pdf = lire(invoice_id, html_string)
+    if pdf is None:
+        pdf = rendu() if rendu else html_vers_pdf(html_string)
+        ecrire(invoice_id, html_string, pdf)
+    return pdf
+
+
+def pdfs_factures_medecins(documents, workers=None):
+    """
+    Produit ``(cle, pdf)`` pour chaque ``(cle, invoice_id, html)`` de ``documents``.
+
+    Les PDF en cache sont renvoyés d'abord ; les autres sont rendus dans un pool
+    de processus (``workers``, par défaut ``settings.MEDECIN_PDF_WORKERS`` ou le
+    nombre de cœurs) et renvoyés au fil de leur achèvement.
+    """
+    a_rendre = []
+    for cle, invoice_id, html_string in documents:
+        pdf = lire(invoice_id, html_string)
+        if pdf is None:
+            a_rendre.append((cle, invoice_id, html_string))
+        else:
+            yield cle, pdf
+
+    workers = workers or getattr(settings, 'MEDECIN_PDF_WORKERS', None) or os.cpu_count() or 1
+    if workers <= 1 or len(a_rendre) <= 1:
+        for cle, invoice_id, html_string in a_rendre:
+            pdf = html_vers_pdf(html_string)
+            ecrire(invoice_id, html_string, pdf)
+            yield cle, pdf
+        return
+
+    # Les processus fils ne touchent pas à la base : on ne leur laisse pas de connexion héritée.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=min(workers, len(a_rendre))) as pool:
+        futures = {
+            pool.submit(html_vers_pdf, html_string): (cle, invoice_id, html_string)
+            for cle, invoice_id, html_string in a_rendre
+        }
+        for future in as_completed(futures):
+            cle, invoice_id, html_string = futures.pop(future)
+            pdf = future.result()
+            ecrire(invoice_id, html_string, pdf)
+            yield cle, pdf
+
+
+def invalider_facture_medecin(invoice_id):
+    shutil.rmtree(_dossier(invoice_id), ignore_errors=True)
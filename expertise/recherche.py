@@ -0,0 +1,142 @@
+# expertise/recherche.py
+"""
+Recherche des personnels navigants par nom, prénom ou DN.
+
+Les noms sont découpés en termes normalisés (accents, ʻeta et apostrophes
+retirés, minuscules) stockés dans ``TermeRecherchePersonnel``. Une recherche
+est une suite de parcours d'index par préfixe : « teriitehau » trouve
+« Teriʻitehau », « helene » trouve « Hélène » et « 12 » les DN commençant
+par 12. Chaque terme saisi doit correspondre ; les correspondances exactes
+passent en tête.
+"""
+
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .models import PersonnelNavigant, TermeRecherchePersonnel
+
+# ʻeta (okina), apostrophes typographiques et droites : ignorés dans les noms.
+SIGNES_MUETS = dict.fromkeys(map(ord, "ʻʼ'’`"), None)
+SEPARATEURS = re.compile(r'[^0-9a-z]+')
+LONGUEUR_MAX = TermeRecherchePersonnel._meta.get_field('terme').max_length
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def normaliser(texte):
+    """Minuscules sans accents ni signes muets, chaque mot séparé par une espace."""
+    texte = unicodedata.normalize('NFKD', str(texte or '')).translate(SIGNES_MUETS)
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return SEPARATEURS.sub(' ', texte).strip()
+
+
+def termes(texte):
+    """
+    Termes indexés pour un nom : chaque partie et, pour les noms composés
+    (« Marie-Hélène »), la forme accolée (« mariehelene »).
+    """
+    resultat = []
+    for mot in str(texte or '').split():
+        parties = normaliser(mot).split()
+        resultat.extend(parties)
+        if len(parties) > 1:
+            resultat.append(''.join(parties))
+    return [terme[:LONGUEUR_MAX] for terme in dict.fromkeys(resultat)]
+
+
+def termes_personnel(personnel):
+    return list(dict.fromkeys(termes(personnel.nom) + termes(personnel.prenom) + [personnel.dn]))
+
+
+def indexer(personnels, nouveaux=False):
+    """
+    Réécrit les termes d'une liste de personnels (requêtes groupées).
+    ``nouveaux=True`` : personnels tout juste créés, sans termes à supprimer.
+    """
+    personnels = [p for p in personnels if p.pk]
+    if not personnels:
+        return 0
+
+    lignes = [
+        TermeRecherchePersonnel(personnel_id=p.pk, terme=terme)
+        for p in personnels
+        for terme in termes_personnel(p)
+    ]
+    with transaction.atomic():
+        if not nouveaux:
+            TermeRecherchePersonnel.objects.filter(personnel_id__in=[p.pk for p in personnels]).delete()
+        TermeRecherchePersonnel.objects.bulk_create(lignes, batch_size=500)
+    return len(lignes)
+
+
+def reindexer_tout(taille_lot=2000):
+    """Reconstruit tout l'index ; renvoie le nombre de personnels traités."""
+    TermeRecherchePersonnel.objects.all().delete()
+    nombre = 0
+    lot = []
+    for personnel in PersonnelNavigant.objects.only('pk', 'dn', 'nom', 'prenom').iterator(chunk_size=taille_lot):
+        lot.append(personnel)
+        if len(lot) >= taille_lot:
+            nombre += len(lot)
+            indexer(lot, nouveaux=True)
+            lot = []
+    nombre += len(lot)
+    indexer(lot, nouveaux=True)
+    return nombre
+
+
+def _borne_prefixe(prefixe):
+    """
+    Plus petit terme supérieur à tous ceux qui commencent par ``prefixe``
+    (``None`` s'il n'y en a pas). Les termes ne contenant que [0-9a-z], la
+    borne reste correcte quelle que soit la collation de la base.
+    """
+    while prefixe:
+        dernier = prefixe[-1]
+        if dernier != ALPHABET[-1]:
+            return prefixe[:-1] + ALPHABET[ALPHABET.index(dernier) + 1]
+        prefixe = prefixe[:-1]
+    return None
+
+
+def _commence_par(terme):
+    condition = Q(termes_recherche__terme__gte=terme)
+    borne = _borne_prefixe(terme)
+    if borne is not None:
+        condition &= Q(termes_recherche__terme__lt=borne)
+    return condition
+
+
+def rechercher(queryset, requete):
+    """
+    Restreint ``queryset`` aux personnels dont chaque terme de ``requete``
+    préfixe un terme indexé, classés par nombre de correspondances exactes.
+    Renvoie ``queryset`` inchangé si la requête ne contient aucun terme.
+    """
+    saisis = list(dict.fromkeys(t[:LONGUEUR_MAX] for t in normaliser(requete).split()))
+    if not saisis:
+        return queryset
+
+    prefixes = [_commence_par(terme) for terme in saisis]
+    correspondance = Q()
+    for prefixe in prefixes:
+        correspondance |= prefixe
+
+    return (
+        queryset
+        .filter(correspondance)
+        .annotate(
+            termes_trouves=Count(
+                Case(
+                    *[When(prefixe, then=Value(rang)) for rang, prefixe in enumerate(prefixes)],
+                    output_field=IntegerField(),
+                ),
+                distinct=True,
+            ),
+            exacts=Count('termes_recherche', filter=Q(termes_recherche__terme__in=saisis), distinct=True),
+        )
+        .filter(termes_trouves=len(saisis))
+        .order_by('-exacts', 'nom', 'prenom', 'pk')
+    )
@@ -0,0 +1,81 @@
+# expertise/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .honoraires import (
+    CHAMPS_ACTES,
+    appliquer_ligne_facture,
+    invalider_taux,
+    recalculer_medecin,
+    recalculer_tous_medecins,
+    synchroniser_evenement_id,
+    synchroniser_evenements,
+)
+from .models import (
+    FicheEvenement,
+    Medecin,
+    MedecinInvoice,
+    MedecinInvoiceLine,
+    PersonnelNavigant,
+    TauxRedevance,
+)
+from .pdf_cache import invalider_facture_medecin
+from .recherche import indexer
+
+
+@receiver(post_delete, sender=MedecinInvoice)
+def invalider_pdf_facture_supprimee(sender, instance, **kwargs):
+    invalider_facture_medecin(instance.pk)
+
+
+@receiver(post_save, sender=MedecinInvoiceLine)
+@receiver(post_delete, sender=MedecinInvoiceLine)
+def invalider_pdf_lignes_modifiees(sender, instance, **kwargs):
+    invalider_facture_medecin(instance.invoice_id)
+
+
+# --- Grand livre des actes médecins ---
+
+@receiver(post_save, sender=FicheEvenement)
+def synchroniser_actes_fiche(sender, instance, update_fields=None, **kwargs):
+    # Un simple changement de paiement (toggle) ne touche pas aux actes.
+    if update_fields and not CHAMPS_ACTES.intersection(update_fields):
+        return
+    synchroniser_evenements([instance])
+
+
+@receiver(post_save, sender=Medecin)
+def recalculer_actes_medecin(sender, instance, created, **kwargs):
+    if not created:
+        recalculer_medecin(instance)
+
+
+@receiver(post_save, sender=TauxRedevance)
+@receiver(post_delete, sender=TauxRedevance)
+def appliquer_taux_redevance(sender, instance, **kwargs):
+    # Cache du processus courant ; les autres processus relisent après REDEVANCE_CACHE_SECONDS.
+    invalider_taux()
+    transaction.on_commit(recalculer_tous_medecins)
+
+
+@receiver(post_save, sender=MedecinInvoiceLine)
+def reporter_ligne_facture(sender, instance, **kwargs):
+    appliquer_ligne_facture(instance)
+
+
+@receiver(post_delete, sender=MedecinInvoiceLine)
+def liberer_ligne_facture(sender, instance, **kwargs):
+    # Après commit : si la fiche elle-même est supprimée, il n'y a plus rien à recalculer.
+    evenement_id = instance.evenement_id
+    transaction.on_commit(lambda: synchroniser_evenement_id(evenement_id))
+
+
+# --- Index de recherche des personnels ---
+
+@receiver(post_save, sender=PersonnelNavigant)
+def indexer_personnel(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'dn', 'nom', 'prenom'}.intersection(update_fields):
+        return
+    indexer([instance])
@@ -0,0 +1,191 @@
+# expertise/synthetique.py
+"""
+Jeu de données synthétique pour les mesures de performance (commandes
+``generate_synthetic_data`` et ``run_benchmarks``).
+
+Compagnies, personnels, médecins, fiches étalées sur plusieurs années,
+bordereaux mensuels par compagnie et factures médecins ; le tirage est
+déterministe pour une même graine. Les écritures passent par les mêmes
+chemins groupés que les imports (numérotation par bloc, grand livre, index
+de recherche).
+"""
+
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .honoraires import synchroniser_evenements
+from .models import (
+    ActeMedecin,
+    Bordereau,
+    CompagnieAerienne,
+    CompteurFacture,
+    FicheEvenement,
+    Medecin,
+    PersonnelNavigant,
+)
+from .recherche import indexer
+
+BATCH_SIZE = 500
+
+NOMS = [
+    'Teriitehau', 'Tetuanui', 'Faʻaʻa', 'Maraeura', 'Teʻiva', 'Hélène', 'Lehartel', 'Tauru',
+    'Bernède', 'Maurin', 'Tavita', 'Ōpūnohu', 'Vairaaroa', 'Tehei', 'Dupont', 'Martin',
+]
+PRENOMS = [
+    'Manoarii', 'Hinano', 'Teiki', 'Vaimiti', 'Moana', 'Heimana', 'Mareva', 'Tamatea',
+    'Louis', 'Gérard', 'Marie-Hélène', 'Rino', 'Tiare', 'Hereiti', 'Raiarii', 'Émilie',
+]
+SPECIALITES = ['Médecine aéronautique', 'Ophtalmologie', 'ORL', 'Radiologie', 'Laboratoire']
+
+# (case à cocher, date, honoraire, médecin, spécialité, montant, probabilité)
+ACTES = [
+    ('cs_cempn', 'date_cempn', 'honoraire_cempn', 'medecin_cempn', 'Médecine aéronautique', 10000, 1.0),
+    ('cs_oph', 'date_cs_oph', 'honoraire_cs_oph', 'medecin_oph', 'Ophtalmologie', 10600, 0.7),
+    ('cs_orl', 'date_cs_orl', 'honoraire_cs_orl', 'medecin_orl', 'ORL', 13250, 0.6),
+    ('cs_radio', 'date_cs_radio', 'honoraire_cs_radio', 'medecin_radio', 'Radiologie', 8400, 0.3),
+    ('cs_labo', 'date_cs_labo', 'honoraire_cs_labo', 'medecin_labo', 'Laboratoire', 7122, 0.6),
+    ('cs_lbx', 'date_cs_lbx', 'honoraire_cs_lbx', None, 'Laboratoire', 2337, 0.5),
+    ('cs_toxique', 'date_cs_toxique', 'honoraire_cs_toxique', None, 'Laboratoire', 17442, 0.1),
+]
+
+
+def _par_lots(elements, taille):
+    for debut in range(0, len(elements), taille):
+        yield elements[debut:debut + taille]
+
+
+def generer(compagnies=8, personnels=2000, medecins=12, evenements=10000, annees=3,
+            factures_par_medecin=3, graine=42, fin=None):
+    """Crée le jeu de données et renvoie le nombre d'objets créés par modèle."""
+    hasard = random.Random(graine)
+    fin = fin or date.today()
+    debut = fin - timedelta(days=365 * annees)
+
+    existantes = set(CompagnieAerienne.objects.values_list('iata', flat=True))
+    codes = [f'S{n:02d}' for n in range(100) if f'S{n:02d}' not in existantes][:compagnies]
+    compagnies_creees = CompagnieAerienne.objects.bulk_create(
+        [CompagnieAerienne(iata=code, nom=f'Compagnie synthétique {code}') for code in codes]
+    )
+
+    medecins_crees = Medecin.objects.bulk_create([
+        Medecin(
+            nom=hasard.choice(NOMS).upper(),
+            prenom=hasard.choice(PRENOMS),
+            specialite=SPECIALITES[n % len(SPECIALITES)],
+        )
+        for n in range(max(medecins, len(SPECIALITES)))
+    ])
+    par_specialite = defaultdict(list)
+    for medecin in medecins_crees:
+        par_specialite[medecin.specialite].append(medecin)
+
+    premier_dn = 9000000 - PersonnelNavigant.objects.filter(dn__startswith='9').count() - personnels
+    equipages = PersonnelNavigant.objects.bulk_create([
+        PersonnelNavigant(
+            dn=str(premier_dn + n),
+            nom=hasard.choice(NOMS).upper(),
+            prenom=hasard.choice(PRENOMS),
+            compagnie=hasard.choice(compagnies_creees),
+            date_de_naissance=date(hasard.randint(1960, 2002), hasard.randint(1, 12), hasard.randint(1, 28)),
+            sexe=hasard.choice(['M', 'F']),
+            statut_pn=hasard.choice(['Pilote', 'PNC', 'PNC', 'Para Pro']),
+        )
+        for n in range(personnels)
+    ], batch_size=BATCH_SIZE)
+    indexer(equipages, nouveaux=True)
+
+    fiches = []
+    for _ in range(evenements):
+        jour = debut + timedelta(days=hasard.randint(0, (fin - debut).days))
+        anciennete = (fin - jour).days
+        fiche = FicheEvenement(
+            personnel=hasard.choice(equipages),
+            date_evenement=jour,
+            paiement=hasard.random() < (0.85 if anciennete > 180 else 0.4),
+            quote_part_patient=hasard.random() < 0.05,
+        )
+        for case, champ_date, champ_montant, champ_medecin, specialite, montant, probabilite in ACTES:
+            if hasard.random() >= probabilite:
+                continue
+            setattr(fiche, case, True)
+            setattr(fiche, champ_date, jour)
+            setattr(fiche, champ_montant, montant)
+            if champ_medecin:
+                setattr(fiche, champ_medecin, hasard.choice(par_specialite[specialite]))
+        fiche.calculer_totaux()
+        fiches.append(fiche)
+    fiches.sort(key=lambda fiche: fiche.date_evenement)
+
+    par_prefixe = defaultdict(list)
+    for fiche in fiches:
+        par_prefixe[CompteurFacture.prefixe_pour(fiche.date_evenement)].append(fiche)
+
+    with transaction.atomic():
+        for prefixe, groupe in par_prefixe.items():
+            premier = CompteurFacture.allouer(prefixe, len(groupe))
+            for offset, fiche in enumerate(groupe):
+                fiche.no_facture = CompteurFacture.formater(prefixe, premier + offset)
+        FicheEvenement.objects.bulk_create(fiches, batch_size=BATCH_SIZE)
+        for lot in _par_lots(fiches, 2000):
+            synchroniser_evenements(lot)
+
+    bordereaux = _generer_bordereaux(hasard, compagnies_creees, fin)
+    factures = _generer_factures_medecins(medecins_crees, factures_par_medecin)
+
+    return {
+        'compagnies': len(compagnies_creees),
+        'medecins': len(medecins_crees),
+        'personnels': len(equipages),
+        'evenements': len(fiches),
+        'actes_medecins': ActeMedecin.objects.filter(medecin__in=medecins_crees).count(),
+        'bordereaux': bordereaux,
+        'factures_medecins': factures,
+    }
+
+
+def _generer_bordereaux(hasard, compagnies, fin):
+    """Un bordereau par compagnie et par mois écoulé ; les plus anciens sont virés."""
+    mois_courant = (fin.year, fin.month)
+    nombre = 0
+    for compagnie in compagnies:
+        mois = (
+            FicheEvenement.objects
+            .filter(personnel__compagnie=compagnie)
+            .dates('date_evenement', 'month')
+        )
+        for premier_jour in mois:
+            if (premier_jour.year, premier_jour.month) >= mois_courant:
+                continue
+            bordereau = Bordereau.objects.create(
+                date_bordereau=premier_jour + timedelta(days=35),
+                no_bordereau=Bordereau.generer_no_bordereau(premier_jour.month, premier_jour.year, compagnie.iata),
+                virement=(fin - premier_jour).days > 90 and hasard.random() < 0.8,
+            )
+            bordereau.attacher(FicheEvenement.objects.filter(
+                personnel__compagnie=compagnie,
+                date_evenement__year=premier_jour.year,
+                date_evenement__month=premier_jour.month,
+            ))
+            nombre += 1
+    return nombre
+
+
+def _generer_factures_medecins(medecins, par_medecin):
+    """Factures médecins des mois les plus anciens, par le même chemin que l'auto-facturation."""
+    from .views import _actes_historique, _create_medecin_invoice, _history_entry
+
+    nombre = 0
+    for medecin in medecins:
+        en_attente = _actes_historique(
+            ActeMedecin.objects.filter(medecin=medecin, evenement__paiement=True, ligne_facture__isnull=True)
+        ).order_by('date_acte', 'pk')
+        par_mois = defaultdict(list)
+        for acte in en_attente:
+            par_mois[(acte.date_acte.year, acte.date_acte.month)].append(_history_entry(acte))
+        for cle in sorted(par_mois)[:par_medecin]:
+            _create_medecin_invoice(medecin, par_mois[cle])
+            nombre += 1
+    return nombre
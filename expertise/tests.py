@@ -0,0 +1,290 @@
+import tempfile
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import intake, views
+from .instrumentation import verifier_budget
+from .models import (
+    ActeMedecin, Bordereau, CompagnieAerienne, CompteurFacture, FactureMedecin, FicheEvenement, Medecin,
+    MedecinInvoice, PersonnelNavigant, TacheDocument,
+)
+from .synthetique import generer
+
+
+def creer_bordereau_honoraires():
+    """
+    Bordereau de deux fiches : un laboratoire (biologie sanguine cochée,
+    labstix renseigné mais non coché) et un ORL.
+    """
+    compagnie = CompagnieAerienne.objects.create(iata='TST', nom='Compagnie test')
+    personnel = PersonnelNavigant.objects.create(dn='1234567', nom='MOANA', prenom='Teva', compagnie=compagnie)
+    labo = Medecin.objects.create(nom='LABO', prenom='Anne', specialite='Laboratoire')
+    orl = Medecin.objects.create(nom='ORL', prenom='Marc', specialite='ORL')
+    bordereau = Bordereau.objects.create(no_bordereau='EB010125TST', date_bordereau=date(2025, 1, 31))
+    FicheEvenement.objects.create(
+        personnel=personnel, date_evenement=date(2025, 1, 10), bordereau=bordereau,
+        medecin_labo=labo, cs_labo=True, honoraire_cs_labo=7122, honoraire_cs_lbx=2337,
+    )
+    FicheEvenement.objects.create(
+        personnel=personnel, date_evenement=date(2025, 1, 20), bordereau=bordereau,
+        medecin_orl=orl, cs_orl=True, honoraire_cs_orl=13250,
+    )
+    return bordereau, labo, orl
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(prefix='expertise-tests-'),
+    PERF_STATS_ENABLED=False,
+    QUERY_BUDGET_STRICT=True,
+)
+class BudgetRequetesTests(TestCase):
+    """Chaque entrée de ``QUERY_BUDGETS`` est vérifiée sur un petit jeu synthétique."""
+
+    @classmethod
+    def setUpTestData(cls):
+        generer(compagnies=2, personnels=60, medecins=6, evenements=300, annees=1, factures_par_medecin=1)
+        cls.utilisateur = get_user_model().objects.create_superuser('budget', 'budget@example.invalid', 'budget')
+
+        bordereau = Bordereau.objects.annotate(nombre=Count('evenements')).order_by('-nombre', 'pk').first()
+        evenement = bordereau.evenements.select_related('personnel__compagnie').first()
+        medecin = Medecin.objects.annotate(nombre=Count('actes')).order_by('-nombre', 'pk').first()
+
+        # nom d'URL -> (arguments d'URL, paramètres de requête)
+        cls.pages = {
+            'liste_bordereaux': ((), None),
+            'bordereau_detail': (
+                (evenement.date_evenement.year, evenement.date_evenement.month, evenement.personnel.compagnie.iata),
+                None,
+            ),
+            'factures_medecins_bordereau': ((bordereau.no_bordereau,), None),
+            'intervenants_list': ((), None),
+            'intervenant_history': ((medecin.pk,), None),
+            'personnel_list': ((), None),
+            'personnel_detail': ((PersonnelNavigant.objects.order_by('pk').first().dn,), None),
+            'impression_factures': ((), {'bordereau': bordereau.no_bordereau}),
+        }
+
+    def setUp(self):
+        self.client.force_login(self.utilisateur)
+
+    def test_toutes_les_pages_budgetees_sont_couvertes(self):
+        self.assertEqual(set(self.pages), set(settings.QUERY_BUDGETS))
+
+    def test_budgets(self):
+        for url_name in settings.QUERY_BUDGETS:
+            args, parametres = self.pages[url_name]
+            with self.subTest(url_name=url_name):
+                response = verifier_budget(self.client, url_name, *args, parametres=parametres)
+                self.assertEqual(response.status_code, 200)
+
+
+class TachesDocumentTests(TestCase):
+    """Une tâche de document appartient à l'utilisateur qui l'a demandée."""
+
+    @classmethod
+    def setUpTestData(cls):
+        modele = get_user_model()
+        cls.alice = modele.objects.create_user('alice', password='x')
+        cls.bruno = modele.objects.create_user('bruno', password='x')
+        medecin = Medecin.objects.create(nom='TEST', prenom='Jean', specialite='ORL')
+        cls.invoice = MedecinInvoice.objects.create(medecin=medecin, number='MED-TEST-1', emission_date=date(2025, 1, 31))
+        cls.url = reverse('intervenant_invoice', args=[medecin.pk, cls.invoice.pk])
+
+    def _demander(self, utilisateur):
+        self.client.force_login(utilisateur)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        return response['Location']
+
+    def test_meme_document_pour_deux_utilisateurs(self):
+        page_alice = self._demander(self.alice)
+        page_bruno = self._demander(self.bruno)
+
+        self.assertNotEqual(page_alice, page_bruno)
+        self.assertEqual(TacheDocument.objects.filter(type_document='facture_intervenant_pdf').count(), 2)
+        self.assertEqual(self.client.get(page_bruno).status_code, 200)
+        self.assertEqual(self.client.get(page_alice).status_code, 404)
+
+    def test_double_clic_reutilise_la_tache(self):
+        self.assertEqual(self._demander(self.alice), self._demander(self.alice))
+
+
+class VirementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bordereau, cls.labo, cls.orl = creer_bordereau_honoraires()
+        cls.utilisateur = get_user_model().objects.create_user('compta', password='x')
+
+    def _basculer(self):
+        self.client.force_login(self.utilisateur)
+        self.client.post(reverse('toggle_virement', args=[self.bordereau.pk]))
+
+    def test_virement_verse_tout_honoraire_dont_le_medecin_est_renseigne(self):
+        self._basculer()
+
+        montants = dict(FactureMedecin.objects.filter(bordereau=self.bordereau).values_list('medecin_id', 'montant'))
+        # Labstix non coché mais renseigné : versé (règle d'origine) ; frais de dossier non reversés.
+        self.assertEqual(montants, {self.labo.pk: 7122 + 2337, self.orl.pk: 13250})
+        self.assertFalse(self.bordereau.evenements.filter(paiement=False).exists())
+
+    def test_annulation_du_virement(self):
+        self._basculer()
+        self._basculer()
+
+        self.assertFalse(FactureMedecin.objects.filter(bordereau=self.bordereau).exists())
+        self.assertFalse(self.bordereau.evenements.filter(paiement=True).exists())
+
+
+class HonorairesBordereauTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bordereau, cls.labo, cls.orl = creer_bordereau_honoraires()
+        cls.utilisateur = get_user_model().objects.create_user('compta', password='x')
+
+    def test_recapitulatif_identique_aux_factures_pdf(self):
+        self.client.force_login(self.utilisateur)
+        self.client.post(reverse('toggle_virement', args=[self.bordereau.pk]))
+        response = self.client.get(reverse('factures_medecins_bordereau', args=[self.bordereau.no_bordereau]))
+
+        factures = response.context['factures']
+        self.assertEqual(len(factures), 2)
+        for facture in factures:
+            with self.subTest(medecin=facture.medecin.nom):
+                pdf = views._contexte_facture_medecin_bordereau(self.bordereau, facture.medecin)
+                self.assertEqual(f"{facture.montant:.0f}", pdf['total_brut'])
+                self.assertEqual(
+                    (f"{facture.montant_brut:.0f}", f"{facture.redevance:.0f}", f"{facture.montant_net:.0f}"),
+                    (pdf['total_brut'], pdf['total_redevance'], pdf['total_net']),
+                )
+        # Laboratoire à 10 % sur 9459 XPF, y compris le labstix hors grand livre.
+        labo = next(facture for facture in factures if facture.medecin_id == self.labo.pk)
+        self.assertEqual(f"{labo.redevance:.0f}", "946")
+
+
+class SelectionImpressionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bordereau, labo, orl = creer_bordereau_honoraires()
+        autre = PersonnelNavigant.objects.create(
+            dn='7654321', nom='TEMATAI', prenom='Hina',
+            compagnie=CompagnieAerienne.objects.create(iata='AUT', nom='Autre compagnie'),
+        )
+        FicheEvenement.objects.create(personnel=autre, date_evenement=date(2025, 2, 5), medecin_orl=orl, cs_orl=True)
+        cls.utilisateur = get_user_model().objects.create_user('impression', password='x')
+
+    def _selection(self, **parametres):
+        evenements, titre = views._selection_impression(parametres)
+        return sorted(evenements.values_list('personnel__dn', 'date_evenement__month')), titre
+
+    def test_criteres_cumulables(self):
+        self.assertEqual(
+            self._selection(bordereau='EB010125TST'),
+            ([('1234567', 1), ('1234567', 1)], 'Factures bordereau EB010125TST'),
+        )
+        self.assertEqual(self._selection(compagnie='aut'), ([('7654321', 2)], 'Factures AUT'))
+        self.assertEqual(self._selection(annee='2025', mois='2'), ([('7654321', 2)], 'Factures 02/2025'))
+        self.assertEqual(len(self._selection(annee='2025')[0]), 3)
+        self.assertEqual(self._selection(compagnie='TST', annee='2025', mois='2')[0], [])
+
+    def test_selection_invalide_refusee(self):
+        self.client.force_login(self.utilisateur)
+        url = reverse('impression_factures')
+        for parametres in ({}, {'mois': '1'}, {'annee': '2025', 'mois': '0'}, {'annee': '2025', 'mois': '13'},
+                           {'annee': 'deux mille', 'mois': '1'}, {'annee': '0'}):
+            with self.subTest(**parametres):
+                self.assertEqual(self.client.get(url, parametres).status_code, 400)
+        self.assertEqual(self.client.get(url, {'annee': '2025', 'mois': '1'}).status_code, 200)
+
+
+class CompteurFactureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        compagnie = CompagnieAerienne.objects.create(iata='TST', nom='Compagnie test')
+        cls.personnel = PersonnelNavigant.objects.create(dn='1234567', nom='MOANA', prenom='Teva', compagnie=compagnie)
+
+    def _fiche(self, jour):
+        return FicheEvenement.objects.create(personnel=self.personnel, date_evenement=jour).no_facture
+
+    def test_numeros_consecutifs_par_mois(self):
+        self.assertEqual(
+            [self._fiche(date(2025, 1, 3)), self._fiche(date(2025, 1, 28)), self._fiche(date(2025, 2, 1))],
+            ['2025E01.01/01', '2025E01.02/01', '2025E02.01/01'],
+        )
+        self.assertEqual(CompteurFacture.objects.get(prefixe='2025E01.').dernier_numero, 2)
+
+    def test_allocation_groupee(self):
+        self._fiche(date(2025, 3, 10))
+        self.assertEqual(CompteurFacture.allouer('2025E03.', 3), 2)
+        self.assertEqual(self._fiche(date(2025, 3, 11)), '2025E03.05/01')
+
+    def test_compteur_absent_repart_du_plus_grand_numero(self):
+        self._fiche(date(2025, 4, 1))
+        self._fiche(date(2025, 4, 2))
+        CompteurFacture.objects.filter(prefixe='2025E04.').delete()
+        self.assertEqual(self._fiche(date(2025, 4, 3)), '2025E04.03/01')
+
+
+class RattachementBordereauTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.bordereau, labo, orl = creer_bordereau_honoraires()
+        cls.autre = Bordereau.objects.create(no_bordereau='EB020125TST', date_bordereau=date(2025, 2, 28))
+        cls.libre = FicheEvenement.objects.create(
+            personnel=PersonnelNavigant.objects.get(dn='1234567'), date_evenement=date(2025, 2, 3),
+        )
+
+    def test_attacher_ne_modifie_que_les_fiches_a_deplacer(self):
+        fiches = FicheEvenement.objects.all()
+        self.assertEqual(self.autre.attacher(fiches), 3)
+        self.assertEqual(self.autre.attacher(fiches), 0)
+        self.assertEqual(self.autre.evenements.count(), 3)
+        self.assertFalse(self.bordereau.evenements.exists())
+
+    def test_detacher_libere_toutes_les_fiches(self):
+        self.assertEqual(self.bordereau.detacher(), 2)
+        self.assertEqual(FicheEvenement.objects.filter(bordereau__isnull=True).count(), 3)
+        self.assertTrue(Bordereau.objects.filter(pk=self.bordereau.pk).exists())
+
+
+class GrandLivreActesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        compagnie = CompagnieAerienne.objects.create(iata='TST', nom='Compagnie test')
+        cls.personnel = PersonnelNavigant.objects.create(dn='1234567', nom='MOANA', prenom='Teva', compagnie=compagnie)
+        cls.orl = Medecin.objects.create(nom='ORL', prenom='Marc', specialite='ORL')
+
+    def _actes(self):
+        return list(ActeMedecin.objects.values_list('medecin_id', 'act_code', 'montant_brut'))
+
+    def test_signaux_a_l_enregistrement(self):
+        fiche = FicheEvenement.objects.create(
+            personnel=self.personnel, date_evenement=date(2025, 1, 10),
+            medecin_orl=self.orl, cs_orl=True, honoraire_cs_orl=13250,
+        )
+        self.assertEqual(self._actes(), [(self.orl.pk, 'ORL', 13250)])
+        acte = ActeMedecin.objects.get()
+        self.assertEqual(acte.redevance + acte.montant_net, acte.montant_brut)
+
+        fiche.honoraire_cs_orl = 12000
+        fiche.save()
+        self.assertEqual(self._actes(), [(self.orl.pk, 'ORL', 12000)])
+
+        fiche.cs_orl = False
+        fiche.save()
+        self.assertEqual(self._actes(), [])
+
+    def test_import_groupe_alimente_le_grand_livre(self):
+        resultat = intake.importer_evenements([
+            {'dn': '1234567', 'date_evenement': '2025-01-10', 'medecin_orl': str(self.orl.pk),
+             'cs_orl': 'oui', 'honoraire_cs_orl': '13250'},
+            {'dn': '1234567', 'date_evenement': '2025-01-11', 'medecin_orl': str(self.orl.pk),
+             'cs_orl': 'non', 'honoraire_cs_orl': '13250'},
+        ])
+        self.assertEqual((resultat['crees'], resultat['erreurs']), (2, []))
+        self.assertEqual(self._actes(), [(self.orl.pk, 'ORL', 13250)])
+        self.assertEqual(ActeMedecin.objects.get().evenement.no_facture, resultat['factures'][0])
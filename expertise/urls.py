@@ -29,6 +29,7 @@ urlpatterns = [
     path('', views.accueil, name='accueil'),  # ta vue d'accueil protégée
     path('factures/recherche/', views.facture_search, name='facture_search'),
     path('factures/par-compagnie/', views.facture_par_compagnie, name='facture_par_compagnie'),
+    path('factures/impression/', views.impression_factures, name='impression_factures'),
     path('bordereaux/par-compagnie/', views.bordereau_par_compagnie, name='bordereau_par_compagnie'),
     path('relance/', views.relance_factures, name='relance_factures'),
     path('intervenants/', views.intervenants_list, name='intervenants_list'),
@@ -41,11 +42,14 @@ urlpatterns = [
     path('personnels/<str:dn>/', PersonnelDetailView.as_view(), name='personnel_detail'),
     path('personnels/<str:dn>/edit/', PersonnelUpdateView.as_view(), name='personnel_edit'),
     path('personnels/<str:dn>/delete/', PersonnelDeleteView.as_view(), name='personnel_delete'),
+    path('evenements/import/', views.import_evenements, name='import_evenements'),
     path('personnels/<str:dn>/evenements/add/', FicheEvenementCreateView.as_view(), name='evenement_add'),
     path('evenement/<int:pk>/edit/', FicheEvenementUpdateView.as_view(), name='evenement_edit'),
     path('evenement/<int:pk>/delete/', FicheEvenementDeleteView.as_view(), name='evenement_delete'),
     path('evenement/<int:pk>/facture/', FactureView.as_view(), name='facture'),
+    path('codes-barres/<path:numero>.svg', views.code_barre, name='code_barre'),
     path("bordereau/<int:annee>/<int:mois>/<str:iata>/", bordereau_view, name="bordereau_detail"),
+    path("bordereau/<int:annee>/<int:mois>/<str:iata>/attribuer/", views.assign_bordereau, name="assign_bordereau"),
     path("bordereau/selection/", bordereau_selection_view, name="selectionner_bordereau"),
     path('bordereau/<int:mois>/<int:annee>/<str:iata>/download/', views.download_bordereau, name='download_bordereau'),
     path('bordereaux/', views.liste_bordereaux, name='liste_bordereaux'),
@@ -56,5 +60,9 @@ urlpatterns = [
     path('bordereau/<str:no_bordereau>/factures-medecins/', views.factures_medecins_bordereau, name='factures_medecins_bordereau'),
     path('bordereau/<int:id>/toggle_virement/', views.toggle_virement, name='toggle_virement'),
     path('bordereau/<str:bordereau_no>/medecin/<int:medecin_id>/telecharger/', views.telecharger_facture_medecin, name='telecharger_facture_medecin'),
+    path('documents/<int:pk>/', views.tache_document, name='tache_document'),
+    path('documents/<int:pk>/statut/', views.tache_document_statut, name='tache_document_statut'),
+    path('documents/<int:pk>/telecharger/', views.tache_document_telecharger, name='tache_document_telecharger'),
     path('factures/<int:pk>/toggle-paiement/', views.toggle_facture_paiement, name='toggle_facture_paiement'),
+    path('performance/', views.statistiques_performance, name='statistiques_performance'),
 ]
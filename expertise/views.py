@@ -3,10 +3,18 @@
 from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q, Sum
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
 from django.db import transaction
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.text import slugify
 from datetime import datetime, timedelta
 from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
@@ -15,12 +23,13 @@ from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.enum.table import WD_TABLE_ALIGNMENT
-import barcode
 import io
-import base64
 import zipfile
-import pandas as pd
-from barcode.writer import ImageWriter
+import csv
+import itertools
+import json
+import tempfile
+from openpyxl import Workbook
 from django.views.decorators.http import require_POST
 from .models import (
     FicheEvenement,
@@ -31,11 +40,27 @@ from .models import (
     Medecin,
     MedecinInvoice,
     MedecinInvoiceLine,
+    TacheDocument,
+    ActeMedecin,
+    StatistiqueVue,
 )
 from .forms import BordereauSelectionForm
+from .intake import importer_evenements, lire_lot
+from . import jobs
+from .bordereau_docx import rendre_bordereau
+from .bordereau_pdf import rendre_bordereau_pdf, rendre_factures_pdf
+from .bordereaux import (
+    TotalHonoraires, evenements_du_mois, honoraires_bordereau, lignes_bordereau, totaux_par_medecin,
+)
+from .codes_barres import CODE_BARRE_CACHE_SECONDS, codes_barres_en_ligne, numero_valide, svg_code_barre
+from .honoraires import ACTE_CONFIGS, calculer_redevance
+from .pdf_cache import pdf_facture_medecin, pdfs_factures_medecins
+from .recherche import rechercher
+from .instrumentation import envoyer_statistiques
 from django.db import models
 from django.template.loader import render_to_string
 from weasyprint import HTML
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -56,27 +81,20 @@ def logout_view(request):
     return redirect('/login/')
 
 @login_required(login_url='/login/')
-def assign_bordereau(request, mois, annee, iata):
+@require_POST
+def assign_bordereau(request, annee, mois, iata):
     compagnie = get_object_or_404(CompagnieAerienne, iata=iata)
     evenements = FicheEvenement.objects.filter(
         date_evenement__year=annee, date_evenement__month=mois, personnel__compagnie=compagnie
     )
 
-    # Création du bordereau
-    date_creation = datetime.today()
-    no_bordereau = f"EB{date_creation.day:02d}{mois:02d}{str(annee)[-2:]}{iata}"
-    bordereau = Bordereau.objects.create(
-        date_bordereau=date_creation,
-        no_bordereau=no_bordereau
+    bordereau, _ = Bordereau.objects.get_or_create(
+        no_bordereau=Bordereau.generer_no_bordereau(mois, annee, iata),
+        defaults={'date_bordereau': datetime.today()}
     )
+    bordereau.attacher(evenements)
 
-    # Lier le bordereau aux événements
-    for evenement in evenements:
-        evenement.no_bordereau = no_bordereau
-        evenement.bordereau = bordereau
-        evenement.save()
-
-    return redirect('bordereau_view', mois=mois, annee=annee, iata=iata)
+    return redirect('bordereau_detail', annee=annee, mois=mois, iata=iata)
 
 # ----- VUES POUR LES PERSONNELS -----
 # Pour une classe
@@ -158,6 +176,26 @@ class FicheEvenementCreateView(LoginRequiredMixin, CreateView):
         return reverse_lazy('personnel_detail', kwargs={'dn': self.object.personnel.dn})
 
 
+@login_required(login_url='/login/')
+@require_POST
+def import_evenements(request):
+    """
+    Import groupé de fiches : fichier ``fichier`` (CSV ou JSON) ou corps JSON.
+    Paramètre optionnel ``dry_run=1`` pour valider sans rien écrire.
+    """
+    upload = request.FILES.get('fichier')
+    try:
+        if upload:
+            format_lot = 'json' if upload.name.lower().endswith('.json') else 'csv'
+            lignes = lire_lot(upload.read().decode('utf-8-sig'), format_lot)
+        else:
+            lignes = lire_lot(request.body.decode('utf-8'), 'json')
+    except (ValueError, UnicodeDecodeError) as exc:
+        return JsonResponse({'erreur': str(exc)}, status=400)
+
+    dry_run = request.GET.get('dry_run') == '1' or request.POST.get('dry_run') == '1'
+    rapport = importer_evenements(lignes, dry_run=dry_run)
+    return JsonResponse(rapport)
 
 
 class FactureView(LoginRequiredMixin, DetailView):
@@ -167,21 +205,133 @@ class FactureView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        invoice_number = self.object.no_facture
-        print(f"DEBUG: Numéro de facture = {invoice_number}")
+        # Image servie (et mise en cache) par code_barre : la page ne rend jamais le code-barres elle-même.
+        if self.object.no_facture and numero_valide(self.object.no_facture):
+            context['barcode_url'] = reverse('code_barre', args=[self.object.no_facture])
+        return context
 
-        if invoice_number:
-            try:
-                Code128 = barcode.get_barcode_class('code128')
-                barcode_instance = Code128(invoice_number, writer=ImageWriter())
-                buffer = io.BytesIO()
-                barcode_instance.write(buffer)
-                barcode_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                context['barcode'] = barcode_base64
-            except Exception as e:
-                print(f"Erreur lors de la génération du code-barres : {e}")
 
-        return context
+@login_required(login_url='/login/')
+def code_barre(request, numero):
+    """
+    SVG Code128 d'un numéro de facture existant ; immuable, donc mis en cache
+    par le navigateur. Les numéros inconnus ne sont ni rendus ni stockés.
+    """
+    if not numero_valide(numero) or not FicheEvenement.objects.filter(no_facture=numero).exists():
+        raise Http404("Numéro de facture inconnu.")
+    response = HttpResponse(svg_code_barre(numero), content_type='image/svg+xml')
+    patch_cache_control(response, private=True, max_age=CODE_BARRE_CACHE_SECONDS, immutable=True)
+    return response
+
+
+# Au-delà, imprimer par bordereau ou par mois : le document reste imprimable d'un seul tenant.
+IMPRESSION_MAX_FACTURES = 500
+
+
+def _selection_impression(parametres):
+    """
+    Fiches à imprimer et titre du document d'après ``bordereau``,
+    ``compagnie`` (IATA), ``annee`` et ``mois`` (critères cumulables).
+    """
+    evenements = FicheEvenement.objects.all()
+    criteres = []
+
+    no_bordereau = (parametres.get('bordereau') or '').strip()
+    if no_bordereau:
+        evenements = evenements.filter(bordereau__no_bordereau=no_bordereau)
+        criteres.append(f"bordereau {no_bordereau}")
+
+    iata = (parametres.get('compagnie') or '').strip().upper()
+    if iata:
+        evenements = evenements.filter(personnel__compagnie__iata=iata)
+        criteres.append(iata)
+
+    mois, annee = (parametres.get('mois') or '').strip(), (parametres.get('annee') or '').strip()
+    if mois and not annee:
+        raise ValueError("Le mois doit être accompagné de l'année.")
+    if annee:
+        try:
+            annee, mois = int(annee), int(mois) if mois else None
+        except ValueError:
+            raise ValueError("Mois ou année invalide.")
+        if not 1 <= annee <= 9999 or (mois is not None and not 1 <= mois <= 12):
+            raise ValueError("Mois ou année invalide.")
+        evenements = evenements.filter(date_evenement__year=annee)
+        if mois is not None:
+            evenements = evenements.filter(date_evenement__month=mois)
+            criteres.append(f"{mois:02d}/{annee}")
+        else:
+            criteres.append(str(annee))
+
+    if not criteres:
+        raise ValueError("Choisir un bordereau, une compagnie ou un mois.")
+    return evenements, "Factures " + " - ".join(criteres)
+
+
+TROP_DE_FACTURES = f"Plus de {IMPRESSION_MAX_FACTURES} factures : restreindre la sélection (bordereau ou mois)."
+
+
+def _factures_a_imprimer(evenements):
+    """Lignes avec actes et code-barres SVG (une requête) ; ``ValueError`` au-delà de ``IMPRESSION_MAX_FACTURES``."""
+    lignes = lignes_bordereau(evenements, avec_actes=True, limite=IMPRESSION_MAX_FACTURES + 1)
+    if len(lignes) > IMPRESSION_MAX_FACTURES:
+        raise ValueError(TROP_DE_FACTURES)
+    codes = codes_barres_en_ligne(e.no_facture for e in lignes)
+    for e in lignes:
+        e.code_barre = codes.get(e.no_facture)
+    return lignes
+
+
+@login_required(login_url='/login/')
+def impression_factures(request):
+    """
+    Toutes les factures individuelles d'un bordereau, d'un mois ou d'une
+    compagnie en un seul document imprimable : page HTML, ou PDF construit
+    par la file de documents avec ``format=pdf``.
+
+    Fiches, personnels et médecins sont lus en une requête ; les codes-barres
+    sont incorporés en SVG depuis le cache de ``codes_barres``.
+    """
+    try:
+        evenements, titre = _selection_impression(request.GET)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain; charset=utf-8')
+
+    if request.GET.get('format') == 'pdf':
+        nombre = evenements.count()
+        if not nombre:
+            raise Http404("Aucune facture pour cette sélection.")
+        if nombre > IMPRESSION_MAX_FACTURES:
+            return HttpResponse(TROP_DE_FACTURES, status=400, content_type='text/plain; charset=utf-8')
+        parametres = {
+            cle: request.GET[cle].strip()
+            for cle in ('bordereau', 'compagnie', 'annee', 'mois')
+            if (request.GET.get(cle) or '').strip()
+        }
+        tache = jobs.planifier('factures_impression_pdf', request.user, **parametres)
+        return redirect('tache_document', pk=tache.pk)
+
+    try:
+        lignes = _factures_a_imprimer(evenements)
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain; charset=utf-8')
+
+    parametres_pdf = request.GET.copy()
+    parametres_pdf['format'] = 'pdf'
+    return render(request, 'expertise/impression_factures.html', {
+        'titre': titre,
+        'evenements': lignes,
+        'parametres_pdf': parametres_pdf.urlencode(),
+    })
+
+
+def _construire_factures_impression_pdf(progression=None, **parametres):
+    evenements, titre = _selection_impression(parametres)
+    lignes = _factures_a_imprimer(evenements)
+    if not lignes:
+        raise ValueError("Aucune facture pour cette sélection.")
+    contenu = rendre_factures_pdf({'titre': titre}, lignes, progression=progression)
+    return contenu, f"{slugify(titre)}.pdf", 'application/pdf'
 
 
 # ----- VUE DU BORDEREAU -----
@@ -219,164 +369,102 @@ from num2words import num2words
 
 from .models import CompagnieAerienne, FicheEvenement, Bordereau
 
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
 @login_required(login_url='/login/')
 def download_bordereau(request, mois, annee, iata):
+    """Planifie le document du bordereau : DOCX par défaut, PDF avec ``format=pdf``."""
     compagnie = get_object_or_404(CompagnieAerienne, iata=iata)
-    evenements = FicheEvenement.objects.filter(
-        date_evenement__year=annee,
-        date_evenement__month=mois,
-        personnel__compagnie=compagnie
-    )
+    evenements = evenements_du_mois(compagnie, mois, annee)
 
-    date_creation = datetime.today()
-    no_bordereau = f"EB{date_creation.day:02d}{mois:02d}{str(annee)[-2:]}{iata}"
+    no_bordereau = Bordereau.generer_no_bordereau(mois, annee, iata)
 
     bordereau, created = Bordereau.objects.get_or_create(
         no_bordereau=no_bordereau,
-        defaults={"date_bordereau": date_creation}
+        defaults={"date_bordereau": datetime.today()}
     )
+    bordereau.attacher(evenements)
 
-    with transaction.atomic():
-        evenements.update(bordereau=bordereau)
-
-    doc = Document()
-
-    para = doc.add_heading('Centre Médical du Personnel Navigant de Polynésie française', level=1)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('Dr. Christian Hellec', level=1)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('BP 380697 - 98718 Punaauia - Tahiti', level=2)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('Polynésie Française', level=2)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('mel : cmpnpf@gmail.com | Tel : +689.87.77.05.18 | Tel : +689.87.71.50.90', level=2)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('Bordereau de dépôt de factures', level=2)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    para = doc.add_heading('--------------------', level=2)
-    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    doc.add_paragraph(f"Date de création : {date_creation.strftime('%d/%m/%Y')}")
-    doc.add_paragraph(f"Numéro du bordereau : {no_bordereau}")
-    doc.add_paragraph(f"Compagnie aérienne : {compagnie.nom} ({compagnie.iata})")
-
-    # Tableau principal
-    table = doc.add_table(rows=1, cols=6)
-    table.style = 'Table Grid'
-    hdrs = ["Numéro de facture", "DN", "Nom", "Prénom", "Total (XPF)", "Paiement"]
-    for i, header in enumerate(hdrs):
-        cell = table.rows[0].cells[i]
-        cell.text = header
-        para = cell.paragraphs[0]
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        run = para.runs[0]
-        run.bold = True
-
-    total_general = 0
-
-    for e in evenements:
-        total_general += e.total or 0
-        row = table.add_row().cells
-        data = [
-            e.no_facture or "N/A",
-            e.personnel.dn,
-            e.personnel.nom,
-            e.personnel.prenom,
-            f"{e.total or 0:,} XPF",
-            "Payé" if e.paiement else "Non payé"
-        ]
-        for i, val in enumerate(data):
-            para = row[i].paragraphs[0]
-            para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            para.add_run(val)
-
-    total_lettres = num2words(total_general, lang='fr').capitalize()
-    doc.add_paragraph(
-        f"\nNombre de factures : {evenements.count()} | Total général : {total_general:,} XPF ({total_lettres})"
+    type_document = 'bordereau_pdf' if request.GET.get('format') == 'pdf' else 'bordereau_docx'
+    tache = jobs.planifier(
+        type_document, request.user,
+        mois=mois, annee=annee, iata=iata, no_bordereau=no_bordereau,
     )
-    doc.add_paragraph("Dr. Christian HELLEC")
-    doc.add_paragraph("IBAN : FR76 1223 9000 0162 2887 0100 014")
-
-    # Factures individuelles
-    for e in evenements:
-        doc.add_page_break()
-        para = doc.add_heading('Centre Médical du Personnel Navigant de Polynésie française', level=1)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('Dr. Christian Hellec', level=1)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('BP 380697 - 98718 Punaauia - Tahiti', level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('Polynésie Française', level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('mel : cmpnpf@gmail.com | Tel : +689.87.77.05.18 | Tel : +689.87.71.50.90', level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('Facture Individuelle', level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading(f"{compagnie.nom}", level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        para = doc.add_heading('--------------------', level=2)
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        doc.add_paragraph("")
-        doc.add_paragraph(f"Date : {e.date_evenement.strftime('%d/%m/%Y')}")
-        doc.add_paragraph(f"Numéro de facture : {e.no_facture or 'N/A'}")
-
-        doc.add_heading("Informations du patient", level=2)
-        doc.add_paragraph(f"Nom : {e.personnel.nom}")
-        doc.add_paragraph(f"Prénom : {e.personnel.prenom}")
-        doc.add_paragraph(f"DN : {e.personnel.dn}")
-        if e.personnel.date_de_naissance:
-            doc.add_paragraph(f"Date de naissance : {e.personnel.date_de_naissance.strftime('%d/%m/%Y')}")
-
-        doc.add_heading("Détails des actes", level=2)
-        actes = [
-            ("CEMPN/Pf", e.cs_cempn, e.date_cempn, e.medecin_cempn, e.honoraire_cempn),
-            ("Ophtalmologie", e.cs_oph, e.date_cs_oph, e.medecin_oph, e.honoraire_cs_oph),
-            ("ORL", e.cs_orl, e.date_cs_orl, e.medecin_orl, e.honoraire_cs_orl),
-            ("Biologie sanguine", e.cs_labo, e.date_cs_labo, e.medecin_labo, e.honoraire_cs_labo),
-            ("Biologie urinaire", e.cs_lbx, e.date_cs_lbx, e.medecin_labo, e.honoraire_cs_lbx),
-            ("Toxicologie", e.cs_toxique, e.date_evenement, e.medecin_labo, e.honoraire_cs_toxique),
-            ("Radiologie", e.cs_radio, e.date_cs_radio, e.medecin_radio, e.honoraire_cs_radio),
-            ("Frais de dossier", e.cs_cempn, e.date_cempn, e.medecin_cempn, e.frais_dossier),
+    return redirect('tache_document', pk=tache.pk)
+
+
+def _construire_bordereau_docx(mois, annee, iata, no_bordereau, progression=None):
+    compagnie = CompagnieAerienne.objects.get(iata=iata)
+    evenements = lignes_bordereau(evenements_du_mois(compagnie, mois, annee), avec_actes=True)
+
+    total_general = sum(e.total for e in evenements)
+    entete = {
+        'date_creation': datetime.today().strftime('%d/%m/%Y'),
+        'no_bordereau': no_bordereau,
+        'compagnie': compagnie.nom,
+        'iata': compagnie.iata,
+        'nombre': len(evenements),
+        'total_general': f"{total_general:,}",
+        'total_lettres': num2words(total_general, lang='fr').capitalize(),
+    }
+    lignes = [
+        [
+            e.no_facture or "N/A",
+            e.dn,
+            e.nom,
+            e.prenom,
+            f"{e.total:,} XPF",
+            "Payé" if e.paiement else "Non payé",
         ]
+        for e in evenements
+    ]
 
-        # Optionnel si ce champ existe dans ton modèle :
-        #if hasattr(e, 'honoraire_cs_toxique'):
-            #actes.append(("TOXICO", True, e.date_evenement, e.medecin_labo, e.honoraire_cs_toxique))
-
-        table = doc.add_table(rows=1, cols=5)
-        table.style = 'Light Grid Accent 1'
-        headers = ["Date", "Acte", "Médecin", "Montant (XPF)", "Quote-part"]
-        for i, h in enumerate(headers):
-            cell = table.rows[0].cells[i]
-            cell.text = h
-            para = cell.paragraphs[0]
-            para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            para.runs[0].bold = True
-
-        for libelle, actif, date_acte, medecin, montant in actes:
-            if actif:
-                row = table.add_row().cells
-                data = [
-                    date_acte.strftime('%d/%m/%Y') if date_acte else "-",
-                    libelle,
-                    f"{medecin.prenom} {medecin.nom}" if medecin else "-",
-                    f"{montant or 0:,} XPF",
-                    f"{e.paye_par_patient or 0:,} XPF" if e.quote_part_patient else "-"
+    def factures():
+        for e in evenements:
+            quote_part = f"{e.paye_par_patient or 0:,} XPF" if e.quote_part_patient else "-"
+            champs = {
+                'compagnie': compagnie.nom,
+                'date': e.date_evenement.strftime('%d/%m/%Y'),
+                'no_facture': e.no_facture or 'N/A',
+                'nom': e.nom,
+                'prenom': e.prenom,
+                'dn': e.dn,
+                # None : la ligne « Date de naissance » est retirée.
+                'date_de_naissance': e.date_de_naissance.strftime('%d/%m/%Y') if e.date_de_naissance else None,
+                'total': f"{e.total:,}",
+                'paye_par_patient': f"{e.paye_par_patient or 0:,}",
+            }
+            lignes_actes = [
+                [
+                    acte.date.strftime('%d/%m/%Y') if acte.date else "-",
+                    acte.libelle,
+                    acte.medecin or "-",
+                    f"{acte.montant:,} XPF",
+                    quote_part,
                 ]
-                for i, val in enumerate(data):
-                    para = row[i].paragraphs[0]
-                    para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                    para.add_run(val)
+                for acte in e.actes
+            ]
+            yield champs, lignes_actes
 
-        doc.add_paragraph(f"\n💰 Total : {e.total or 0:,} XPF")
-        doc.add_paragraph(f"🧾 Payé par le patient : {e.paye_par_patient or 0:,} XPF")
-        doc.add_paragraph("Dr. Christian HELLEC")
-        doc.add_paragraph("IBAN : FR76 1223 9000 0162 2887 0100 014")
+    contenu = rendre_bordereau(entete, lignes, factures(), nombre=len(evenements), progression=progression)
+    return contenu, f"Bordereau_{no_bordereau}.docx", DOCX_CONTENT_TYPE
 
-    # Générer le fichier en réponse HTTP
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-    response['Content-Disposition'] = f'attachment; filename="Bordereau_{no_bordereau}.docx"'
-    doc.save(response)
-    return response
+
+def _construire_bordereau_pdf(mois, annee, iata, no_bordereau, progression=None):
+    compagnie = CompagnieAerienne.objects.get(iata=iata)
+    evenements = lignes_bordereau(evenements_du_mois(compagnie, mois, annee), avec_actes=True)
+
+    total_general = sum(e.total for e in evenements)
+    contexte = {
+        'date_creation': datetime.today().strftime('%d/%m/%Y'),
+        'no_bordereau': no_bordereau,
+        'compagnie': compagnie,
+        'total_general': total_general,
+        'total_lettres': num2words(total_general, lang='fr').capitalize(),
+    }
+    contenu = rendre_bordereau_pdf(contexte, evenements, progression=progression)
+    return contenu, f"Bordereau_{no_bordereau}.pdf", 'application/pdf'
 
 
 
@@ -386,24 +474,75 @@ from .models import Bordereau
 from django.db.models import Sum
 from .models import Bordereau
 
+BORDEREAUX_PAR_PAGE = 50
+
+# Colonnes triables de la liste des bordereaux : clé d'URL -> annotation / champ.
+BORDEREAU_TRIS = {
+    'numero': 'no_bordereau',
+    'date': 'date_bordereau',
+    'compagnie': 'compagnie_nom',
+    'factures': 'nb_factures',
+    'total': 'total_general',
+    'impaye': 'total_impaye',
+}
+
+
+def _resoudre_tri(request, colonnes, defaut):
+    """
+    Lit le paramètre ``tri`` (``cle`` ou ``-cle``) et renvoie le champ ORM à
+    trier, la clé retenue et, par colonne, la valeur de ``tri`` du prochain clic.
+    """
+    tri = (request.GET.get('tri') or defaut).strip()
+    if tri.lstrip('-') not in colonnes:
+        tri = defaut
+    champ = colonnes[tri.lstrip('-')]
+    if tri.startswith('-'):
+        champ = f'-{champ}'
+    tris_suivants = {cle: (f'-{cle}' if tri == cle else cle) for cle in colonnes}
+    return champ, tri, tris_suivants
+
+
 @login_required(login_url='/login/')
 def liste_bordereaux(request):
-    bordereaux = Bordereau.objects.all().prefetch_related('evenements')
+    annee = (request.GET.get('annee') or '').strip()
+    compagnie_id = (request.GET.get('compagnie') or '').strip()
+    virement = (request.GET.get('virement') or '').strip()
+
+    bordereaux = Bordereau.objects.all()
+    if annee.isdigit():
+        bordereaux = bordereaux.filter(date_bordereau__year=int(annee))
+    if compagnie_id.isdigit():
+        bordereaux = bordereaux.filter(evenements__personnel__compagnie_id=int(compagnie_id))
+    if virement in ('oui', 'non'):
+        bordereaux = bordereaux.filter(virement=(virement == 'oui'))
+
+    bordereaux = bordereaux.annotate(
+        nb_factures=Count('evenements'),
+        total_general=Coalesce(Sum('evenements__total'), 0),
+        total_paye=Coalesce(Sum('evenements__total', filter=Q(evenements__paiement=True)), 0),
+        total_impaye=Coalesce(Sum('evenements__total', filter=Q(evenements__paiement=False)), 0),
+        compagnie_nom=Max('evenements__personnel__compagnie__nom'),
+        compagnie_iata=Max('evenements__personnel__compagnie__iata'),
+    )
 
-    for bordereau in bordereaux:
-        bordereau.total_general = (
-            bordereau.evenements.aggregate(Sum('total'))['total__sum'] or 0
-        )
-        bordereau.nb_factures = bordereau.evenements.count()
+    champ_tri, tri, tris_suivants = _resoudre_tri(request, BORDEREAU_TRIS, '-date')
+    bordereaux = bordereaux.order_by(champ_tri, '-pk')
+
+    page_obj = Paginator(bordereaux, BORDEREAUX_PAR_PAGE).get_page(request.GET.get('page'))
 
     return render(request, 'expertise/liste_bordereaux.html', {
-        'bordereaux': bordereaux
+        'bordereaux': page_obj.object_list,
+        'page_obj': page_obj,
+        'compagnies': CompagnieAerienne.objects.order_by('nom'),
+        'annees': [d.year for d in Bordereau.objects.dates('date_bordereau', 'year', order='DESC')],
+        'filtres': {'annee': annee, 'compagnie': compagnie_id, 'virement': virement},
+        'tri': tri,
+        'tris_suivants': tris_suivants,
     })
 
 
 
 
-
 # ----- SELECTION DE BORDEREAU -----
 def bordereau_selection_view(request):
     if request.method == 'POST':
@@ -436,29 +575,152 @@ from docx.shared import Pt
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from django.db import transaction
-import io
-import base64
-import barcode
-from barcode.writer import ImageWriter
 
 # ----- VUES POUR LES PERSONNELS -----
 
+def _encoder_curseur(valeur, pk):
+    brut = json.dumps([None if valeur is None else str(valeur), pk])
+    return urlsafe_base64_encode(brut.encode())
+
+
+def _decoder_curseur(queryset, nom, curseur):
+    """Renvoie ``(valeur, pk)`` ou ``None`` si le curseur est absent ou illisible."""
+    if not curseur:
+        return None
+    try:
+        valeur, pk = json.loads(urlsafe_base64_decode(curseur))
+        pk = int(pk)
+        if valeur is not None:
+            try:
+                valeur = queryset.model._meta.get_field(nom).to_python(valeur)
+            except FieldDoesNotExist:
+                # Annotation (ex. pertinence de la recherche) : entière.
+                valeur = int(valeur)
+    except (TypeError, ValueError, ValidationError):
+        return None
+    return valeur, pk
+
+
+def _nullable(queryset, nom):
+    try:
+        return queryset.model._meta.get_field(nom).null
+    except FieldDoesNotExist:
+        return False
+
+
+def _apres_cle(nom, valeur, pk, descendant, nullable=True):
+    """Lignes situées strictement après ``(valeur, pk)`` dans l'ordre (nom, pk), NULL en dernier."""
+    if valeur is None:
+        return Q(**{f'{nom}__isnull': True, 'pk__gt': pk})
+    sens = 'lt' if descendant else 'gt'
+    # Forme « borne large puis exclusion » : permet un parcours d'index depuis la clé.
+    condition = Q(**{f'{nom}__{sens}e': valeur}) & (Q(**{f'{nom}__{sens}': valeur}) | Q(pk__gt=pk))
+    if nullable:
+        condition |= Q(**{f'{nom}__isnull': True})
+    return condition
+
+
+def _avant_cle(nom, valeur, pk, descendant, nullable=True):
+    """Lignes situées strictement avant ``(valeur, pk)`` dans le même ordre."""
+    if valeur is None:
+        return Q(**{f'{nom}__isnull': False}) | Q(**{f'{nom}__isnull': True, 'pk__lt': pk})
+    sens = 'gt' if descendant else 'lt'
+    return Q(**{f'{nom}__{sens}e': valeur}) & (Q(**{f'{nom}__{sens}': valeur}) | Q(pk__lt=pk))
+
+
+def _page_curseur(request, queryset, champ, taille):
+    """
+    Pagination par curseur (keyset) sur ``champ`` puis ``pk``.
+
+    ``?apres=`` / ``?avant=`` portent la clé de la dernière / première ligne
+    affichée : chaque page est un parcours d'index borné, quel que soit son rang.
+    Renvoie ``{'lignes', 'precedente', 'suivante', 'premiere'}`` (curseurs ou ``None``).
+    """
+    descendant = champ.startswith('-')
+    nom = champ.lstrip('-')
+    apres = _decoder_curseur(queryset, nom, request.GET.get('apres'))
+    avant = None if apres else _decoder_curseur(queryset, nom, request.GET.get('avant'))
+
+    nullable = _nullable(queryset, nom)
+    # NULLS LAST/FIRST seulement si nécessaire : sinon l'ordre suit directement l'index.
+    nulls = {'nulls_last': True} if nullable else {}
+    colonne = F(nom).desc(**nulls) if descendant else F(nom).asc(**nulls)
+    ordre = [colonne, 'pk']
+    if avant:
+        # On parcourt l'ordre inverse depuis la clé, puis on remet la page à l'endroit.
+        nulls = {'nulls_first': True} if nullable else {}
+        colonne = F(nom).asc(**nulls) if descendant else F(nom).desc(**nulls)
+        ordre = [colonne, '-pk']
+        queryset = queryset.filter(_avant_cle(nom, *avant, descendant, nullable))
+    elif apres:
+        queryset = queryset.filter(_apres_cle(nom, *apres, descendant, nullable))
+
+    lignes = list(queryset.order_by(*ordre)[:taille + 1])
+    encore = len(lignes) > taille
+    lignes = lignes[:taille]
+    if avant:
+        lignes.reverse()
+
+    def cle(ligne):
+        return _encoder_curseur(getattr(ligne, nom), ligne.pk)
+
+    a_precedente = encore if avant else bool(apres)
+    a_suivante = True if avant else encore
+    return {
+        'lignes': lignes,
+        'premiere': bool(avant or apres),
+        'precedente': cle(lignes[0]) if lignes and a_precedente else None,
+        'suivante': cle(lignes[-1]) if lignes and a_suivante else None,
+    }
+
+
+PERSONNELS_PAR_PAGE = 50
+PERSONNEL_TRIS = {
+    'dn': 'dn',
+    'nom': 'nom',
+    'prenom': 'prenom',
+    'naissance': 'date_de_naissance',
+}
+# Tri supplémentaire proposé pendant une recherche.
+PERSONNEL_TRI_PERTINENCE = {'pertinence': 'exacts'}
+
+EVENEMENTS_PAR_PAGE = 25
+EVENEMENT_TRIS = {
+    'date': 'date_evenement',
+    'facture': 'no_facture',
+    'total': 'total',
+    'statut': 'paiement',
+}
+
+
 class PersonnelListView(LoginRequiredMixin, ListView):
     model = PersonnelNavigant
     template_name = 'expertise/personnel_list.html'
     context_object_name = 'personnels'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = PersonnelNavigant.objects.all()
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(nom__icontains=query) |
-                Q(prenom__icontains=query) |
-                Q(dn__icontains=query)
-            )
+            queryset = rechercher(queryset, query)
         return queryset
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.GET.get('q'):
+            colonnes, defaut = {**PERSONNEL_TRI_PERTINENCE, **PERSONNEL_TRIS}, '-pertinence'
+        else:
+            colonnes, defaut = PERSONNEL_TRIS, 'nom'
+        champ, tri, tris_suivants = _resoudre_tri(self.request, colonnes, defaut)
+        page = _page_curseur(self.request, self.object_list, champ, PERSONNELS_PAR_PAGE)
+        context.update({
+            'personnels': page['lignes'],
+            'page': page,
+            'tri': tri,
+            'tris_suivants': tris_suivants,
+        })
+        return context
+
 
 class PersonnelDetailView(LoginRequiredMixin, DetailView):
     model = PersonnelNavigant
@@ -467,9 +729,23 @@ class PersonnelDetailView(LoginRequiredMixin, DetailView):
     slug_field = 'dn'
     slug_url_kwarg = 'dn'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('compagnie')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['evenements'] = self.object.evenements.all()
+        champ, tri, tris_suivants = _resoudre_tri(self.request, EVENEMENT_TRIS, '-date')
+        evenements = self.object.evenements.select_related(
+            'bordereau',
+            'medecin_cempn', 'medecin_oph', 'medecin_orl', 'medecin_radio', 'medecin_labo',
+        )
+        page = _page_curseur(self.request, evenements, champ, EVENEMENTS_PAR_PAGE)
+        context.update({
+            'evenements': page['lignes'],
+            'page': page,
+            'tri': tri,
+            'tris_suivants': tris_suivants,
+        })
         return context
 
 
@@ -559,30 +835,15 @@ from .utils import nombre_en_lettres  # Assure-toi que ce module existe
 
 def bordereau_view(request, annee, mois, iata):
     compagnie = get_object_or_404(CompagnieAerienne, iata=iata)
-
-    evenements = FicheEvenement.objects.filter(
-        date_evenement__year=annee,
-        date_evenement__month=mois,
-        personnel__compagnie=compagnie
-    )
+    evenements = lignes_bordereau(evenements_du_mois(compagnie, mois, annee))
 
     date_bordereau = datetime.today().strftime('%d/%m/%Y')
-    no_bordereau = f"EB{datetime.today().day:02d}{mois:02d}{str(annee)[-2:]}{iata}"
+    no_bordereau = Bordereau.generer_no_bordereau(mois, annee, iata)
     total_global = sum(e.total for e in evenements)
     total_global_lettres = nombre_en_lettres(total_global)
 
-    # Création ou récupération du bordereau
-    bordereau, _ = Bordereau.objects.get_or_create(
-    no_bordereau=no_bordereau,
-    defaults={'date_bordereau': datetime.today()}
-)
-
-    # Mise à jour de chaque événement
-    with transaction.atomic():
-        for e in evenements:
-            e.bordereau = bordereau
-            e.save()
-
+    # Lecture seule : le rattachement se fait via assign_bordereau (POST) ou au téléchargement.
+    a_rattacher = sum(1 for e in evenements if e.no_bordereau != no_bordereau)
 
     return render(request, "expertise/bordereau.html", {
         "evenements": evenements,
@@ -592,7 +853,8 @@ def bordereau_view(request, annee, mois, iata):
         "compagnie": compagnie,
         "date_bordereau": date_bordereau,
         "no_bordereau": no_bordereau,
-        "nombre_factures": evenements.count(),
+        "nombre_factures": len(evenements),
+        "a_rattacher": a_rattacher,
         "total_global": total_global,
         "total_global_lettres": total_global_lettres,
     })
@@ -609,71 +871,41 @@ def bordereau_factures(request, no_bordereau):
 
 from django.shortcuts import redirect, get_object_or_404
 from .models import Bordereau
+
+
 @login_required(login_url='/login/')
 @require_POST
 def toggle_virement(request, id):
-    bordereau = get_object_or_404(Bordereau, id=id)
-    bordereau.virement = not bordereau.virement
-    bordereau.save(update_fields=['virement'])
-
-    evenements_qs = bordereau.evenements.select_related(
-        'medecin_cempn', 'medecin_oph', 'medecin_orl',
-        'medecin_radio', 'medecin_labo', 'personnel__compagnie'
-    )
+    """
+    Bascule le virement d'un bordereau et reporte le paiement sur ses fiches.
 
-    evenements = list(evenements_qs)
+    Tout se fait en une transaction, bordereau verrouillé (double clic) :
+    UPDATE conditionnels sur les fiches, puis honoraires par médecin selon
+    la règle du virement (``bordereaux.honoraires_bordereau``).
+    """
+    with transaction.atomic():
+        bordereau = get_object_or_404(Bordereau.objects.select_for_update(), id=id)
+        bordereau.virement = not bordereau.virement
+        bordereau.save(update_fields=['virement'])
 
-    if evenements:
+        # UPDATE directs : le grand livre ne dépend pas du paiement, aucun signal à déclencher.
+        evenements = FicheEvenement.objects.filter(bordereau=bordereau)
         if bordereau.virement:
-            today = timezone.now().date()
-            for evenement in evenements:
-                updated_fields = []
-                if not evenement.paiement:
-                    evenement.paiement = True
-                    updated_fields.append('paiement')
-                if not evenement.date_paiement:
-                    evenement.date_paiement = today
-                    updated_fields.append('date_paiement')
-                if updated_fields:
-                    evenement.save(update_fields=updated_fields)
+            evenements.filter(paiement=False).update(paiement=True)
+            evenements.filter(date_paiement__isnull=True).update(date_paiement=timezone.now().date())
         else:
-            for evenement in evenements:
-                updated_fields = []
-                if evenement.paiement:
-                    evenement.paiement = False
-                    updated_fields.append('paiement')
-                if evenement.date_paiement is not None:
-                    evenement.date_paiement = None
-                    updated_fields.append('date_paiement')
-                if updated_fields:
-                    evenement.save(update_fields=updated_fields)
-
-    FactureMedecin.objects.filter(bordereau=bordereau).delete()
-
-    if bordereau.virement and evenements:
-        honoraires_medecins = {}
-
-        for evenement in evenements:
-            for champ, montant in [
-                (evenement.medecin_cempn, evenement.honoraire_cempn),
-                (evenement.medecin_oph, evenement.honoraire_cs_oph),
-                (evenement.medecin_orl, evenement.honoraire_cs_orl),
-                (evenement.medecin_radio, evenement.honoraire_cs_radio),
-                (evenement.medecin_labo, evenement.honoraire_cs_labo),
-                (evenement.medecin_labo, evenement.honoraire_cs_lbx),
-                (evenement.medecin_labo, evenement.honoraire_cs_toxique),
-            ]:
-                if champ:
-                    honoraires_medecins.setdefault(champ, 0)
-                    honoraires_medecins[champ] += montant or 0
-
-        factures_medecins = [
-            FactureMedecin(medecin=medecin, bordereau=bordereau, montant=total)
-            for medecin, total in honoraires_medecins.items()
-        ]
+            evenements.filter(Q(paiement=True) | Q(date_paiement__isnull=False)).update(
+                paiement=False, date_paiement=None,
+            )
 
-        if factures_medecins:
-            FactureMedecin.objects.bulk_create(factures_medecins)
+        FactureMedecin.objects.filter(bordereau=bordereau).delete()
+
+        if bordereau.virement:
+            totaux = totaux_par_medecin(honoraires_bordereau(bordereau))
+            FactureMedecin.objects.bulk_create([
+                FactureMedecin(medecin_id=medecin_id, bordereau=bordereau, montant=total.montant_brut)
+                for medecin_id, total in totaux.items()
+            ])
 
     next_url = request.POST.get('next')
     if next_url:
@@ -684,14 +916,21 @@ def toggle_virement(request, id):
 
 def factures_medecins_bordereau(request, no_bordereau):
     bordereau = get_object_or_404(Bordereau, no_bordereau=no_bordereau)
-    factures = FactureMedecin.objects.filter(bordereau=bordereau)
-
+    factures = list(
+        FactureMedecin.objects
+        .filter(bordereau=bordereau)
+        .select_related('medecin')
+        .order_by('medecin__nom', 'medecin__prenom', 'pk')
+    )
+    # Mêmes montants que les factures PDF par médecin (honoraires_bordereau).
+    totaux = totaux_par_medecin(honoraires_bordereau(
+        bordereau, medecins={facture.medecin_id: facture.medecin for facture in factures},
+    ))
     for facture in factures:
-        if facture.medecin.nom.lower() == "hellec":
-            facture.redevance = Decimal('0')
-        else:
-            facture.redevance = round(facture.montant * Decimal('0.06'), 0)
-        facture.montant_net = round(facture.montant - facture.redevance, 0)
+        total = totaux.get(facture.medecin_id) or TotalHonoraires()
+        facture.montant_brut, facture.redevance, facture.montant_net = (
+            total.montant_brut, total.redevance, total.montant_net,
+        )
 
     return render(request, 'expertise/factures_medecins_bordereau.html', {
         'bordereau': bordereau,
@@ -699,55 +938,112 @@ def factures_medecins_bordereau(request, no_bordereau):
     })
 
 
-@login_required(login_url='/login/')
-def export_evenements_excel(request):
-    evenements = (
-        FicheEvenement.objects
-        .select_related('personnel__compagnie')
-        .order_by('date_evenement', 'personnel__nom', 'personnel__prenom')
+EXPORT_COLONNES = [
+    'Date',
+    'Nom',
+    'Prenom',
+    'Date de naissance',
+    'Numero de facture',
+    'Total de la facture',
+    'Statut facture',
+    'Statut',
+    'Compagnie',
+]
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _date_param(request, nom):
+    try:
+        return parse_date((request.GET.get(nom) or '').strip())
+    except ValueError:
+        return None
+
+
+def _export_queryset(request):
+    evenements = FicheEvenement.objects.all()
+
+    date_debut = _date_param(request, 'du')
+    date_fin = _date_param(request, 'au')
+    compagnie_id = (request.GET.get('compagnie') or '').strip()
+    paiement = (request.GET.get('paiement') or '').strip()
+
+    if date_debut:
+        evenements = evenements.filter(date_evenement__gte=date_debut)
+    if date_fin:
+        evenements = evenements.filter(date_evenement__lte=date_fin)
+    if compagnie_id.isdigit():
+        evenements = evenements.filter(personnel__compagnie_id=int(compagnie_id))
+    if paiement in ('payee', 'non_payee'):
+        evenements = evenements.filter(paiement=(paiement == 'payee'))
+
+    return evenements.order_by('date_evenement', 'personnel__nom', 'personnel__prenom')
+
+
+def _export_lignes(evenements):
+    """Produit les lignes de l'export sans instancier de modèles (mémoire constante)."""
+    statuts = dict(PersonnelNavigant._meta.get_field('statut_pn').choices)
+    valeurs = evenements.values_list(
+        'date_evenement', 'personnel__nom', 'personnel__prenom', 'personnel__date_de_naissance',
+        'no_facture', 'total', 'paiement', 'personnel__statut_pn', 'personnel__compagnie__nom',
     )
+    for date_evt, nom, prenom, naissance, no_facture, total, paye, statut_pn, compagnie in valeurs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            date_evt.strftime('%d/%m/%Y') if date_evt else '',
+            nom or '',
+            prenom or '',
+            naissance.strftime('%d/%m/%Y') if naissance else '',
+            no_facture or '',
+            total or 0,
+            'Payée' if paye else 'Non payée',
+            statuts.get(statut_pn, statut_pn or ''),
+            compagnie or '',
+        ]
 
-    rows = []
-    for evenement in evenements:
-        personnel = evenement.personnel
-        compagnie = personnel.compagnie if personnel else None
-
-        rows.append({
-            'Date': evenement.date_evenement.strftime('%d/%m/%Y') if evenement.date_evenement else '',
-            'Nom': personnel.nom if personnel else '',
-            'Prenom': personnel.prenom if personnel else '',
-            'Date de naissance': personnel.date_de_naissance.strftime('%d/%m/%Y') if personnel and personnel.date_de_naissance else '',
-            'Numero de facture': evenement.no_facture or '',
-            'Total de la facture': evenement.total or 0,
-            'Statut facture': 'Payée' if evenement.paiement else 'Non payée',
-            'Statut': personnel.get_statut_pn_display() if personnel and personnel.statut_pn else '',
-            'Compagnie': compagnie.nom if compagnie else '',
-        })
 
-    df = pd.DataFrame(rows, columns=[
-        'Date',
-        'Nom',
-        'Prenom',
-        'Date de naissance',
-        'Numero de facture',
-        'Total de la facture',
-        'Statut facture',
-        'Statut',
-        'Compagnie',
-    ])
-
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Factures')
-
-    buffer.seek(0)
-
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+@login_required(login_url='/login/')
+def export_evenements_excel(request):
+    """
+    Export des factures en XLSX (par défaut) ou CSV (``format=csv``).
+    Filtres optionnels : ``du``/``au`` (AAAA-MM-JJ), ``compagnie`` (id), ``paiement`` (payee/non_payee).
+    """
+    evenements = _export_queryset(request)
+
+    if request.GET.get('format') == 'csv':
+        writer = csv.writer(_Echo())
+        contenu = itertools.chain(
+            ['\ufeff'],
+            (writer.writerow(ligne) for ligne in itertools.chain([EXPORT_COLONNES], _export_lignes(evenements))),
+        )
+        response = StreamingHttpResponse(contenu, content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="export_factures.csv"'
+        return response
+
+    # Classeur en écriture seule : les lignes sont sérialisées au fil de l'eau
+    # puis le fichier temporaire est envoyé par blocs.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Factures')
+    sheet.append(EXPORT_COLONNES)
+    for ligne in _export_lignes(evenements):
+        sheet.append(ligne)
+
+    fichier = tempfile.TemporaryFile()
+    workbook.save(fichier)
+    fichier.seek(0)
+
+    return FileResponse(
+        fichier,
+        as_attachment=True,
+        filename='export_factures.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     )
-    response['Content-Disposition'] = 'attachment; filename="export_factures.xlsx"'
-    return response
 
 
 @login_required(login_url='/login/')
@@ -865,16 +1161,9 @@ def bordereau_par_compagnie(request):
         selected_bordereau = bordereaux[0]
 
     factures = []
-    bordereau_total = 0
     if selected_bordereau:
-        factures_qs = (
-            FicheEvenement.objects
-            .select_related('personnel__compagnie')
-            .filter(bordereau=selected_bordereau)
-            .order_by('no_facture')
-        )
-        bordereau_total = factures_qs.aggregate(total_sum=Sum('total'))['total_sum'] or 0
-        factures = list(factures_qs)
+        factures = lignes_bordereau(FicheEvenement.objects.filter(bordereau=selected_bordereau))
+    bordereau_total = sum(facture.total for facture in factures)
 
     return render(request, 'expertise/bordereau_par_compagnie.html', {
         'compagnies': compagnies,
@@ -886,34 +1175,6 @@ def bordereau_par_compagnie(request):
     })
 
 
-ACTE_CONFIGS = [
-    ('medecin_cempn', 'Consultation CEMPN', 'cs_cempn', 'date_cempn', 'honoraire_cempn', 'CEMPN'),
-    ('medecin_oph', 'Consultation OPH', 'cs_oph', 'date_cs_oph', 'honoraire_cs_oph', 'OPH'),
-    ('medecin_orl', 'Consultation ORL', 'cs_orl', 'date_cs_orl', 'honoraire_cs_orl', 'ORL'),
-    ('medecin_radio', 'Consultation Radio', 'cs_radio', 'date_cs_radio', 'honoraire_cs_radio', 'RADIO'),
-    ('medecin_labo', 'Biologie sanguine', 'cs_labo', 'date_cs_labo', 'honoraire_cs_labo', 'LABO'),
-    ('medecin_labo', 'Biologie urinaire', 'cs_lbx', 'date_cs_lbx', 'honoraire_cs_lbx', 'LABOX'),
-    ('medecin_labo', 'Recherche toxique', 'cs_toxique', 'date_cs_toxique', 'honoraire_cs_toxique', 'TOX'),
-]
-
-
-def _get_redevance_rate(medecin):
-    if not medecin:
-        return Decimal('0.06')
-
-    nom = (medecin.nom or '').strip().upper()
-    if nom == 'HELLEC':
-        return Decimal('0.00')
-
-    specialite = (medecin.specialite or '').lower()
-    if 'radiolog' in specialite:
-        return Decimal('0.00')
-    if 'laboratoire' in specialite or 'labo' in specialite:
-        return Decimal('0.10')
-
-    return Decimal('0.06')
-
-
 def _generate_medecin_invoice_number(medecin, emission_date):
     initiale = (medecin.nom.strip()[0] if medecin.nom else medecin.prenom[:1]).upper()
     base = f"{emission_date.year}-{initiale}-{emission_date.strftime('%d%m%Y')}"
@@ -961,152 +1222,110 @@ def _create_medecin_invoice(medecin, entries):
     return invoice
 
 
-def _collect_medecin_histories(target_medecin=None):
-    history_map = defaultdict(list)
+def _history_entry(acte):
+    evenement = acte.evenement
+    ligne = acte.ligne_facture
+    invoice = ligne.invoice if ligne else None
 
-    medecins_qs = Medecin.objects.order_by('nom', 'prenom')
-    if target_medecin:
-        medecins_qs = medecins_qs.filter(pk=target_medecin.pk)
-
-    medecins = list(medecins_qs)
-    if not medecins:
-        return history_map
+    return {
+        'acte': acte.act_label,
+        'act_code': acte.act_code,
+        'date': acte.date_acte,
+        'event_id': evenement.id,
+        'facture_no': evenement.no_facture,
+        'facture_id': evenement.pk,
+        'paiement': evenement.paiement,
+        'patient_nom': evenement.personnel.nom if evenement.personnel else '',
+        'patient_prenom': evenement.personnel.prenom if evenement.personnel else '',
+        'montant_brut': acte.montant_brut,
+        'montant_net': acte.montant_net,
+        'redevance': acte.redevance,
+        'invoice_number': invoice.number if invoice else '',
+        'invoice_id': invoice.id if invoice else None,
+        'invoice_date': invoice.emission_date if invoice else None,
+    }
 
-    medecin_ids = [med.id for med in medecins]
 
-    evenements_qs = (
-        FicheEvenement.objects
-        .select_related(
-            'personnel', 'bordereau',
-            'medecin_cempn', 'medecin_oph', 'medecin_orl',
-            'medecin_radio', 'medecin_labo'
-        )
-        .filter(
-            Q(medecin_cempn_id__in=medecin_ids)
-            | Q(medecin_oph_id__in=medecin_ids)
-            | Q(medecin_orl_id__in=medecin_ids)
-            | Q(medecin_radio_id__in=medecin_ids)
-            | Q(medecin_labo_id__in=medecin_ids)
-        )
-    )
+def _actes_historique(actes):
+    return actes.select_related('evenement__personnel', 'ligne_facture__invoice').order_by('-date_acte', 'pk')
 
-    evenements = list(evenements_qs)
-    if not evenements:
-        return history_map
 
-    event_ids = [e.id for e in evenements]
+def _collect_medecin_histories(target_medecin=None):
+    history_map = defaultdict(list)
 
-    lines_map = {}
-    if event_ids:
-        lignes = (
-            MedecinInvoiceLine.objects
-            .select_related('invoice')
-            .filter(
-                evenement_id__in=event_ids,
-                invoice__medecin_id__in=medecin_ids
-            )
-        )
-        lines_map = {
-            (ligne.evenement_id, ligne.act_code): ligne
-            for ligne in lignes
-        }
+    actes = _actes_historique(ActeMedecin.objects.all())
+    if target_medecin:
+        actes = actes.filter(medecin=target_medecin)
 
-    for evenement in evenements:
-        for field_name, act_label, flag_field, date_field, amount_field, act_code in ACTE_CONFIGS:
-            medecin = getattr(evenement, field_name)
-            if not medecin or medecin.id not in medecin_ids:
-                continue
-            if not getattr(evenement, flag_field, False):
-                continue
-
-            act_date = getattr(evenement, date_field, None) or evenement.date_evenement
-            montant_brut = Decimal(getattr(evenement, amount_field, 0) or 0)
-
-            ligne = lines_map.get((evenement.id, act_code))
-
-            if ligne:
-                redevance = ligne.redevance
-                montant_net = ligne.montant_net
-                invoice_number = ligne.invoice.number
-                invoice_id = ligne.invoice_id
-                invoice_date = ligne.invoice.emission_date
-            else:
-                rate = _get_redevance_rate(medecin)
-                redevance = (montant_brut * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                montant_net = (montant_brut - redevance).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                invoice_number = ''
-                invoice_id = None
-                invoice_date = None
-
-            history_map[medecin.id].append({
-                'acte': act_label,
-                'act_code': act_code,
-                'date': act_date,
-                'event_id': evenement.id,
-                'facture_no': evenement.no_facture,
-                'facture_id': evenement.pk,
-                'paiement': evenement.paiement,
-                'patient_nom': evenement.personnel.nom if evenement.personnel else '',
-                'patient_prenom': evenement.personnel.prenom if evenement.personnel else '',
-                'montant_brut': montant_brut,
-                'montant_net': montant_net,
-                'redevance': redevance,
-                'invoice_number': invoice_number,
-                'invoice_id': invoice_id,
-                'invoice_date': invoice_date,
-            })
+    for acte in actes:
+        history_map[acte.medecin_id].append(_history_entry(acte))
 
     return history_map
 
 
+INTERVENANTS_PAR_PAGE = 50
+HISTORIQUE_PAR_PAGE = 50
+
+
 @login_required(login_url='/login/')
 def intervenants_list(request):
-    medecins = list(Medecin.objects.order_by('nom', 'prenom'))
-    history_map = _collect_medecin_histories()
-
-    medecin_rows = []
-    for medecin in medecins:
-        history = history_map.get(medecin.id, [])
-        history.sort(key=lambda item: item['date'] or datetime.min, reverse=True)
-        medecin_rows.append({
-            'medecin': medecin,
-            'history': history,
-        })
+    a_facturer = Q(actes__evenement__paiement=True, actes__ligne_facture__isnull=True)
+    medecins = (
+        Medecin.objects
+        .annotate(
+            nb_actes=Count('actes'),
+            total_brut=Sum('actes__montant_brut'),
+            total_redevance=Sum('actes__redevance'),
+            total_net=Sum('actes__montant_net'),
+            montant_a_facturer=Sum('actes__montant_net', filter=a_facturer),
+        )
+        .order_by('nom', 'prenom', 'pk')
+    )
+    page_obj = Paginator(medecins, INTERVENANTS_PAR_PAGE).get_page(request.GET.get('page'))
 
     return render(request, 'expertise/intervenants_list.html', {
-        'medecin_rows': medecin_rows,
+        'medecins': page_obj.object_list,
+        'page_obj': page_obj,
     })
 
 
 @login_required(login_url='/login/')
 def intervenant_history(request, pk):
     medecin = get_object_or_404(Medecin, pk=pk)
-    history_map = _collect_medecin_histories(target_medecin=medecin)
-    history = history_map.get(medecin.id, [])
-    history.sort(key=lambda item: item['date'] or datetime.min, reverse=True)
-
-    pending_entries = [entry for entry in history if entry.get('paiement') and not entry.get('invoice_number')]
-    if request.GET.get('autogen') == '1' and pending_entries:
-        _create_medecin_invoice(medecin, pending_entries)
-        return redirect('intervenant_history', pk=medecin.pk)
-
-    paid_entries = [entry for entry in history if entry.get('paiement')]
-    total_brut = sum(entry.get('montant_brut', Decimal('0')) or Decimal('0') for entry in paid_entries)
-    total_redevance = sum(entry.get('redevance', Decimal('0')) or Decimal('0') for entry in paid_entries)
+    actes = ActeMedecin.objects.filter(medecin=medecin)
+    actes_en_attente = actes.filter(evenement__paiement=True, ligne_facture__isnull=True)
+
+    if request.GET.get('autogen') == '1':
+        pending_entries = [_history_entry(acte) for acte in _actes_historique(actes_en_attente)]
+        if pending_entries:
+            _create_medecin_invoice(medecin, pending_entries)
+            return redirect('intervenant_history', pk=medecin.pk)
+
+    totaux = actes.filter(evenement__paiement=True).aggregate(
+        total_brut=Coalesce(Sum('montant_brut'), Decimal('0')),
+        total_redevance=Coalesce(Sum('redevance'), Decimal('0')),
+    )
+    total_brut = totaux['total_brut']
+    total_redevance = totaux['total_redevance']
     total_net = total_brut - total_redevance
 
+    page_obj = Paginator(_actes_historique(actes), HISTORIQUE_PAR_PAGE).get_page(request.GET.get('page'))
+    history = [_history_entry(acte) for acte in page_obj.object_list]
+
     invoices = list(MedecinInvoice.objects.filter(medecin=medecin))
     latest_invoice = invoices[0] if invoices else None
 
     return render(request, 'expertise/intervenant_history.html', {
         'medecin': medecin,
         'history': history,
+        'page_obj': page_obj,
+        'nb_actes': page_obj.paginator.count,
+        'nb_actes_en_attente': actes_en_attente.count(),
         'total_brut': total_brut,
         'total_redevance': total_redevance,
         'total_net': total_net,
         'latest_invoice': latest_invoice,
         'invoices': invoices,
-        'pending_entries': pending_entries,
     })
 
 
@@ -1115,12 +1334,13 @@ def intervenant_invoice(request, pk, invoice_id):
     medecin = get_object_or_404(Medecin, pk=pk)
     invoice = get_object_or_404(MedecinInvoice, pk=invoice_id, medecin=medecin)
 
-    pdf_file = _render_medecin_invoice_pdf(invoice)
-    filename = f"FactureMedecin_{invoice.number}.pdf"
+    tache = jobs.planifier('facture_intervenant_pdf', request.user, invoice_id=invoice.pk)
+    return redirect('tache_document', pk=tache.pk)
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+
+def _construire_facture_intervenant_pdf(invoice_id, progression=None):
+    invoice = MedecinInvoice.objects.select_related('medecin').get(pk=invoice_id)
+    return _render_medecin_invoice_pdf(invoice), f"FactureMedecin_{invoice.number}.pdf", 'application/pdf'
 
 
 @require_POST
@@ -1132,7 +1352,7 @@ def intervenant_invoice_delete(request, pk, invoice_id):
     return redirect('intervenant_history', pk=medecin.pk)
 
 
-def _render_medecin_invoice_pdf(invoice):
+def _medecin_invoice_html(invoice):
     entries = [
         {
             'date': ligne.date_acte,
@@ -1142,10 +1362,10 @@ def _render_medecin_invoice_pdf(invoice):
             'redevance': ligne.redevance,
             'montant_net': ligne.montant_net,
         }
-        for ligne in invoice.lignes.all().order_by('date_acte', 'pk')
+        for ligne in invoice.lignes.all()
     ]
 
-    html_string = render_to_string('expertise/facture_medecin_historique_pdf.html', {
+    return render_to_string('expertise/facture_medecin_historique_pdf.html', {
         'medecin': invoice.medecin,
         'invoice_number': invoice.number,
         'emission_date': invoice.emission_date,
@@ -1155,30 +1375,64 @@ def _render_medecin_invoice_pdf(invoice):
         'total_net': invoice.total_net,
     })
 
-    return HTML(string=html_string).write_pdf()
+
+def _render_medecin_invoice_pdf(invoice):
+    """PDF d'une facture médecin, servi depuis le cache disque quand il est à jour."""
+    return pdf_facture_medecin(invoice.pk, _medecin_invoice_html(invoice))
 
 
 @login_required(login_url='/login/')
 def intervenant_invoices_zip(request, pk):
+    """Archive des factures du médecin ; filtre optionnel ``du``/``au`` sur la date d'émission."""
     medecin = get_object_or_404(Medecin, pk=pk)
-    invoices = list(MedecinInvoice.objects.filter(medecin=medecin))
+    date_debut = _date_param(request, 'du')
+    date_fin = _date_param(request, 'au')
 
-    if not invoices:
+    if not _factures_intervenant(medecin.pk, date_debut, date_fin).exists():
         return redirect('intervenant_history', pk=pk)
 
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
-        for invoice in invoices:
-            pdf_bytes = _render_medecin_invoice_pdf(invoice)
-            filename = f"FactureMedecin_{invoice.number}.pdf"
+    tache = jobs.planifier(
+        'factures_intervenant_zip', request.user,
+        medecin_id=medecin.pk,
+        du=date_debut.isoformat() if date_debut else None,
+        au=date_fin.isoformat() if date_fin else None,
+    )
+    return redirect('tache_document', pk=tache.pk)
+
+
+def _factures_intervenant(medecin_id, date_debut=None, date_fin=None):
+    invoices = MedecinInvoice.objects.filter(medecin_id=medecin_id)
+    if date_debut:
+        invoices = invoices.filter(emission_date__gte=date_debut)
+    if date_fin:
+        invoices = invoices.filter(emission_date__lte=date_fin)
+    return invoices
+
+
+def _construire_factures_intervenant_zip(medecin_id, du=None, au=None, progression=None):
+    medecin = Medecin.objects.get(pk=medecin_id)
+    invoices = list(
+        _factures_intervenant(medecin_id, du, au)
+        .select_related('medecin')
+        .prefetch_related('lignes')
+    )
+    documents = [
+        (f"FactureMedecin_{invoice.number}.pdf", invoice.pk, _medecin_invoice_html(invoice))
+        for invoice in invoices
+    ]
+
+    # Les entrées sont ajoutées dès que leur PDF est prêt, dans un fichier
+    # temporaire : la mémoire ne dépend pas du nombre de factures.
+    archive_file = tempfile.TemporaryFile()
+    with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index, (filename, pdf_bytes) in enumerate(pdfs_factures_medecins(documents), start=1):
+            if progression:
+                progression(index, len(documents))
             archive.writestr(filename, pdf_bytes)
+    archive_file.seek(0)
 
-    buffer.seek(0)
     zip_filename = f"FacturesMedecin_{medecin.nom}_{medecin.prenom}.zip".replace(' ', '_')
-
-    response = HttpResponse(buffer.getvalue(), content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{zip_filename}"'
-    return response
+    return archive_file, zip_filename, 'application/zip'
 
 
 @login_required(login_url='/login/')
@@ -1247,16 +1501,17 @@ from django.shortcuts import get_object_or_404, redirect
 from django.shortcuts import get_object_or_404, redirect
 from .models import Bordereau
 
+@login_required(login_url='/login/')
+@require_POST
 def supprimer_bordereau(request, id):
     bordereau = get_object_or_404(Bordereau, id=id)
 
-    # Dissocier les événements liés
-    for evenement in bordereau.evenements.all():
-        evenement.bordereau = None
-        evenement.save()
+    with transaction.atomic():
+        # Dissocier les événements liés
+        bordereau.detacher()
 
-    # Supprimer le bordereau
-    bordereau.delete()
+        # Supprimer le bordereau
+        bordereau.delete()
 
     return redirect('liste_bordereaux')
 
@@ -1335,9 +1590,7 @@ def telecharger_facture_medecin(request, bordereau_no, medecin_id):
 
         # Calculs
         montant_decimal = Decimal(montant)
-        rate = _get_redevance_rate(medecin)
-        redevance = (montant_decimal * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        net = (montant_decimal - redevance).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        redevance, net = calculer_redevance(montant_decimal, medecin)
 
         total += montant_decimal
         total_redevance += redevance
@@ -1364,70 +1617,142 @@ def telecharger_facture_medecin(request, bordereau_no, medecin_id):
     return response
 
 
+@login_required(login_url='/login/')
 def telecharger_facture_medecin(request, bordereau_no, medecin_id):
     bordereau = get_object_or_404(Bordereau, no_bordereau=bordereau_no)
     medecin = get_object_or_404(Medecin, id=medecin_id)
 
-    evenements_originaux = FicheEvenement.objects.filter(
-        bordereau=bordereau
-    ).filter(
-        models.Q(medecin_cempn=medecin) |
-        models.Q(medecin_oph=medecin) |
-        models.Q(medecin_orl=medecin) |
-        models.Q(medecin_radio=medecin) |
-        models.Q(medecin_labo=medecin)
+    tache = jobs.planifier(
+        'facture_medecin_bordereau_pdf', request.user,
+        bordereau_id=bordereau.pk, medecin_id=medecin.pk,
     )
+    return redirect('tache_document', pk=tache.pk)
 
-    evenements = []
-    total_brut = Decimal("0.00")
-    total_redevance = Decimal("0.00")
-
-    for e in evenements_originaux:
-        if e.medecin_cempn == medecin:
-            montant = e.honoraire_cempn or 0
-        elif e.medecin_oph == medecin:
-            montant = e.honoraire_cs_oph or 0
-        elif e.medecin_orl == medecin:
-            montant = e.honoraire_cs_orl or 0
-        elif e.medecin_radio == medecin:
-            montant = e.honoraire_cs_radio or 0
-        elif e.medecin_labo == medecin:
-            montant = sum(filter(None, [e.honoraire_cs_labo, e.honoraire_cs_lbx, e.honoraire_cs_toxique]))
-        else:
-            continue
 
-        montant_decimal = Decimal(montant)
-        rate = _get_redevance_rate(medecin)
-        redevance = (montant_decimal * rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        net = (montant_decimal - redevance).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+def _contexte_facture_medecin_bordereau(bordereau, medecin):
+    # Mêmes montants que le virement et le récapitulatif du bordereau (honoraires_bordereau).
+    actes = honoraires_bordereau(bordereau, medecin_id=medecin.pk, medecins={medecin.pk: medecin})
+    par_evenement = {}
+    for acte in actes:
+        par_evenement.setdefault(acte.evenement_id, []).append(acte)
 
+    evenements = []
+    for actes_fiche in par_evenement.values():
+        total = totaux_par_medecin(actes_fiche)[medecin.pk]
         evenements.append({
-            "date": e.date_evenement.strftime('%d/%m/%Y'),
-            "patient": f"{e.personnel.prenom} {e.personnel.nom}",
-            "montant": f"{montant_decimal:.0f}",
-            "redevance": f"{redevance:.0f}",
-            "net": f"{net:.0f}",
+            "date": actes_fiche[0].date_evenement.strftime('%d/%m/%Y'),
+            "patient": actes_fiche[0].patient,
+            "montant": f"{total.montant_brut:.0f}",
+            "redevance": f"{total.redevance:.0f}",
+            "net": f"{total.montant_net:.0f}",
         })
 
-        total_brut += montant_decimal
-        total_redevance += redevance
-
-    total_net = total_brut - total_redevance
+    total = totaux_par_medecin(actes).get(medecin.pk) or TotalHonoraires()
+    total_brut, total_redevance, total_net = total.montant_brut, total.redevance, total.montant_net
 
-    html_string = render_to_string("expertise/facture_medecin_pdf.html", {
+    return {
         "medecin": medecin,
         "bordereau": bordereau,
         "evenements": evenements,
         "total_brut": f"{total_brut:.0f}",
         "total_redevance": f"{total_redevance:.0f}",
         "total_net": f"{total_net:.0f}",
-    })
+    }
+
+
+def _construire_facture_medecin_bordereau_pdf(bordereau_id, medecin_id, progression=None):
+    bordereau = Bordereau.objects.get(pk=bordereau_id)
+    medecin = Medecin.objects.get(pk=medecin_id)
+    html_string = render_to_string(
+        "expertise/facture_medecin_pdf.html", _contexte_facture_medecin_bordereau(bordereau, medecin),
+    )
 
     pdf_file = HTML(string=html_string).write_pdf()
+    return pdf_file, f"Facture_{medecin.nom}_{bordereau.no_bordereau}.pdf", 'application/pdf'
+
+def _taches_visibles(request):
+    """Un utilisateur ne voit que ses propres documents ; le personnel (staff) les voit tous."""
+    if request.user.is_staff:
+        return TacheDocument.objects.all()
+    return TacheDocument.objects.filter(cree_par=request.user)
+
+
+@login_required(login_url='/login/')
+def tache_document(request, pk):
+    tache = get_object_or_404(_taches_visibles(request), pk=pk)
+    return render(request, 'expertise/tache_document.html', {'tache': tache})
+
+
+@login_required(login_url='/login/')
+def tache_document_statut(request, pk):
+    tache = get_object_or_404(_taches_visibles(request), pk=pk)
+    return JsonResponse({
+        'statut': tache.statut,
+        'statut_label': tache.get_statut_display(),
+        'progression': tache.progression,
+        'message': tache.message,
+        'url': reverse('tache_document_telecharger', args=[tache.pk]) if tache.statut == TacheDocument.TERMINEE else None,
+    })
+
+
+@login_required(login_url='/login/')
+def tache_document_telecharger(request, pk):
+    tache = get_object_or_404(_taches_visibles(request), pk=pk, statut=TacheDocument.TERMINEE)
+    return FileResponse(
+        tache.fichier.open('rb'),
+        as_attachment=True,
+        filename=tache.nom_fichier,
+        content_type=tache.content_type or None,
+    )
+
+
+def _par_appel(champ):
+    return ExpressionWrapper(F(champ) * 1.0 / F('appels'), output_field=FloatField())
+
+
+STATISTIQUE_TRIS = {
+    'vue': 'vue',
+    'appels': 'appels',
+    'duree': 'duree_moyenne',
+    'max': 'duree_max_ms',
+    'sql': 'sql_moyenne',
+    'sql_max': 'sql_requetes_max',
+    'lentes': 'lentes',
+}
+
+
+@staff_member_required(login_url='/login/')
+def statistiques_performance(request):
+    if request.method == 'POST':
+        if request.POST.get('action') == 'reinitialiser':
+            StatistiqueVue.objects.all().delete()
+        else:
+            envoyer_statistiques()
+        return redirect('statistiques_performance')
+
+    champ_tri, tri, tris_suivants = _resoudre_tri(request, STATISTIQUE_TRIS, '-duree')
+    statistiques = (
+        StatistiqueVue.objects
+        .filter(appels__gt=0)
+        .annotate(
+            duree_moyenne=_par_appel('duree_totale_ms'),
+            sql_moyenne=_par_appel('sql_requetes'),
+            sql_duree_moyenne=_par_appel('sql_duree_ms'),
+            template_moyenne=_par_appel('template_duree_ms'),
+        )
+        .order_by(champ_tri, 'vue')
+    )
+    statistiques = list(statistiques)
+    for statistique in statistiques:
+        statistique.budget = settings.QUERY_BUDGETS.get(statistique.vue)
+
+    return render(request, 'expertise/statistiques_performance.html', {
+        'statistiques': statistiques,
+        'tri': tri,
+        'tris_suivants': tris_suivants,
+        'seuil_lent': settings.SLOW_REQUEST_MS,
+    })
 
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Facture_{medecin.nom}_{bordereau.no_bordereau}.pdf"'
-    return response
 
 class CustomLoginView(LoginView):
     template_name = 'login.html'